@@ -0,0 +1,85 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Exists
+from django.utils import timezone
+
+from cars.models import Car, CarTimeTable, CarAvailability, to_slot, from_slot
+from carzones.models import CarZone
+from core.benchmarks import benchmark_database, timed
+
+
+class Command(BaseCommand):
+    help = '차량 예약 비트맵(CarAvailability)과 기존 CarTimeTable 범위 쿼리 성능 비교 (임시 DB 에서 실행됩니다)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--zones', type=int, default=20)
+        parser.add_argument('--cars-per-zone', type=int, default=30)
+        parser.add_argument('--reservations-per-car', type=int, default=50)
+        parser.add_argument('--queries', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            cars = self.seed(options['zones'], options['cars_per_zone'], options['reservations_per_car'])
+            self.run(cars, options['queries'])
+
+    def seed(self, zone_count, cars_per_zone, reservations_per_car):
+        zones = CarZone.objects.bulk_create([CarZone(name=f'bench-{index}', address='bench')
+                                             for index in range(zone_count)])
+        cars = Car.objects.bulk_create([
+            Car(zone=zone, number=f'bench-{zone.id}-{index}', name='bench', manufacturer=Car.ChoiceManufacturer.KIA,
+                riding_capacity=5, is_event_model=False)
+            for zone in zones for index in range(cars_per_zone)
+        ])
+
+        # 앞으로 30일 안에서 1~6시간짜리 예약을 겹치지 않게 배치합니다
+        first_slot = to_slot(timezone.now()) + 6
+        time_tables = []
+        for car in cars:
+            slot = first_slot
+            for _ in range(reservations_per_car):
+                slot += random.randint(1, 20)
+                length = random.randint(6, 36)
+                time_tables.append(CarTimeTable(zone_id=car.zone_id, car=car,
+                                                date_time_start=from_slot(slot),
+                                                date_time_end=from_slot(slot + length)))
+                slot += length
+        CarTimeTable.objects.bulk_create(time_tables)
+        for car in cars:
+            CarAvailability.rebuild(car.id)
+        self.stdout.write(f'seeded {len(zones)} zones, {len(cars)} cars, {len(time_tables)} time tables')
+        return cars
+
+    def run(self, cars, query_count):
+        first_slot = to_slot(timezone.now()) + 6
+        windows = []
+        for _ in range(query_count):
+            slot = first_slot + random.randint(0, 30 * 144)
+            windows.append((random.choice(cars), from_slot(slot), from_slot(slot + random.randint(3, 36))))
+
+        def bench(name, func):
+            results, elapsed = timed(func, windows)
+            self.stdout.write(f'{name:<40} {elapsed:8.3f} ms/query')
+            return results
+
+        orm = bench('overlap check (CarTimeTable.exists)',
+                    lambda car, start, end: car.time_tables.overlap(start, end).exists())
+        bitmap = bench('overlap check (CarAvailability bitmap)',
+                       lambda car, start, end: CarAvailability.for_car(car.id).is_reserved(start, end))
+        assert orm == bitmap, 'bitmap and CarTimeTable disagree'
+
+        zone_ids = list({car.zone_id for car in cars})
+
+        def orm_zone_counts(car, start, end):
+            reserved = CarTimeTable.objects.filter(car_id=OuterRef('pk')).overlap(start, end)
+            counts = {}
+            for zone_id in Car.objects.filter(zone_id__in=zone_ids).filter(~Exists(reserved)) \
+                    .values_list('zone_id', flat=True):
+                counts[zone_id] = counts.get(zone_id, 0) + 1
+            return counts
+
+        orm = bench('zone free cars (NOT EXISTS subquery)', orm_zone_counts)
+        bitmap = bench('zone free cars (CarAvailability bitmap)',
+                       lambda car, start, end: CarAvailability.free_car_counts(
+                           Car.objects.filter(zone_id__in=zone_ids), start, end))
+        assert orm == bitmap, 'bitmap and CarTimeTable disagree'
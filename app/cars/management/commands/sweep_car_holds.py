@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from cars.models import CarTimeTable
+
+
+class Command(BaseCommand):
+    help = '만료된 임시 예약(hold) 정리 (cron 등으로 1분마다 실행합니다)'
+
+    def handle(self, *args, **options):
+        deleted = CarTimeTable.sweep_expired_holds()
+        self.stdout.write(f'deleted {deleted} expired holds')
@@ -0,0 +1,71 @@
+# Generated by Django 3.1.1 on 2026-10-18 09:26
+
+import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+# cars.models 의 slot 함수를 옮겨 둔 것입니다, 이후에 model 이 바뀌어도 이 migration 은 그대로 실행되어야 합니다
+SLOT_EPOCH = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+SLOT_SECONDS = 10 * 60
+
+
+def to_slot(date_time):
+    return int((date_time - SLOT_EPOCH).total_seconds() // SLOT_SECONDS)
+
+
+def to_slot_ceil(date_time):
+    return -int(-(date_time - SLOT_EPOCH).total_seconds() // SLOT_SECONDS)
+
+
+def from_slot(slot):
+    return SLOT_EPOCH + datetime.timedelta(seconds=slot * SLOT_SECONDS)
+
+
+def build_bitmap(origin_slot, time_ranges):
+    bits = 0
+    for date_time_start, date_time_end in time_ranges:
+        start = max(to_slot(date_time_start), origin_slot) - origin_slot
+        end = to_slot_ceil(date_time_end) - origin_slot
+        if end > start:
+            bits |= ((1 << (end - start)) - 1) << start
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def build_car_availabilities(apps, schema_editor):
+    CarTimeTable = apps.get_model('cars', 'CarTimeTable')
+    CarAvailability = apps.get_model('cars', 'CarAvailability')
+
+    origin_slot = max(to_slot(timezone.now()) // 8 * 8 - 8, 0)
+    time_ranges = {}
+    for car_id, date_time_start, date_time_end in CarTimeTable.objects \
+            .filter(date_time_end__gte=from_slot(origin_slot)) \
+            .values_list('car_id', 'date_time_start', 'date_time_end'):
+        time_ranges.setdefault(car_id, []).append((date_time_start, date_time_end))
+
+    CarAvailability.objects.bulk_create([
+        CarAvailability(car_id=car_id, origin_slot=origin_slot, bitmap=build_bitmap(origin_slot, ranges))
+        for car_id, ranges in time_ranges.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0003_cartimetable_zone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarAvailability',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin_slot', models.PositiveIntegerField(default=0)),
+                ('bitmap', models.BinaryField(default=b'')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='cars.car')),
+            ],
+        ),
+        migrations.RunPython(build_car_availabilities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.1.1 on 2026-10-18 09:33
+
+import cars.models
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.db import migrations, models
+from django.db.models import Exists, F, OuterRef
+import django.db.models.expressions
+
+
+def resolve_overlapping_time_tables(apps, schema_editor):
+    """
+    제약조건을 추가하기 전에 기존 시간표 정리
+
+        - 같은 차량, 같은 기간의 중복 시간표(동시 예약 요청으로 두 번 저장된 것)는 가장 먼저 저장된 것만 남깁니다
+        - 그 외에 겹치거나 시작이 종료보다 늦은 시간표는 예약을 확인해 직접 정리해야 하므로 id 를 알려주고 중단합니다
+    """
+    CarTimeTable = apps.get_model('cars', 'CarTimeTable')
+
+    duplicated = CarTimeTable.objects.filter(car_id=OuterRef('car_id'),
+                                             date_time_start=OuterRef('date_time_start'),
+                                             date_time_end=OuterRef('date_time_end'),
+                                             id__lt=OuterRef('id'))
+    CarTimeTable.objects.filter(Exists(duplicated)).delete()
+
+    # 시작/종료 시각이 맞닿는 경우도 겹치는 것으로 봅니다 (제약조건과 같음)
+    overlapped = CarTimeTable.objects.filter(car_id=OuterRef('car_id'),
+                                             date_time_start__lte=OuterRef('date_time_end'),
+                                             date_time_end__gte=OuterRef('date_time_start')) \
+        .exclude(id=OuterRef('id'))
+    conflicts = list(CarTimeTable.objects.filter(Exists(overlapped))
+                     .order_by('car_id', 'date_time_start').values_list('id', flat=True)[:100])
+    inverted = list(CarTimeTable.objects.filter(date_time_start__gt=F('date_time_end'))
+                    .values_list('id', flat=True)[:100])
+    if conflicts or inverted:
+        raise RuntimeError(f'겹치는 CarTimeTable {conflicts}, 시작이 종료보다 늦은 CarTimeTable {inverted} 를 '
+                           f'정리한 후 다시 migrate 해야 합니다 (최대 100개씩 표시)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0004_caravailability'),
+    ]
+
+    operations = [
+        migrations.RunPython(resolve_overlapping_time_tables, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartimetable',
+            constraint=models.CheckConstraint(check=models.Q(date_time_start__lte=django.db.models.expressions.F('date_time_end')), name='cartimetable_start_lte_end'),
+        ),
+        migrations.AddConstraint(
+            model_name='cartimetable',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(expressions=[(cars.models.Int4Range('car', 'car', django.contrib.postgres.fields.ranges.RangeBoundary(inclusive_lower=True, inclusive_upper=True)), '&&'), (cars.models.TsTzRange('date_time_start', 'date_time_end', django.contrib.postgres.fields.ranges.RangeBoundary(inclusive_lower=True, inclusive_upper=True)), '&&')], name='cartimetable_no_overlap'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.1.1 on 2026-10-18 09:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cars', '0005_cartimetable_no_overlap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartimetable',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='cartimetable',
+            name='hold_member',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='car_holds', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.1.1 on 2026-10-18 09:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0006_cartimetable_hold'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cartimetable',
+            index=models.Index(fields=['car', 'date_time_start', 'date_time_end'], name='cartimetable_car_period_idx'),
+        ),
+        migrations.AlterField(
+            model_name='cartimetable',
+            name='car',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='time_tables', to='cars.car'),
+        ),
+    ]
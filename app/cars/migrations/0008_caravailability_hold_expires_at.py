@@ -0,0 +1,29 @@
+# Generated by Django 3.1.1 on 2026-10-18 10:38
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def set_hold_expires_at(apps, schema_editor):
+    # 지금의 비트맵에 어떤 hold 가 포함되었는지 알 수 없으므로 남아 있는 hold 중 가장 먼저 만료되는 시각으로 채웁니다
+    CarAvailability = apps.get_model('cars', 'CarAvailability')
+    CarTimeTable = apps.get_model('cars', 'CarTimeTable')
+    earliest = CarTimeTable.objects.filter(car_id=OuterRef('car_id'), hold_expires_at__isnull=False) \
+        .order_by('hold_expires_at').values('hold_expires_at')[:1]
+    CarAvailability.objects.update(hold_expires_at=Subquery(earliest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0007_cartimetable_car_period_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='caravailability',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(set_hold_expires_at, migrations.RunPython.noop),
+    ]
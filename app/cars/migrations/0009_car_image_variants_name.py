@@ -0,0 +1,18 @@
+# Generated by Django 3.1.1 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0008_caravailability_hold_expires_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='image_variants_name',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
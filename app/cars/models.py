@@ -1,5 +1,47 @@
+import contextlib
+import datetime
+import threading
+
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, IntegerRangeField, RangeBoundary, RangeOperators
+from django.db.models import F, Func, Q
+from django.utils import timezone
 from django.utils.translation import gettext as _
-from django.db import models
+from django.db import models, transaction
+
+# 10분 단위 slot 번호의 기준 시각 (slot 0 = 2020-01-01 00:00 UTC)
+SLOT_EPOCH = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+SLOT_SECONDS = 10 * 60
+
+_rebuild_state = threading.local()
+
+
+def to_slot(date_time):
+    # 해당 시각이 속한 10분 slot 번호 (내림)
+    return int((date_time - SLOT_EPOCH).total_seconds() // SLOT_SECONDS)
+
+
+def to_slot_ceil(date_time):
+    # 해당 시각 이후 처음 시작되는 10분 slot 번호 (올림)
+    return -int(-(date_time - SLOT_EPOCH).total_seconds() // SLOT_SECONDS)
+
+
+def from_slot(slot):
+    return SLOT_EPOCH + datetime.timedelta(seconds=slot * SLOT_SECONDS)
+
+
+def build_bitmap(origin_slot, time_ranges):
+    """
+    (시작, 종료) 시각 목록으로 origin_slot 부터의 비트맵(bytes) 생성
+        i 번째 bit 가 1 이면 origin_slot + i 번째 slot 이 예약된 상태입니다
+    """
+    bits = 0
+    for date_time_start, date_time_end in time_ranges:
+        start = max(to_slot(date_time_start), origin_slot) - origin_slot
+        end = to_slot_ceil(date_time_end) - origin_slot
+        if end > start:
+            bits |= ((1 << (end - start)) - 1) << start
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
 
 
 # Create your models here.
@@ -38,6 +80,8 @@ class Car(models.Model):
     name = models.CharField(max_length=30)
     zone = models.ForeignKey('carzones.CarZone', related_name='cars', on_delete=models.CASCADE)
     image = models.ImageField(null=True, upload_to='CarImages/')
+    # 변형 이미지(core/images.py)를 만든 원본 이미지 이름, image 와 같을 때만 변형 이미지 URL 을 보여줍니다
+    image_variants_name = models.CharField(max_length=100, blank=True, default='')
     manufacturer = models.CharField(max_length=20, choices=ChoiceManufacturer.choices)
     fuel_type = models.CharField(max_length=20, choices=ChoiceFuelType.choices,
                                  default=ChoiceFuelType.GASOLINE, help_text='연료')
@@ -52,9 +96,220 @@ class Car(models.Model):
     convenience_option = models.CharField(max_length=255, default='')
 
 
+class Int4Range(Func):
+    function = 'INT4RANGE'
+    output_field = IntegerRangeField()
+
+
+class TsTzRange(Func):
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
+
+class CarTimeTableQuerySet(models.QuerySet):
+    def overlap(self, date_time_start, date_time_end):
+        # 기간이 겹치는 시간표 (시작/종료 시각이 맞닿는 경우도 겹치는 것으로 봅니다)
+        return self.filter(date_time_start__lte=date_time_end, date_time_end__gte=date_time_start)
+
+    def active(self):
+        # 예약 시간표와 아직 만료되지 않은 임시 예약(hold)
+        return self.filter(Q(hold_expires_at__isnull=True) | Q(hold_expires_at__gt=timezone.now()))
+
+    def expired_holds(self):
+        return self.filter(hold_expires_at__lte=timezone.now())
+
+
 class CarTimeTable(models.Model):
     zone = models.ForeignKey('carzones.CarZone', related_name='time_tables', on_delete=models.CASCADE)
-    car = models.ForeignKey('cars.Car', related_name='time_tables', on_delete=models.CASCADE)
+    # cartimetable_car_period_idx 가 car 로 시작하므로 FK 인덱스는 따로 만들지 않습니다
+    car = models.ForeignKey('cars.Car', related_name='time_tables', on_delete=models.CASCADE, db_index=False)
     date_time_start = models.DateTimeField()
     date_time_end = models.DateTimeField()
+    # 결제 전 잠시 잡아두는 임시 예약(hold), 만료 시간이 없으면 예약 시간표입니다
+    # 만료된 hold 는 예약시 겹치는 것만 바로 지우고, 나머지는 sweep_car_holds 명령으로 한 번에 정리합니다
+    hold_member = models.ForeignKey('members.Member', null=True, blank=True, related_name='car_holds',
+                                    on_delete=models.CASCADE)
+    hold_expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = CarTimeTableQuerySet.as_manager()
+
+    # 같은 차량의 시간표끼리 기간이 겹치지 않도록 DB 에서 보장합니다 (위반시 AlreadyReservedTimeException)
+    # overlap() 과 같이 시작/종료 시각이 맞닿는 경우도 겹치는 것으로 보도록 양 끝을 포함('[]')합니다
+    # car 는 btree_gist 확장 없이 GiST 로 비교하기 위해 [car, car] 범위로 만들어 비교합니다
+    NO_OVERLAP_CONSTRAINT = 'cartimetable_no_overlap'
+
+    @classmethod
+    def is_overlap_violation(cls, error):
+        diag = getattr(error.__cause__, 'diag', None)
+        return getattr(diag, 'constraint_name', None) == cls.NO_OVERLAP_CONSTRAINT
+
+    @classmethod
+    def sweep_expired_holds(cls):
+        """
+        만료된 임시 예약(hold)을 한 번에 지우고 해당 차량의 비트맵을 다시 만듦
+
+            row 마다 post_delete signal 로 비트맵을 다시 만들지 않도록 지운 후 차량별로 한 번씩만 다시 만듭니다
+            (CarAvailability.deferred_rebuild)
+
+            return : 지운 hold 수
+        """
+        with CarAvailability.deferred_rebuild():
+            deleted, _ = cls.objects.expired_holds().delete()
+        return deleted
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(check=Q(date_time_start__lte=F('date_time_end')),
+                                   name='cartimetable_start_lte_end'),
+            ExclusionConstraint(
+                name='cartimetable_no_overlap',
+                expressions=[
+                    (Int4Range('car', 'car', RangeBoundary(inclusive_lower=True, inclusive_upper=True)),
+                     RangeOperators.OVERLAPS),
+                    (TsTzRange('date_time_start', 'date_time_end',
+                               RangeBoundary(inclusive_lower=True, inclusive_upper=True)),
+                     RangeOperators.OVERLAPS),
+                ],
+            ),
+        ]
+        indexes = [
+            # 차량별 기간 겹침 확인 (CarTimeTableQuerySet.overlap), 겹침 방지 제약조건의 GiST 인덱스는 범위 식에만 쓰입니다
+            models.Index(fields=['car', 'date_time_start', 'date_time_end'], name='cartimetable_car_period_idx'),
+        ]
+
+
+class CarAvailability(models.Model):
+    """
+    차량별 10분 단위 예약 현황 비트맵 (CarTimeTable 로부터 만들어지는 인덱스)
+
+        bitmap 의 i 번째 bit 가 1 이면 origin_slot + i 번째 10분 slot 에 예약이 있습니다
+        origin_slot 이전(지난 시간)과 bitmap 이후 slot 은 예약이 없는 것으로 봅니다
+        CarTimeTable 이 저장/삭제되면 signal 로 해당 차량의 비트맵을 다시 만듭니다 (cars/signals.py)
+        만료되지 않은 임시 예약(hold)도 예약으로 봅니다
+    """
+    car = models.OneToOneField('cars.Car', related_name='availability', on_delete=models.CASCADE)
+    origin_slot = models.PositiveIntegerField(default=0)
+    bitmap = models.BinaryField(default=b'')
+    # 비트맵에 포함된 hold 중 가장 먼저 만료되는 시각, 이 시각이 지나면 비트맵에 만료된 hold 가 남아 있을 수 있습니다
+    hold_expires_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def rebuild(cls, car_id):
+        """
+        차량의 시간표로 비트맵을 다시 만들어 저장
+
+            동시에 여러 예약이 저장되더라도 마지막에 만든 비트맵이 모든 예약을 포함하도록
+            비트맵 row 를 잠근 상태(SELECT FOR UPDATE)에서 시간표를 읽습니다
+            예약 transaction 안에서 시간표 저장마다 실행되므로 savepoint 는 만들지 않습니다
+        """
+        with transaction.atomic(savepoint=False):
+            availability = cls.objects.select_for_update().filter(car_id=car_id).first()
+            if availability is None:
+                # 처음 만드는 비트맵은 동시에 만들어도 하나만 저장됩니다
+                cls.objects.get_or_create(car_id=car_id)
+                availability = cls.objects.select_for_update().get(car_id=car_id)
+            # 지난 시간은 비트맵에서 제외하되 직전 slot 과 맞닿는 예약 확인을 위해 1 byte 여유를 둡니다
+            origin_slot = max(to_slot(timezone.now()) // 8 * 8 - 8, 0)
+            rows = list(CarTimeTable.objects.active()
+                        .filter(car_id=car_id, date_time_end__gte=from_slot(origin_slot))
+                        .values_list('date_time_start', 'date_time_end', 'hold_expires_at'))
+            availability.origin_slot = origin_slot
+            availability.bitmap = build_bitmap(origin_slot, [(start, end) for start, end, _ in rows])
+            availability.hold_expires_at = min((expires_at for _, _, expires_at in rows if expires_at), default=None)
+            availability.save()
+        return availability
+
+    @classmethod
+    def request_rebuild(cls, car_id):
+        # deferred_rebuild() 안이면 끝날 때 한 번만 다시 만듭니다
+        car_ids = getattr(_rebuild_state, 'car_ids', None)
+        if car_ids is None:
+            cls.rebuild(car_id)
+        else:
+            car_ids.add(car_id)
+
+    @classmethod
+    @contextlib.contextmanager
+    def deferred_rebuild(cls):
+        """
+        이 안에서 시간표 저장/삭제로 다시 만들어야 하는 비트맵을 모아 두었다가 끝날 때 차량별로 한 번씩 다시 만듦
+        """
+        if getattr(_rebuild_state, 'car_ids', None) is not None:
+            yield
+            return
+        _rebuild_state.car_ids = car_ids = set()
+        try:
+            yield
+        finally:
+            _rebuild_state.car_ids = None
+        for car_id in car_ids:
+            cls.rebuild(car_id)
+
+    @classmethod
+    def for_car(cls, car_id):
+        availability = cls.objects.filter(car_id=car_id).first()
+        return availability if availability is not None else cls.rebuild(car_id)
+
+    @property
+    def bits(self):
+        return int.from_bytes(bytes(self.bitmap), 'little')
+
+    def _window(self, date_time_start, date_time_end):
+        # 기존 확인 방식처럼 시작/종료 시각이 맞닿는 예약도 겹치는 것으로 보기 위해 앞뒤로 1 slot 씩 넓힙니다
+        start = max(to_slot(date_time_start) - 1 - self.origin_slot, 0)
+        end = max(to_slot_ceil(date_time_end) + 1 - self.origin_slot, 0)
+        return start, end
+
+    def is_reserved(self, date_time_start, date_time_end):
+        start, end = self._window(date_time_start, date_time_end)
+        mask = ((1 << (end - start)) - 1) << start
+        return bool(self.bits & mask)
+
+    def next_available(self, date_time_start, date_time_end):
+        """
+        date_time_start 이후로 같은 길이만큼 비어있는 가장 빠른 (시작, 종료) 시각 반환
+        """
+        start, end = self._window(date_time_start, date_time_end)
+        # bit 문자열의 i 번째 글자가 i 번째 slot 이 되도록 뒤집은 뒤 빈 구간을 찾습니다
+        length = len(self.bitmap) * 8
+        slots = format(self.bits, f'0{length}b')[::-1] if length else ''
+        found = (slots + '0' * (end - start)).find('0' * (end - start), start)
+        shift = datetime.timedelta(seconds=(found - start) * SLOT_SECONDS)
+        return date_time_start + shift, date_time_end + shift
+
+    @classmethod
+    def free_car_counts(cls, cars, date_time_start, date_time_end):
+        """
+        cars 중 기간 내 예약이 없는 차량 수를 쏘카존별로 반환 (쿼리 1번)
+
+            return : {zone_id: 이용 가능 차량 수}
+
+            비트맵이 겹치는 차량 중 비트맵에 만료된 hold 가 남아 있을 수 있는 차량만 check_available 처럼
+            시간표에서 다시 확인합니다 (쿼리 1번 추가)
+        """
+        counts = {}
+        windows = {}
+        stale = {}
+        now = timezone.now()
+        rows = cars.values_list('id', 'zone_id', 'availability__origin_slot', 'availability__bitmap',
+                                'availability__hold_expires_at')
+        for car_id, zone_id, origin_slot, bitmap, hold_expires_at in rows:
+            if bitmap:
+                # 대부분의 차량은 origin_slot 이 같으므로 slot 범위 mask 를 재사용합니다
+                if origin_slot not in windows:
+                    start, end = cls(origin_slot=origin_slot)._window(date_time_start, date_time_end)
+                    windows[origin_slot] = ((1 << (end - start)) - 1) << start
+                if int.from_bytes(bitmap, 'little') & windows[origin_slot]:
+                    if hold_expires_at is not None and hold_expires_at <= now:
+                        stale[car_id] = zone_id
+                    continue
+            counts[zone_id] = counts.get(zone_id, 0) + 1
 
+        if stale:
+            reserved = set(CarTimeTable.objects.active().filter(car_id__in=stale)
+                           .overlap(date_time_start, date_time_end).values_list('car_id', flat=True))
+            for car_id, zone_id in stale.items():
+                if car_id not in reserved:
+                    counts[zone_id] = counts.get(zone_id, 0) + 1
+        return counts
@@ -1,20 +1,46 @@
-from django.db.models import Q
+from django.db import models
+from django.db.models import Prefetch
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 
 from cars.models import Car, CarTimeTable
+from core.compiled_serializers import CompiledSerializer, compile_nested
+from core.images import ImageVariantsField
 from core.utils import KST, time_format, get_only_date_from_datetime, get_only_date_end_from_datetime
-from prices.serializers import CarPriceDetailSerializer
+from prices.quotes import quote_cars
+from prices.serializers import CarPriceDetailSerializer, CarQuoteMixin, QuotedCarListSerializer, \
+    CarPriceDetailCompiledSerializer
+
+
+def get_time_table_window(query_params):
+    # trans str KST to datetime aware UTC format start-00:00:00 ~ end-23:59:59
+    date_start = get_only_date_from_datetime(time_format(query_params.get('date_time_start')))
+    date_end = get_only_date_end_from_datetime(time_format(query_params.get('date_time_end')))
+    return date_start, date_end
+
+
+def time_table_prefetch(query_params, lookup='time_tables'):
+    """
+    FilteredTimeTableListSerializer 와 같은 기간으로 거른 시간표를 한 번에 가져오는 Prefetch (만료된 hold 제외)
+    """
+    date_start, date_end = get_time_table_window(query_params)
+    return Prefetch(lookup, queryset=CarTimeTable.objects.active().filter(date_time_start__gte=date_start,
+                                                                          date_time_start__lte=date_end))
 
 
 class FilteredTimeTableListSerializer(serializers.ListSerializer):
 
     def to_representation(self, data):
-        # trans str KST to datetime aware UTC format start-00:00:00 ~ end-23:59:59
-        date_start = get_only_date_from_datetime(
-            time_format(self.context.get('request').query_params.get('date_time_start')))
-        date_end = get_only_date_end_from_datetime(time_format(self.context.get('request').query_params.get('date_time_end')))
-        data = data.filter(date_time_start__gte=date_start, date_time_start__lte=date_end)
+        if 'time_table_window' not in self.context:
+            self.context['time_table_window'] = get_time_table_window(self.context.get('request').query_params)
+        date_start, date_end = self.context['time_table_window']
+
+        data = data.all() if isinstance(data, models.Manager) else data
+        if getattr(data, '_result_cache', None) is not None:
+            # time_table_prefetch 로 이미 가져온 시간표는 쿼리 없이 거릅니다
+            data = [time_table for time_table in data if date_start <= time_table.date_time_start <= date_end]
+        else:
+            data = data.active().filter(date_time_start__gte=date_start, date_time_start__lte=date_end)
         return super(FilteredTimeTableListSerializer, self).to_representation(data)
 
 
@@ -30,19 +56,22 @@ class CarTimeTableSerializer(ModelSerializer):
         read_only_fields = ['id', 'zone', 'car']
 
 
-class CarSerializer(ModelSerializer):
+class CarSerializer(CarQuoteMixin, ModelSerializer):
     car_prices = CarPriceDetailSerializer(read_only=True, source='carprice')
     term_price = serializers.SerializerMethodField()
     insurance_prices = serializers.SerializerMethodField()
     time_tables = CarTimeTableSerializer(read_only=True, many=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
+        list_serializer_class = QuotedCarListSerializer
         model = Car
         fields = ['id',
                   'number',
                   'name',
                   'zone',
                   'image',
+                  'image_variants',
                   'manufacturer',
                   'fuel_type',
                   'type_of_vehicle',
@@ -62,6 +91,7 @@ class CarSerializer(ModelSerializer):
                             'name',
                             'zone',
                             'image',
+                            'image_variants',
                             'manufacturer',
                             'fuel_type',
                             'type_of_vehicle',
@@ -77,19 +107,45 @@ class CarSerializer(ModelSerializer):
                             'time_tables'
                             ]
 
-    def get_term_price(self, car):
-        date_time_start = self.context.get('request').query_params.get('date_time_start')
-        date_time_end = self.context.get('request').query_params.get('date_time_end')
-        return car.carprice.get_price(date_time_start, date_time_end)
-
-    def get_insurance_prices(self, car):
-        date_time_start = self.context.get('request').query_params.get('date_time_start')
-        date_time_end = self.context.get('request').query_params.get('date_time_end')
-        return {
-            'special': car.insurances.get_special_price(date_time_start, date_time_end),
-            'standard': car.insurances.get_standard_price(date_time_start, date_time_end),
-            'light': car.insurances.get_light_price(date_time_start, date_time_end)
-        }
+
+class CarTimeTableCompiledSerializer(CompiledSerializer):
+    serializer_class = CarTimeTableSerializer
+
+
+class CarCompiledSerializer(CompiledSerializer):
+    """
+    CarSerializer 목록과 같은 결과, 요금 / 보험료와 시간표는 prepare 에서 목록 전체를 한 번에 가져옵니다
+    """
+    serializer_class = CarSerializer
+
+    @classmethod
+    def compile_car_prices(cls, field):
+        return compile_nested(field, CarPriceDetailCompiledSerializer)
+
+    @classmethod
+    def compile_term_price(cls, field):
+        return ['id'], lambda serializer: lambda row: serializer.quotes[row['id']].term_price
+
+    @classmethod
+    def compile_insurance_prices(cls, field):
+        return ['id'], lambda serializer: lambda row: serializer.quotes[row['id']].insurance_prices
+
+    @classmethod
+    def compile_time_tables(cls, field):
+        def factory(serializer):
+            nested = CarTimeTableCompiledSerializer(serializer.context)
+            return lambda row: [nested.to_row(time_table) for time_table in serializer.time_tables.get(row['id'], [])]
+        return ['id'], factory
+
+    def prepare(self, rows):
+        car_ids = [row['id'] for row in rows]
+        self.quotes = quote_cars(car_ids, *CarQuoteMixin.get_quote_window(self.context))
+
+        # time_table_prefetch 와 같은 조회를 .values() 로 합니다
+        time_tables = time_table_prefetch(self.context.get('request').query_params).queryset
+        self.time_tables = {}
+        for time_table in CarTimeTableCompiledSerializer.values(time_tables.filter(car_id__in=car_ids)):
+            self.time_tables.setdefault(time_table['car'], []).append(time_table)
 
 
 class CarDetailInfoSerializer(ModelSerializer):
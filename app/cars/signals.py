@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from cars.models import Car, CarTimeTable, CarAvailability
+from core.images import schedule_variants_on_save
+
+
+@receiver(post_save, sender=CarTimeTable)
+@receiver(post_delete, sender=CarTimeTable)
+def rebuild_car_availability(sender, instance, **kwargs):
+    CarAvailability.request_rebuild(instance.car_id)
+
+
+# 차량 이미지의 크기별 변형 이미지 (core/images.py)
+post_save.connect(schedule_variants_on_save, sender=Car)
@@ -5,16 +5,44 @@ from PIL import Image
 
 # Create your tests here.
 from model_bakery import baker
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 # from cars.models import PhotoBeforeUse
-from cars.models import CarTimeTable
-from core.utils import trans_kst_to_utc, KST
-from members.models import Member, Profile
+from cars.models import CarTimeTable, CarAvailability, from_slot, to_slot
+from core.utils import trans_kst_to_utc, KST, time_format
+from members.models import CreditLedger, Member, Profile
 from payments.models import PaymentBeforeUse, PaymentAfterUse
-from prices.models import InsuranceFee, Coupon
+from prices.models import CarPrice, InsuranceFee, Coupon
+from prices.cache import QuoteCache, quote_cache
+from prices.quotes import Quote, quote_cars
 from reservations.models import ReservationStatus, Reservation, PhotoBeforeUse
+from reservations.services import book_reservation, extend_reservation
+
+
+def book_reservations(reservations):
+    return [book_reservation(reservation) for reservation in reservations]
+
+
+def reset_credit(member, credit_point):
+    """
+    크레딧 원장을 Profile 로 압축한 뒤 잔액을 credit_point 로 맞춥니다
+    """
+    CreditLedger.compact()
+    Profile.objects.filter(member=member).update(credit_point=credit_point)
+
+
+def reservation_times(quantity, day=5):
+    """
+    baker 로 예약을 여러 개 만들 때 차량 스케쥴이 겹치지 않도록 하루씩 떨어진 시간대를 넘겨줍니다
+    """
+    starts = [datetime.datetime(2020, 10, day + i, 1, tzinfo=datetime.timezone.utc) for i in range(quantity)]
+    return {'date_time_start': iter(starts),
+            'date_time_end': iter(start + datetime.timedelta(hours=2) for start in starts)}
 
 
 class ImageMaker:
@@ -43,6 +71,7 @@ class CarTestCase(APITestCase):
                                       car=self.cars[0],
                                       standard_price=50000,
                                       weekday_price_per_ten_min=10,
+                                      weekend_price_per_ten_min=15,
                                       min_price_per_km=10,
                                       mid_price_per_km=100,
                                       max_price_per_km=1000)
@@ -50,6 +79,7 @@ class CarTestCase(APITestCase):
                                       car=self.cars[1],
                                       standard_price=2000,
                                       weekday_price_per_ten_min=20,
+                                      weekend_price_per_ten_min=30,
                                       min_price_per_km=20,
                                       mid_price_per_km=200,
                                       max_price_per_km=2000)
@@ -79,12 +109,12 @@ class CarTestCase(APITestCase):
         self.expected_insurance = 'special'
         self.test_date_time_start = datetime.datetime(2020, 10, 19, 12, 0, tzinfo=datetime.timezone.utc)
         self.test_date_time_end = datetime.datetime(2020, 10, 19, 13, 0, tzinfo=datetime.timezone.utc)
-        self.reservation = Reservation.objects.create(car_id=self.cars[0].id,
-                                                      zone_id=self.zones[0].id,
-                                                      member_id=self.user.id,
-                                                      insurance=self.expected_insurance,
-                                                      date_time_start=self.test_date_time_start,
-                                                      date_time_end=self.test_date_time_end)
+        self.reservation = book_reservation(Reservation(car_id=self.cars[0].id,
+                                                        zone_id=self.zones[0].id,
+                                                        member_id=self.user.id,
+                                                        insurance=self.expected_insurance,
+                                                        date_time_start=self.test_date_time_start,
+                                                        date_time_end=self.test_date_time_end))
 
         self.coupon_expire_date_time = datetime.datetime(2020, 12, 19, 12, 0, tzinfo=datetime.timezone.utc)
         self.client.force_authenticate(user=self.user)
@@ -112,8 +142,8 @@ class CarTestCase(APITestCase):
             self.assertEqual(entry.manual_page, response_entry['manual_page'])
             self.assertEqual(entry.safety_option, response_entry['safety_option'])
             self.assertEqual(entry.convenience_option, response_entry['convenience_option'])
-            # 입력한 기간에 따른 가격
-            self.assertEqual(entry.carprice.standard_price + entry.carprice.weekday_price_per_ten_min,
+            # 입력한 기간에 따른 가격 (2020-09-26 토요일 : 주말 요금)
+            self.assertEqual(entry.carprice.standard_price + entry.carprice.weekend_price_per_ten_min,
                              response_entry['term_price'])
             self.assertEqual(entry.insurances.light_price + entry.insurances.light_price_per_ten_min,
                              response_entry['insurance_prices']['light'])
@@ -159,8 +189,8 @@ class CarTestCase(APITestCase):
         self.assertEqual(self.car_price_1.min_price_per_km, response.data['car_prices']['min_price_per_km'])
         self.assertEqual(self.car_price_1.mid_price_per_km, response.data['car_prices']['mid_price_per_km'])
         self.assertEqual(self.car_price_1.max_price_per_km, response.data['car_prices']['max_price_per_km'])
-        # 입력한 기간에 따른 가격
-        self.assertEqual(self.cars[0].carprice.standard_price + self.cars[0].carprice.weekday_price_per_ten_min,
+        # 입력한 기간에 따른 가격 (2020-09-26 토요일 : 주말 요금)
+        self.assertEqual(self.cars[0].carprice.standard_price + self.cars[0].carprice.weekend_price_per_ten_min,
                          response.data['term_price'])
         self.assertEqual(self.cars[0].insurances.light_price + self.cars[0].insurances.light_price_per_ten_min,
                          response.data['insurance_prices']['light'])
@@ -179,8 +209,8 @@ class CarTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK, response)
         # 시간 반영 요금 정보
         for entry, response_entry in zip(self.car_prices, response.data['cars']):
-            # 40분 요금 계산 : standard_price + weekday_price_per_ten_min
-            pay = entry.standard_price + entry.weekday_price_per_ten_min
+            # 토요일 40분 요금 계산 : standard_price + weekend_price_per_ten_min
+            pay = entry.standard_price + entry.weekend_price_per_ten_min
             self.assertEqual(pay, response_entry['term_price'])
 
         # 차량 정보
@@ -214,6 +244,58 @@ class CarTestCase(APITestCase):
             self.assertEqual(entry.date_time_start, trans_kst_to_utc(response_entry['date_time_start']))
             self.assertEqual(entry.date_time_end, trans_kst_to_utc(response_entry['date_time_end']))
 
+    def test_should_list_Cars_info_in_fixed_number_of_queries(self):
+        """
+        Request : GET - /carzones/123/info, /carzones/123/cars (차량 수와 상관없이 쿼리 수 고정)
+        """
+        for car in baker.make('cars.Car', zone=self.zones[0], image=self.test_image.name, _quantity=30):
+            baker.make('prices.CarPrice', car=car)
+            baker.make('prices.InsuranceFee', car=car)
+            CarTimeTable.objects.create(car=car, zone=self.zones[0],
+                                        date_time_start='2020-09-26T20:00:00+00:00',
+                                        date_time_end='2020-09-26T21:00:00+00:00')
+        quote_cache.clear()
+
+        # 쏘카존, 차량, 시간표, 요금
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                f'/carzones/{self.zones[0].id}/info?date_time_start=202009261400&date_time_end=202009271400')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(32, len(response.data['cars']))
+        self.assertEqual(31, len(response.data['time_tables']))
+        self.assertLessEqual(len(queries), 4)
+
+        # 페이지 차량(carprice 포함), 시간표, 요금
+        quote_cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                f'/carzones/{self.zones[0].id}/cars?date_time_start=202009261400&date_time_end=202009271400')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for entry in response.data['results']:
+            self.assertEqual(0 if entry['id'] == self.cars[1].id else 1, len(entry['time_tables']))
+        self.assertLessEqual(len(queries), 4)
+
+    def test_should_quote_Cars_in_one_query(self):
+        """
+        여러 차량의 요금 / 보험료를 쿼리 한 번으로 계산하고, 모델의 개별 계산 결과와 같아야 합니다
+        """
+        date_time_start, date_time_end = '202009261400', '202009281730'
+        car_without_prices = baker.make('cars.Car', zone=self.zones[0], image=self.test_image.name)
+        quote_cache.clear()
+
+        with self.assertNumQueries(1):
+            quotes = quote_cars(self.cars + [car_without_prices], time_format(date_time_start),
+                                time_format(date_time_end))
+
+        for car, insurance in zip(self.cars, self.insurances):
+            self.assertEqual(car.carprice.get_price(date_time_start, date_time_end), quotes[car.id].term_price)
+            self.assertEqual({'special': insurance.get_special_price(date_time_start, date_time_end),
+                              'standard': insurance.get_standard_price(date_time_start, date_time_end),
+                              'light': insurance.get_light_price(date_time_start, date_time_end)},
+                             quotes[car.id].insurance_prices)
+        self.assertIsNone(quotes[car_without_prices.id].term_price)
+        self.assertIsNone(quotes[car_without_prices.id].insurance_prices['light'])
+
     def test_should_create_Reservation(self):
         """
         Request : POST - /carzones/123/cars/456/reservations
@@ -221,8 +303,7 @@ class CarTestCase(APITestCase):
         expected_status = ReservationStatus.ChoiceStatus.PAID_1.value
         # Credit 초기화
         default_credit = 100000
-        self.user.profile.credit_point = default_credit
-        self.user.profile.save()
+        reset_credit(self.user, default_credit)
 
         # 미래 시간으로 data 테스트
         data = {'date_time_start': '2020-10-19T13:10:00Z',
@@ -251,7 +332,7 @@ class CarTestCase(APITestCase):
                          PaymentBeforeUse.objects.get(reservation_id=response.data['id']).total_fee)
         # Credit Check
         self.assertEqual(default_credit - rental_fee - insurance_fee,
-                         Profile.objects.get(member_id=self.user.id).credit_point)
+                         CreditLedger.balance(self.user.id))
 
     def test_should_retrieve_Reservation(self):
         """
@@ -276,20 +357,18 @@ class CarTestCase(APITestCase):
                                       password='test2')
         # Credit 초기화
         default_credit = 2000000
-        user2.profile.credit_point = default_credit
-        user2.profile.save()
-        self.user.profile.credit_point = default_credit
-        self.user.profile.save()
-        reservations_user = baker.make('reservations.Reservation',
-                                       member=self.user,
-                                       car_id=self.cars[0].id,
-                                       zone_id=self.zones[0].id,
-                                       _quantity=2)
-        reservations_user2 = baker.make('reservations.Reservation',
-                                        member=user2,
-                                        car_id=self.cars[0].id,
-                                        zone_id=self.zones[0].id,
-                                        _quantity=2)
+        reset_credit(user2, default_credit)
+        reset_credit(self.user, default_credit)
+        reservations_user = book_reservations(baker.prepare('reservations.Reservation',
+                                                            member=self.user,
+                                                            car_id=self.cars[0].id,
+                                                            zone_id=self.zones[0].id,
+                                                            _quantity=2, **reservation_times(2)))
+        reservations_user2 = book_reservations(baker.prepare('reservations.Reservation',
+                                                             member=user2,
+                                                             car_id=self.cars[0].id,
+                                                             zone_id=self.zones[0].id,
+                                                             _quantity=2, **reservation_times(2, day=10)))
         self.client.force_authenticate(user=user2)
         response = self.client.get(f'/reservations')
 
@@ -331,8 +410,7 @@ class CarTestCase(APITestCase):
         """
         # Credit 초기화
         default_credit = 100000
-        self.user.profile.credit_point = default_credit
-        self.user.profile.save()
+        reset_credit(self.user, default_credit)
 
         data = {'driving_distance': '120'}
         distance = int(data['driving_distance'])
@@ -355,7 +433,7 @@ class CarTestCase(APITestCase):
 
         # Credit Check
         self.assertEqual(default_credit - total_fee,
-                         Profile.objects.get(member_id=self.user.id).credit_point)
+                         CreditLedger.balance(self.user.id))
 
     def test_should_create_PaymentAfterUse_gte_70_lte_100_distance(self):
         """
@@ -364,8 +442,7 @@ class CarTestCase(APITestCase):
         """
         # Credit 초기화
         default_credit = 200000
-        self.user.profile.credit_point = default_credit
-        self.user.profile.save()
+        reset_credit(self.user, default_credit)
 
         data = {'driving_distance': '90'}
         distance = int(data['driving_distance'])
@@ -388,7 +465,7 @@ class CarTestCase(APITestCase):
 
         # Credit Check
         self.assertEqual(default_credit - total_fee,
-                         Profile.objects.get(member_id=self.user.id).credit_point)
+                         CreditLedger.balance(self.user.id))
 
     def test_should_create_PaymentAfterUse_lte_30_distance(self):
         """
@@ -398,8 +475,7 @@ class CarTestCase(APITestCase):
 
         # Credit 초기화
         default_credit = 100000
-        self.user.profile.credit_point = default_credit
-        self.user.profile.save()
+        reset_credit(self.user, default_credit)
 
         data = {'driving_distance': '20'}
         distance = int(data['driving_distance'])
@@ -422,7 +498,7 @@ class CarTestCase(APITestCase):
 
         # Credit Check
         self.assertEqual(default_credit - total_fee,
-                         Profile.objects.get(member_id=self.user.id).credit_point)
+                         CreditLedger.balance(self.user.id))
 
     def test_should_retrieve_PaymentAfterUse(self):
         """
@@ -454,11 +530,11 @@ class CarTestCase(APITestCase):
         user2 = Member.objects.create(email='test2@example.com',
                                       password='test2')
         self.client.force_authenticate(user=user2)
-        reservations = baker.make('reservations.Reservation',
-                                  member=user2,
-                                  car_id=self.cars[0].id,
-                                  zone_id=self.zones[0].id,
-                                  _quantity=2)
+        reservations = book_reservations(baker.prepare('reservations.Reservation',
+                                                       member=user2,
+                                                       car_id=self.cars[0].id,
+                                                       zone_id=self.zones[0].id,
+                                                       _quantity=2, **reservation_times(2)))
         payment_1 = baker.make('payments.PaymentAfterUse',
                                member=user2,
                                reservation_id=reservations[0].id,
@@ -493,14 +569,13 @@ class CarTestCase(APITestCase):
     def test_should_list_MemberSelf_with_total_driving_distance(self):
         # Credit 초기화
         default_credit = 2000000
-        self.user.profile.credit_point = default_credit
-        self.user.profile.save()
-
-        reservations = baker.make('reservations.Reservation',
-                                  member=self.user,
-                                  car_id=self.cars[0].id,
-                                  zone_id=self.zones[0].id,
-                                  _quantity=2)
+        reset_credit(self.user, default_credit)
+
+        reservations = book_reservations(baker.prepare('reservations.Reservation',
+                                                       member=self.user,
+                                                       car_id=self.cars[0].id,
+                                                       zone_id=self.zones[0].id,
+                                                       _quantity=2, **reservation_times(2)))
         payment_1 = baker.make('payments.PaymentAfterUse',
                                member=self.user,
                                reservation_id=reservations[0].id,
@@ -653,8 +728,7 @@ class CarTestCase(APITestCase):
         expected_status = ReservationStatus.ChoiceStatus.PAID_1.value
         # Credit 초기화
         default_credit = 100000
-        self.user.profile.credit_point = default_credit
-        self.user.profile.save()
+        reset_credit(self.user, default_credit)
 
         # 미래 시간으로 data 테스트
         data = {'date_time_start': '2020-10-19T13:10:00Z',
@@ -685,4 +759,209 @@ class CarTestCase(APITestCase):
 
         # Credit Check
         self.assertEqual(default_credit - rental_fee - insurance_fee + coupon.discount_fee,
-                         Profile.objects.get(member_id=self.user.id).credit_point)
+                         CreditLedger.balance(self.user.id))
+
+
+class CarAvailabilityTestCase(APITestCase):
+    def setUp(self):
+        self.user = Member.objects.create(email='test@example.com',
+                                          name='test',
+                                          phone='01033332222',
+                                          password='test')
+        self.zone = baker.make('carzones.CarZone')
+        self.car = baker.make('cars.Car', zone=self.zone)
+        baker.make('prices.CarPrice', car=self.car, standard_price=1000, weekday_price_per_ten_min=10,
+                   weekend_price_per_ten_min=10)
+        baker.make('prices.InsuranceFee', car=self.car)
+        # 내일 같은 시각 (10분 단위)
+        self.base = from_slot(to_slot(timezone.now()) + 144)
+
+    def after(self, minutes):
+        return self.base + datetime.timedelta(minutes=minutes)
+
+    def test_should_sync_bitmap_when_Reservation_created_and_extended(self):
+        reservation = book_reservation(Reservation(car=self.car, zone=self.zone, member=self.user,
+                                                   date_time_start=self.after(60), date_time_end=self.after(120)))
+        availability = CarAvailability.objects.get(car=self.car)
+        self.assertTrue(availability.is_reserved(self.after(90), self.after(100)))
+        self.assertFalse(availability.is_reserved(self.after(140), self.after(200)))
+
+        extend_reservation(reservation, self.after(180))
+        availability = CarAvailability.objects.get(car=self.car)
+        self.assertTrue(availability.is_reserved(self.after(140), self.after(200)))
+
+    def test_should_treat_touching_time_as_reserved(self):
+        CarTimeTable.objects.create(car=self.car, zone=self.zone,
+                                    date_time_start=self.after(60), date_time_end=self.after(120))
+        availability = CarAvailability.objects.get(car=self.car)
+        for start, end in ((0, 60), (120, 180), (0, 240), (70, 80)):
+            self.assertEqual(self.car.time_tables.overlap(self.after(start), self.after(end)).exists(),
+                             availability.is_reserved(self.after(start), self.after(end)))
+            self.assertTrue(availability.is_reserved(self.after(start), self.after(end)))
+        for start, end in ((0, 50), (130, 180)):
+            self.assertFalse(availability.is_reserved(self.after(start), self.after(end)))
+
+    def test_should_find_next_available_time(self):
+        CarTimeTable.objects.create(car=self.car, zone=self.zone,
+                                    date_time_start=self.after(60), date_time_end=self.after(120))
+        CarTimeTable.objects.create(car=self.car, zone=self.zone,
+                                    date_time_start=self.after(150), date_time_end=self.after(200))
+        availability = CarAvailability.objects.get(car=self.car)
+
+        self.assertEqual((self.after(0), self.after(30)),
+                         availability.next_available(self.after(0), self.after(30)))
+        self.assertEqual((self.after(210), self.after(270)),
+                         availability.next_available(self.after(60), self.after(120)))
+
+    def test_should_rebuild_bitmap_when_CarTimeTable_deleted(self):
+        time_table = CarTimeTable.objects.create(car=self.car, zone=self.zone,
+                                                 date_time_start=self.after(60), date_time_end=self.after(120))
+        time_table.delete()
+
+        self.assertFalse(CarAvailability.objects.get(car=self.car).is_reserved(self.after(0), self.after(180)))
+
+
+class CarPriceCalendarTestCase(APITestCase):
+    def setUp(self):
+        self.car_price = baker.make('prices.CarPrice', standard_price=1000,
+                                    weekday_price_per_ten_min=10, weekend_price_per_ten_min=25)
+
+    def walk_price(self, date_time_start, date_time_end):
+        # 10분씩 걸어가며 요일별 요금을 더하는 기준 계산
+        price = self.car_price.standard_price
+        slot = date_time_start + datetime.timedelta(minutes=30)
+        while slot < date_time_end:
+            if slot.astimezone(KST).weekday() >= 4:
+                price += self.car_price.weekend_price_per_ten_min
+            else:
+                price += self.car_price.weekday_price_per_ten_min
+            slot += datetime.timedelta(minutes=10)
+        return price
+
+    def test_should_split_price_at_KST_weekend_boundary(self):
+        # 2020-10-01(목) 23:00 KST ~ 10-02(금) 01:00 KST : 주중 30분 + 주말 60분
+        price = self.car_price.get_price('202010012300', '202010020100')
+
+        self.assertEqual(1000 + 3 * 10 + 6 * 25, price)
+
+    def test_should_split_price_at_KST_weekday_boundary(self):
+        # 2020-10-04(일) 23:00 KST ~ 10-05(월) 00:40 KST : 주말 30분 + 주중 40분
+        price = self.car_price.get_price('202010042300', '202010050040')
+
+        self.assertEqual(1000 + 3 * 25 + 4 * 10, price)
+
+    def test_should_match_slot_walk_up_to_30_days(self):
+        date_time_start = datetime.datetime(2020, 9, 30, 14, 20, tzinfo=datetime.timezone.utc)
+        for days, minutes in ((0, 40), (1, 0), (3, 130), (6, 10), (13, 500), (30, 0)):
+            date_time_end = date_time_start + datetime.timedelta(days=days, minutes=minutes)
+            self.assertEqual(self.walk_price(date_time_start, date_time_end),
+                             self.car_price.get_price_from_iso_format(date_time_start, date_time_end),
+                             (days, minutes))
+
+    def test_should_quote_weekend_price_same_as_CarPrice(self):
+        date_time_start, date_time_end = time_format('202010011200'), time_format('202010040930')
+
+        quote = quote_cars([self.car_price.car], date_time_start, date_time_end)[self.car_price.car_id]
+
+        self.assertEqual(self.car_price.get_price_from_iso_format(date_time_start, date_time_end), quote.term_price)
+
+
+class QuoteCacheTestCase(APITestCase):
+    def setUp(self):
+        quote_cache.clear()
+        self.car = baker.make('cars.Car')
+        self.car_price = baker.make('prices.CarPrice', car=self.car, standard_price=1000,
+                                    weekday_price_per_ten_min=10, weekend_price_per_ten_min=20)
+        self.insurance = InsuranceFee.objects.create(car=self.car,
+                                                     light_price=100, light_price_per_ten_min=1,
+                                                     standard_price=200, standard_price_per_ten_min=2,
+                                                     special_price=300, special_price_per_ten_min=3)
+        # 2020-10-05(월) 14:00 ~ 15:00 KST
+        self.window = (time_format('202010051400'), time_format('202010051500'))
+
+    def test_should_reuse_cached_quote(self):
+        quote_cars([self.car], *self.window)
+
+        with self.assertNumQueries(0):
+            quote = quote_cars([self.car], *self.window)[self.car.id]
+
+        self.assertEqual(1000 + 3 * 10, quote.term_price)
+        self.assertEqual(1, quote_cache.stats()['hits'])
+        self.assertEqual(1, quote_cache.stats()['misses'])
+
+    def test_should_invalidate_quote_when_prices_change(self):
+        quote_cars([self.car], *self.window)
+
+        self.car_price.weekday_price_per_ten_min = 50
+        self.car_price.save()
+        self.insurance.light_price = 500
+        self.insurance.save()
+        quote = quote_cars([self.car], *self.window)[self.car.id]
+
+        self.assertEqual(1000 + 3 * 50, quote.term_price)
+        self.assertEqual(500 + 3 * 1, quote.insurance_prices['light'])
+
+    def test_should_not_use_cached_quote_for_billing(self):
+        quote_cars([self.car], *self.window)
+        # signal 없이 바뀐 요금 (다른 worker 에서 바뀐 요금과 같음)
+        CarPrice.objects.filter(id=self.car_price.id).update(weekday_price_per_ten_min=50)
+
+        self.assertEqual(1000 + 3 * 10, quote_cars([self.car], *self.window)[self.car.id].term_price)
+        self.assertEqual(1000 + 3 * 50, quote_cars([self.car], *self.window, use_cache=False)[self.car.id].term_price)
+
+    def test_should_evict_least_recently_used_quote(self):
+        cache = QuoteCache(max_size=2, ttl=60)
+        cache.set_many({1: 'a', 2: 'b'}, {1: 0, 2: 0}, *self.window)
+        cache.get_many([1], *self.window)
+        cache.set_many({3: 'c'}, {3: 0}, *self.window)
+
+        found, missing = cache.get_many([1, 2, 3], *self.window)
+
+        self.assertEqual({1: 'a', 3: 'c'}, found)
+        self.assertEqual([2], list(missing))
+        self.assertEqual(1, cache.stats()['evictions'])
+
+    def test_should_expire_quote_after_ttl(self):
+        cache = QuoteCache(max_size=2, ttl=0)
+        cache.set_many({1: 'a'}, {1: 0}, *self.window)
+
+        found, missing = cache.get_many([1], *self.window)
+
+        self.assertEqual({}, found)
+        self.assertEqual(0, cache.stats()['size'])
+
+    def test_should_retrieve_quote_cache_stats_admin_only(self):
+        """
+        Request : GET - /quote_cache
+        """
+        user = Member.objects.create(email='test@example.com', password='test')
+        self.client.force_authenticate(user=user)
+        response = self.client.get('/quote_cache')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        user.is_admin = True
+        user.save()
+        quote_cars([self.car], *self.window)
+        response = self.client.get('/quote_cache')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(1, response.data['size'])
+        self.assertEqual(1, response.data['misses'])
+
+
+class QuoteCacheCommitTestCase(TransactionTestCase):
+    def test_should_drop_quote_cached_before_commit(self):
+        quote_cache.clear()
+        car = baker.make('cars.Car')
+        car_price = baker.make('prices.CarPrice', car=car, standard_price=1000,
+                               weekday_price_per_ten_min=10, weekend_price_per_ten_min=20)
+        window = (time_format('202010051400'), time_format('202010051500'))
+
+        with transaction.atomic():
+            car_price.weekday_price_per_ten_min = 50
+            car_price.save()
+            # commit 전에 다른 thread 가 이전 요금으로 계산해 캐시한 견적
+            _, missing = quote_cache.get_many([car.id], *window)
+            quote_cache.set_many({car.id: Quote(1000 + 3 * 10, {})}, missing, *window)
+
+        self.assertEqual(1000 + 3 * 50, quote_cars([car], *window)[car.id].term_price)
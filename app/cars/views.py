@@ -6,10 +6,14 @@ from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
 from cars.models import Car
-from cars.serializers import CarSerializer, CarDetailInfoSerializer
+from cars.serializers import CarSerializer, CarDetailInfoSerializer, CarCompiledSerializer, time_table_prefetch
+from core.compiled_serializers import CompiledListMixin
+from core.db_routers import ReplicaReadMixin
 
 
-class CarViewSet(mixins.RetrieveModelMixin,
+class CarViewSet(CompiledListMixin,
+                 ReplicaReadMixin,
+                 mixins.RetrieveModelMixin,
                  mixins.ListModelMixin,
                  GenericViewSet):
     """
@@ -27,13 +31,22 @@ class CarViewSet(mixins.RetrieveModelMixin,
     """
     queryset = Car.objects.all()
     serializer_class = CarSerializer
+    compiled_serializer_class = CarCompiledSerializer
     permission_classes = [IsAuthenticated, ]
+    replica_actions = ('list', 'retrieve', 'info')
 
     def get_serializer_class(self):
         if self.action == 'info':
             return CarDetailInfoSerializer
         return super().get_serializer_class()
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.select_related('carprice').prefetch_related(
+                time_table_prefetch(self.request.query_params))
+        return queryset
+
     def filter_queryset(self, queryset):
         queryset = queryset.filter(zone=self.kwargs.get('carzone_pk'))
         return super().filter_queryset(queryset)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CarzonesConfig(AppConfig):
     name = 'carzones'
     verbose_name = 'so_fast_car_zone'
+
+    def ready(self):
+        import carzones.signals  # noqa: F401
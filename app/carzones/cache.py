@@ -0,0 +1,116 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from rest_framework.response import Response
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from rest_framework_jwt.settings import api_settings
+
+from core.exceptions import NotModifiedException
+
+CATALOG_VERSION_KEY = 'carzone_catalog:version'
+
+
+def get_catalog_version_ttl():
+    # 버전이 만료되면 새 버전으로 바뀌므로, 버전 변경을 놓친 응답도 이 시간 뒤에는 다시 만듭니다
+    return getattr(settings, 'CARZONE_CATALOG_VERSION_TTL', 24 * 60 * 60)
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, get_catalog_version_ttl())
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """
+    쏘카존 변경이 commit 된 후 카탈로그 버전을 바꿈
+
+        commit 전에 바꾸면 다른 요청이 변경 전 데이터를 새 버전으로 캐시할 수 있으므로 on_commit 에서 바꿉니다
+        캐시가 비워진 후 다시 1 부터 세면 이전 버전과 겹칠 수 있으므로 숫자 대신 임의의 값을 씁니다
+    """
+    transaction.on_commit(lambda: cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, get_catalog_version_ttl()))
+
+
+class CatalogCacheMixin:
+    """
+    쏘카존 목록/상세 응답을 쏘카존 카탈로그 버전별로 캐시하는 ViewSet mixin
+
+        - 응답은 (카탈로그 버전, 요청 경로와 쿼리, 응답 형식) 별로 CARZONE_CATALOG_CACHE_TTL 초 동안 캐시합니다
+        - 쏘카존이 admin, import_export 등으로 저장/삭제되면 commit 후 signal 로 버전을 바꿉니다 (carzones/signals.py)
+        - 같은 키의 응답은 항상 같으므로 키를 strong ETag 로 내려주고, If-None-Match 가 같으면
+          쏘카존, 회원 조회 없이(토큰은 서명과 만료만 확인) 304 를 반환합니다
+        - 버전과 응답은 모든 worker 가 함께 쓰는 CACHES 의 default 캐시에 저장합니다
+          기본 설정인 DB 캐시에서는 304 응답도 버전을 읽는 캐시 테이블 조회 1번이 있고,
+          버전이 만료된 경우에는 새 버전을 쓰는 쿼리가 더해집니다 (memcached 등을 쓰면 DB 조회가 없습니다)
+    """
+    catalog_cache_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        self.catalog_etag = None
+        if request.method in ('GET', 'HEAD') and self.action in self.catalog_cache_actions:
+            # ETag 에 응답 형식이 들어가므로 APIView.initial 보다 먼저 content negotiation 을 합니다
+            self.format_kwarg = self.get_format_suffix(**kwargs)
+            request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+            self.catalog_etag = self.get_catalog_etag(request)
+            if self.catalog_etag in self.get_if_none_match(request) and self.has_valid_token(request):
+                raise NotModifiedException(self.catalog_etag)
+        super().initial(request, *args, **kwargs)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModifiedException):
+            return self.with_catalog_headers(Response(status=exc.status_code))
+        return super().handle_exception(exc)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_catalog_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_catalog_response(super().retrieve, request, *args, **kwargs)
+
+    def get_catalog_response(self, handler, request, *args, **kwargs):
+        if self.catalog_etag is None:
+            return handler(request, *args, **kwargs)
+
+        key = f'carzone_catalog:response:{self.catalog_etag}'
+        data = cache.get(key)
+        if data is not None:
+            return self.with_catalog_headers(Response(data))
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, getattr(settings, 'CARZONE_CATALOG_CACHE_TTL', 300))
+            self.with_catalog_headers(response)
+        return response
+
+    def with_catalog_headers(self, response):
+        response['ETag'] = f'"{self.catalog_etag}"'
+        # 인증된 사용자에게만 내려주는 응답이므로 공유 캐시에는 저장하지 않고, 매번 ETag 로 재검증하도록 합니다
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @staticmethod
+    def get_catalog_etag(request):
+        key = '\n'.join([get_catalog_version(), request.get_host(), request.get_full_path(),
+                         request.accepted_media_type])
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    @staticmethod
+    def get_if_none_match(request):
+        # If-None-Match 는 weak 비교이므로 W/ 를 떼고 비교합니다
+        header = request.headers.get('If-None-Match', '')
+        return {etag.strip().replace('W/', '', 1).strip('"') for etag in header.split(',') if etag.strip()}
+
+    @staticmethod
+    def has_valid_token(request):
+        # 304 는 본문이 없으므로 회원 조회 없이 토큰 서명과 만료만 확인합니다
+        try:
+            jwt_value = JSONWebTokenAuthentication().get_jwt_value(request)
+            return jwt_value is not None and bool(api_settings.JWT_DECODE_HANDLER(jwt_value))
+        except Exception:
+            return False
@@ -0,0 +1,286 @@
+import heapq
+import math
+import threading
+import time
+
+from django.conf import settings
+
+from core.utils import haversine
+
+# 위도 1도의 최소 길이 (단위: km), 격자 범위 계산시 여유있게 잡기 위해 최소값 사용
+KM_PER_LAT_DEGREE = 110.574
+# 적도에서 경도 1도의 길이 (단위: km)
+KM_PER_LON_DEGREE = 111.320
+
+
+class CarZoneGridIndex:
+    """
+    쏘카존 위도/경도를 격자(cell) 단위로 묶어둔 프로세스 로컬 공간 인덱스
+
+        - 반경 검색시 DB 대신 반경에 걸치는 격자만 확인한 후 haversine 거리로 정확히 잘라냅니다
+        - 쏘카존이 admin 등에서 저장/삭제되면 signal 로 해당 쏘카존만 갱신합니다 (carzones/signals.py)
+        - 다른 프로세스(gunicorn worker)에서 변경된 내용은 CARZONE_INDEX_TTL 초가 지나면 전체 재구성으로 반영됩니다
+    """
+
+    def __init__(self, cell_degree=None, ttl=None):
+        self.cell_degree = cell_degree or getattr(settings, 'CARZONE_INDEX_CELL_DEGREE', 0.01)
+        self.ttl = ttl if ttl is not None else getattr(settings, 'CARZONE_INDEX_TTL', 60)
+        self._lock = threading.RLock()
+        self._cells = None
+        self._points = {}
+        self._built_at = 0.0
+
+    def _cell(self, latitude, longitude):
+        return math.floor(latitude / self.cell_degree), math.floor(longitude / self.cell_degree)
+
+    def build(self):
+        from carzones.models import CarZone
+
+        cells = {}
+        points = {}
+        for zone_id, latitude, longitude in CarZone.objects.values_list('id', 'latitude', 'longitude'):
+            points[zone_id] = (latitude, longitude)
+            cells.setdefault(self._cell(latitude, longitude), {})[zone_id] = (latitude, longitude)
+
+        with self._lock:
+            self._cells = cells
+            self._points = points
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._cells = None
+
+    def _ensure_built(self):
+        if self._cells is None or time.monotonic() - self._built_at > self.ttl:
+            self.build()
+
+    def update(self, zone_id, latitude, longitude):
+        with self._lock:
+            if self._cells is None:
+                return
+            self._discard(zone_id)
+            self._points[zone_id] = (latitude, longitude)
+            self._cells.setdefault(self._cell(latitude, longitude), {})[zone_id] = (latitude, longitude)
+
+    def remove(self, zone_id):
+        with self._lock:
+            if self._cells is None:
+                return
+            self._discard(zone_id)
+
+    def _discard(self, zone_id):
+        point = self._points.pop(zone_id, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        zones = self._cells.get(cell)
+        if zones is not None:
+            zones.pop(zone_id, None)
+            if not zones:
+                del self._cells[cell]
+
+    def within(self, latitude, longitude, distance):
+        """
+        기준 위치에서 distance(km) 이내의 쏘카존을 가까운 순서로 반환
+
+            return : [(zone_id, 거리(km)), ...]
+        """
+        self._ensure_built()
+        with self._lock:
+            cells = self._cells
+
+            lat_span = distance / KM_PER_LAT_DEGREE
+            max_abs_lat = min(abs(latitude) + lat_span, 89.9)
+            lon_span = distance / (KM_PER_LON_DEGREE * math.cos(math.radians(max_abs_lat)))
+
+            min_row, min_col = self._cell(latitude - lat_span, longitude - lon_span)
+            max_row, max_col = self._cell(latitude + lat_span, longitude + lon_span)
+
+            # 반경이 커서 확인할 격자가 실제 채워진 격자보다 많으면 채워진 격자만 훑습니다
+            if (max_row - min_row + 1) * (max_col - min_col + 1) > len(cells):
+                candidates = [zones for (row, col), zones in cells.items()
+                              if min_row <= row <= max_row and min_col <= col <= max_col]
+            else:
+                candidates = [cells[(row, col)]
+                              for row in range(min_row, max_row + 1)
+                              for col in range(min_col, max_col + 1)
+                              if (row, col) in cells]
+
+            result = []
+            for zones in candidates:
+                for zone_id, (zone_lat, zone_lon) in zones.items():
+                    zone_distance = haversine(latitude, longitude, zone_lat, zone_lon)
+                    if zone_distance <= distance:
+                        result.append((zone_id, zone_distance))
+
+        result.sort(key=lambda entry: entry[1])
+        return result
+
+    def nearest(self, latitude, longitude, k):
+        """
+        기준 위치에서 가장 가까운 쏘카존 k 개를 가까운 순서로 반환
+
+            기준 위치의 격자부터 한 겹(ring)씩 넓혀가며 찾고, 아직 확인하지 않은 격자까지의 최소 거리가
+            k 번째 거리보다 멀어지면 멈춥니다. 넓혀야 할 격자가 채워진 격자보다 많아지면 전체를 훑습니다.
+
+            return : [(zone_id, 거리(km)), ...]
+        """
+        self._ensure_built()
+        with self._lock:
+            cells = self._cells
+            points = self._points
+            if k <= 0 or not points:
+                return []
+
+            center_row, center_col = self._cell(latitude, longitude)
+            found = []
+            checked_cells = 0
+            ring = 0
+            while True:
+                if ring == 0:
+                    ring_cells = [(center_row, center_col)]
+                else:
+                    ring_cells = [(center_row + d_row, center_col + d_col)
+                                  for d_row in range(-ring, ring + 1)
+                                  for d_col in (range(-ring, ring + 1) if abs(d_row) == ring else (-ring, ring))]
+                checked_cells += len(ring_cells)
+                if checked_cells > len(cells):
+                    result = heapq.nsmallest(k, ((zone_id, haversine(latitude, longitude, zone_lat, zone_lon))
+                                                 for zone_id, (zone_lat, zone_lon) in points.items()),
+                                             key=lambda entry: entry[1])
+                    break
+
+                for cell in ring_cells:
+                    for zone_id, (zone_lat, zone_lon) in cells.get(cell, {}).items():
+                        found.append((zone_id, haversine(latitude, longitude, zone_lat, zone_lon)))
+
+                # 다음 겹 이후 격자에 있는 쏘카존까지의 최소 거리
+                max_abs_lat = min(abs(latitude) + (ring + 1) * self.cell_degree, 89.9)
+                km_per_degree = min(KM_PER_LAT_DEGREE, KM_PER_LON_DEGREE * math.cos(math.radians(max_abs_lat)))
+                unchecked_distance = ring * self.cell_degree * km_per_degree
+                if len(found) >= len(points) or len(found) >= k and \
+                        heapq.nsmallest(k, found, key=lambda entry: entry[1])[-1][1] <= unchecked_distance:
+                    result = heapq.nsmallest(k, found, key=lambda entry: entry[1])
+                    break
+                ring += 1
+
+        return result
+
+
+carzone_grid_index = CarZoneGridIndex()
+
+
+def keyword_grams(text):
+    # 검색어는 두 글자 이상이면 글자 bigram, 한 글자면 글자 자체로 찾습니다
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[index:index + 2] for index in range(len(text) - 1)}
+
+
+def index_grams(text):
+    # 한 글자 검색도 되도록 글자와 글자 bigram 을 함께 색인합니다
+    return set(text) | keyword_grams(text)
+
+
+class CarZoneKeywordIndex:
+    """
+    쏘카존 이름/주소의 글자 bigram 역색인 (프로세스 로컬)
+
+        - 한글은 형태소 분리 없이도 "성수", "성수동" 같은 부분 검색이 되도록 글자 단위 bigram 을 씁니다
+        - 검색어의 bigram 을 모두 가진 쏘카존만 후보로 뽑은 뒤 실제로 포함하는지 확인하므로
+          결과는 name/address icontains 와 같고, 전체 쏘카존을 훑지 않습니다
+        - 이름에 포함된 쏘카존이 먼저, 그 다음 주소에 포함된 쏘카존 순서이고 같은 경우 앞쪽에 포함될수록 먼저입니다
+        - DB 확장(pg_trgm 등) 없이 동작하므로 DB 종류와 상관 없이 같은 결과를 냅니다
+        - 쏘카존이 저장/삭제되면 signal 로 해당 쏘카존만 갱신하고 (carzones/signals.py),
+          다른 프로세스에서 변경된 내용은 CARZONE_INDEX_TTL 초가 지나면 전체 재구성으로 반영됩니다
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'CARZONE_INDEX_TTL', 60)
+        self._lock = threading.RLock()
+        self._postings = None
+        self._texts = {}
+        self._built_at = 0.0
+
+    def build(self):
+        from carzones.models import CarZone
+
+        postings = {}
+        texts = {}
+        for zone_id, name, address in CarZone.objects.values_list('id', 'name', 'address'):
+            texts[zone_id] = (name.lower(), address.lower())
+            for gram in index_grams(texts[zone_id][0]) | index_grams(texts[zone_id][1]):
+                postings.setdefault(gram, set()).add(zone_id)
+
+        with self._lock:
+            self._postings = postings
+            self._texts = texts
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._postings = None
+
+    def _ensure_built(self):
+        if self._postings is None or time.monotonic() - self._built_at > self.ttl:
+            self.build()
+
+    def update(self, zone_id, name, address):
+        with self._lock:
+            if self._postings is None:
+                return
+            self._discard(zone_id)
+            self._texts[zone_id] = (name.lower(), address.lower())
+            for gram in index_grams(self._texts[zone_id][0]) | index_grams(self._texts[zone_id][1]):
+                self._postings.setdefault(gram, set()).add(zone_id)
+
+    def remove(self, zone_id):
+        with self._lock:
+            if self._postings is None:
+                return
+            self._discard(zone_id)
+
+    def _discard(self, zone_id):
+        texts = self._texts.pop(zone_id, None)
+        if texts is None:
+            return
+        for gram in index_grams(texts[0]) | index_grams(texts[1]):
+            zone_ids = self._postings.get(gram)
+            if zone_ids is not None:
+                zone_ids.discard(zone_id)
+                if not zone_ids:
+                    del self._postings[gram]
+
+    def search(self, keyword, limit):
+        """
+        이름 또는 주소에 keyword 가 포함된 쏘카존을 순위대로 limit 개 반환
+
+            return : [zone_id, ...]
+        """
+        keyword = keyword.lower()
+        grams = keyword_grams(keyword)
+        if not grams or limit <= 0:
+            return []
+
+        self._ensure_built()
+        with self._lock:
+            # 가장 짧은 posting 부터 교집합을 구합니다
+            postings = sorted((self._postings.get(gram, ()) for gram in grams), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+
+            ranked = []
+            for zone_id in candidates:
+                name, address = self._texts[zone_id]
+                position = name.find(keyword)
+                if position >= 0:
+                    ranked.append((0, position, zone_id))
+                    continue
+                position = address.find(keyword)
+                if position >= 0:
+                    ranked.append((1, position, zone_id))
+
+        return [zone_id for _, _, zone_id in heapq.nsmallest(limit, ranked)]
+
+
+carzone_keyword_index = CarZoneKeywordIndex()
@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from rest_framework_jwt.settings import api_settings
+
+from carzones.models import CarZone
+from core.benchmarks import benchmark_database, analyze, timed
+from members.models import Member
+
+
+class Command(BaseCommand):
+    help = '쏘카존 목록/상세 응답 캐시와 ETag(304) 적용 전후 처리량 비교 (임시 DB 에서 실행됩니다)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--zones', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=300)
+
+    def handle(self, *args, **options):
+        with benchmark_database(), override_settings(ALLOWED_HOSTS=['testserver']):
+            zones = CarZone.objects.bulk_create([CarZone(name=f'bench-{index}', address='bench',
+                                                         latitude=37.5, longitude=127.0)
+                                                 for index in range(options['zones'])])
+            analyze(CarZone)
+            member = Member.objects.create(email='bench@example.com', password='bench')
+            client = APIClient()
+            token = api_settings.JWT_ENCODE_HANDLER(api_settings.JWT_PAYLOAD_HANDLER(member))
+            client.credentials(HTTP_AUTHORIZATION=f'JWT {token}')
+
+            urls = ['/carzones'] + [f'/carzones/{zone.id}' for zone in zones[:9]]
+            arguments = [(urls[index % len(urls)],) for index in range(options['requests'])]
+            self.stdout.write(f'seeded {len(zones)} zones')
+
+            def bench(name, func, expected):
+                results, elapsed = timed(func, arguments)
+                assert set(results) == {expected}, f'{name}: unexpected status {set(results)}'
+                self.stdout.write(f'{name:<30} {elapsed:8.3f} ms/request {1000 / elapsed:10.1f} requests/s')
+
+            def uncached(url):
+                # 매 요청마다 캐시를 비워 캐시가 없을 때와 같은 경로(인증, 조회, 직렬화)를 탑니다
+                cache.clear()
+                return client.get(url).status_code
+
+            bench('no cache', uncached, 200)
+            bench('versioned response cache', lambda url: client.get(url).status_code, 200)
+
+            etags = {url: client.get(url)['ETag'] for url in urls}
+            bench('If-None-Match (304)',
+                  lambda url: client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code, 304)
@@ -30,6 +30,8 @@ class CarZone(models.Model):
     longitude = models.FloatField(default=0.0)
 
     image = models.ImageField(null=True, upload_to='CarZoneImages/%Y/%m/%d')
+    # 변형 이미지(core/images.py)를 만든 원본 이미지 이름, image 와 같을 때만 변형 이미지 URL 을 보여줍니다
+    image_variants_name = models.CharField(max_length=100, blank=True, default='')
     sub_info = models.CharField(max_length=100, default='')
     detail_info = models.CharField(max_length=100, default='')
     type = models.CharField(max_length=10, choices=ChoiceZoneType.choices,
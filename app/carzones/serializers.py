@@ -2,11 +2,15 @@ from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 
 from cars.serializers import CarTimeTableSerializer
+from core.compiled_serializers import CompiledSerializer
+from core.images import ImageVariantsField
 from prices.serializers import SummaryCarAndCarPriceSerializer
 from .models import CarZone
 
 
 class CarZoneSerializer(ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = CarZone
         fields = ['id',
@@ -16,6 +20,7 @@ class CarZoneSerializer(ModelSerializer):
                   'latitude',
                   'longitude',
                   'image',
+                  'image_variants',
                   'sub_info',
                   'detail_info',
                   'type',
@@ -27,12 +32,35 @@ class CarZoneSerializer(ModelSerializer):
                             'latitude',
                             'longitude',
                             'image',
+                            'image_variants',
                             'sub_info',
                             'detail_info',
                             'type',
                             'operating_time']
 
 
+class CarZoneCompiledSerializer(CompiledSerializer):
+    serializer_class = CarZoneSerializer
+
+
+class CarZoneDistanceSerializer(CarZoneSerializer):
+    # 기준 위치로부터의 거리 (단위: km)
+    distance = serializers.FloatField(read_only=True)
+
+    class Meta(CarZoneSerializer.Meta):
+        fields = CarZoneSerializer.Meta.fields + ['distance']
+        read_only_fields = CarZoneSerializer.Meta.read_only_fields + ['distance']
+
+
+class CarZoneAvailabilitySerializer(CarZoneSerializer):
+    # 요청한 기간에 이용 가능한 차량 수
+    free_car_count = serializers.IntegerField(read_only=True)
+
+    class Meta(CarZoneSerializer.Meta):
+        fields = CarZoneSerializer.Meta.fields + ['free_car_count']
+        read_only_fields = CarZoneSerializer.Meta.read_only_fields + ['free_car_count']
+
+
 class CarZonePricesSerializer(ModelSerializer):
     cars = SummaryCarAndCarPriceSerializer(many=True, read_only=True)
     time_tables = CarTimeTableSerializer(many=True, read_only=True)
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from carzones.cache import bump_catalog_version
+from carzones.indexes import carzone_grid_index, carzone_keyword_index
+from carzones.models import CarZone
+from core.images import schedule_variants_on_save
+
+
+@receiver(post_save, sender=CarZone)
+def update_carzone_grid_index(sender, instance, **kwargs):
+    carzone_grid_index.update(instance.id, instance.latitude, instance.longitude)
+    carzone_keyword_index.update(instance.id, instance.name, instance.address)
+
+
+@receiver(post_delete, sender=CarZone)
+def remove_carzone_grid_index(sender, instance, **kwargs):
+    carzone_grid_index.remove(instance.id)
+    carzone_keyword_index.remove(instance.id)
+
+
+@receiver(post_save, sender=CarZone)
+@receiver(post_delete, sender=CarZone)
+def bump_carzone_catalog_version(sender, instance, **kwargs):
+    bump_catalog_version()
+
+
+# 쏘카존 이미지의 크기별 변형 이미지 (core/images.py)
+post_save.connect(schedule_variants_on_save, sender=CarZone)
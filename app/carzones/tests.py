@@ -1,12 +1,24 @@
-from django.test import TestCase
+import datetime
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Q
+from django.test import TestCase, TransactionTestCase, override_settings
 
 # Create your tests here.
 from model_bakery import baker
 from munch import Munch
+from django.utils import timezone
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_jwt.settings import api_settings
 
+from cars.models import CarTimeTable
+from carzones.cache import get_catalog_version
+from carzones.indexes import carzone_grid_index, carzone_keyword_index
 from carzones.models import CarZone
+from core.utils import KST, time_format
 from members.models import Member
 
 
@@ -17,6 +29,9 @@ class CarZoneTestCase(APITestCase):
         self.zones = baker.make('carzones.CarZone', _quantity=2)
         self.expected_count = 2
         self.client.force_authenticate(user=self.user)
+        cache.clear()
+        carzone_grid_index.invalidate()
+        carzone_keyword_index.invalidate()
 
     def test_should_list_CarZones(self):
         """
@@ -73,6 +88,45 @@ class CarZoneTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(CarZone.objects.filter(name__icontains='zone').count(), self.expected_count)
 
+    def test_should_list_CarZones_from_korean_partial_keyword_ranked_by_name(self):
+        """
+        Request : GET - /carzones?keyword=성수
+        """
+        by_address = CarZone.objects.create(name='뚝섬역 1번 출구', address='서울 성동구 성수동1가')
+        by_late_name = CarZone.objects.create(name='서울숲 성수', address='서울 성동구 성수동1가')
+        by_name = CarZone.objects.create(name='성수역 2번 출구', address='서울 성동구 성수이로')
+        CarZone.objects.create(name='건대입구역', address='서울 광진구 자양동')
+
+        response = self.client.get('/carzones?keyword=성수')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([by_name.id, by_late_name.id, by_address.id],
+                         [entry['id'] for entry in response.data['results']])
+
+        response = self.client.get('/carzones?keyword=성수동')
+        self.assertEqual({by_address.id, by_late_name.id}, {entry['id'] for entry in response.data['results']})
+
+        response = self.client.get('/carzones?keyword=수')
+        self.assertEqual(3, len(response.data['results']))
+
+    def test_should_match_CarZones_like_icontains(self):
+        zones = [CarZone.objects.create(name=name, address=address) for name, address in [
+            ('SoCar Zone', '서울 강남구 역삼동'), ('zone', '서울 강남구 역삼로'), ('역 삼', '서울 서초구')]]
+
+        for keyword in ['ZONE', 'car z', '역삼', '역 삼', '강남구 역', '서울', '없음']:
+            response = self.client.get('/carzones', {'keyword': keyword})
+            expected = CarZone.objects.filter(Q(name__icontains=keyword) | Q(address__icontains=keyword))
+            self.assertEqual(set(expected.values_list('id', flat=True)) & {zone.id for zone in zones},
+                             {entry['id'] for entry in response.data['results']}, keyword)
+
+    def test_should_limit_searched_CarZones(self):
+        CarZone.objects.bulk_create([CarZone(name=f'성수 {index}', address='서울') for index in range(30)])
+
+        response = self.client.get('/carzones?keyword=성수')
+
+        self.assertEqual(20, len(response.data['results']))
+        self.assertIsNone(response.data['next'])
+
     def test_should_list_CarZones_filter_by_distance(self):
         """
         Request : GET - /carzones/distance?lat=123.456&lon=123.456&distance=1
@@ -88,3 +142,252 @@ class CarZoneTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         for entry in response.data:
             self.assertEqual(entry['address'], '서울 성동구 성수동1가')
+
+    def test_should_exclude_CarZones_outside_radius_at_box_corner(self):
+        """
+        Request : GET - /carzones/distance?lat=37.54&lon=127.04&distance=1
+        위도/경도 차이는 각각 1km 이내지만 실제 거리는 1km 를 넘는 모서리 쏘카존 제외
+        """
+        CarZone.objects.create(name='near', address='서울 성동구 성수동1가',
+                               latitude=37.5445, longitude=127.0445)
+        CarZone.objects.create(name='corner', address='서울 성동구 성수동2가',
+                               latitude=37.5485, longitude=127.0510)
+        response = self.client.get(f'/carzones/distance?lat=37.54&lon=127.04&distance=1')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(['near'], [entry['name'] for entry in response.data])
+
+    def test_should_list_CarZones_filter_by_distance_ordered_by_distance(self):
+        """
+        Request : GET - /carzones/distance?lat=37.54&lon=127.04&distance=3
+        """
+        CarZone.objects.create(name='far', latitude=37.555, longitude=127.04)
+        CarZone.objects.create(name='near', latitude=37.541, longitude=127.04)
+        CarZone.objects.create(name='middle', latitude=37.548, longitude=127.04)
+        response = self.client.get(f'/carzones/distance?lat=37.54&lon=127.04&distance=3')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(['near', 'middle', 'far'], [entry['name'] for entry in response.data])
+
+    def test_should_refresh_distance_index_when_CarZone_moved(self):
+        """
+        Request : GET - /carzones/distance?lat=37.54&lon=127.04&distance=1
+        인덱스가 만들어진 후 쏘카존 위치가 바뀌어도 바로 반영되는지 확인
+        """
+        zone = CarZone.objects.create(name='zone1', latitude=37.469361, longitude=127.1259747)
+        response = self.client.get(f'/carzones/distance?lat=37.54&lon=127.04&distance=1')
+        self.assertEqual([], response.data)
+
+        zone.latitude, zone.longitude = 37.540323, 127.042847
+        zone.save()
+        response = self.client.get(f'/carzones/distance?lat=37.54&lon=127.04&distance=1')
+        self.assertEqual([zone.id], [entry['id'] for entry in response.data])
+
+        zone.delete()
+        response = self.client.get(f'/carzones/distance?lat=37.54&lon=127.04&distance=1')
+        self.assertEqual([], response.data)
+
+    def test_should_not_list_CarZones_with_wrong_distance(self):
+        """
+        Request : GET - /carzones/distance?lat=37.54&lon=127.04&distance=inf
+        """
+        response = self.client.get(f'/carzones/distance?lat=37.54&lon=127.04&distance=inf')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_should_list_nearest_CarZones_with_distance(self):
+        """
+        Request : GET - /carzones/nearest?lat=37.54&lon=127.04&k=2
+        """
+        CarZone.objects.create(name='far', latitude=37.469361, longitude=127.1259747)
+        CarZone.objects.create(name='near', latitude=37.541, longitude=127.04)
+        CarZone.objects.create(name='middle', latitude=37.548, longitude=127.04)
+        response = self.client.get(f'/carzones/nearest?lat=37.54&lon=127.04&k=2')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(['near', 'middle'], [entry['name'] for entry in response.data])
+        self.assertAlmostEqual(0.111, response.data[0]['distance'], places=2)
+        self.assertAlmostEqual(0.890, response.data[1]['distance'], places=2)
+
+    def test_should_list_nearest_CarZones_from_far_away(self):
+        """
+        Request : GET - /carzones/nearest?lat=35.1&lon=129.0&k=3
+        채워진 격자보다 넓게 찾아야 하는 먼 위치에서도 가까운 순서로 반환
+        """
+        CarZone.objects.all().delete()
+        CarZone.objects.create(name='zone1', latitude=37.469361, longitude=127.1259747)
+        CarZone.objects.create(name='zone2', latitude=37.540323, longitude=127.042847)
+        response = self.client.get(f'/carzones/nearest?lat=35.1&lon=129.0&k=3')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(['zone1', 'zone2'], [entry['name'] for entry in response.data])
+
+    def test_should_not_list_nearest_CarZones_with_wrong_k(self):
+        """
+        Request : GET - /carzones/nearest?lat=37.54&lon=127.04&k=0
+        """
+        response = self.client.get(f'/carzones/nearest?lat=37.54&lon=127.04&k=0')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_should_list_available_CarZones_filter_by_distance(self):
+        """
+        Request : GET - /carzones/distance?lat=37.54&lon=127.04&distance=1
+                        &date_time_start=YYYYMMDD1400&date_time_end=YYYYMMDD1600
+        대여기간에 이용 가능한 차량이 있는 쏘카존만 이용 가능 차량 수와 함께 반환
+        """
+        # 내일 14:00 ~ 16:00 (KST)
+        day = (timezone.now() + datetime.timedelta(days=1)).astimezone(KST).strftime('%Y%m%d')
+        date_time_start = time_format(f'{day}1400')
+        free_zone = CarZone.objects.create(name='free', latitude=37.541, longitude=127.04)
+        busy_zone = CarZone.objects.create(name='busy', latitude=37.542, longitude=127.04)
+        empty_zone = CarZone.objects.create(name='empty', latitude=37.543, longitude=127.04)
+        free_cars = baker.make('cars.Car', zone=free_zone, _quantity=3)
+        busy_car = baker.make('cars.Car', zone=busy_zone)
+        # 대여기간과 겹치는 예약, 겹치지 않는 예약
+        CarTimeTable.objects.create(zone=busy_zone, car=busy_car,
+                                    date_time_start=date_time_start - datetime.timedelta(minutes=30),
+                                    date_time_end=date_time_start + datetime.timedelta(minutes=30))
+        CarTimeTable.objects.create(zone=free_zone, car=free_cars[0],
+                                    date_time_start=date_time_start - datetime.timedelta(minutes=30),
+                                    date_time_end=date_time_start + datetime.timedelta(minutes=30))
+        CarTimeTable.objects.create(zone=free_zone, car=free_cars[1],
+                                    date_time_start=date_time_start + datetime.timedelta(hours=3),
+                                    date_time_end=date_time_start + datetime.timedelta(hours=4))
+
+        response = self.client.get(f'/carzones/distance?lat=37.54&lon=127.04&distance=1'
+                                   f'&date_time_start={day}1400&date_time_end={day}1600')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([free_zone.id], [entry['id'] for entry in response.data])
+        self.assertEqual(2, response.data[0]['free_car_count'])
+        self.assertNotIn(empty_zone.id, [entry['id'] for entry in response.data])
+
+    def test_should_not_list_available_CarZones_with_wrong_date_time(self):
+        """
+        Request : GET - /carzones/distance?lat=37.54&lon=127.04&distance=1
+                        &date_time_start=202010191600&date_time_end=202010191400
+        """
+        response = self.client.get(f'/carzones/distance?lat=37.54&lon=127.04&distance=1'
+                                   f'&date_time_start=202010191600&date_time_end=202010191400')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CarZoneCatalogCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = Member.objects.create(email='test@example.com',
+                                          password='test')
+        self.zones = baker.make('carzones.CarZone', _quantity=2)
+        token = api_settings.JWT_ENCODE_HANDLER(api_settings.JWT_PAYLOAD_HANDLER(self.user))
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {token}')
+
+    def test_should_answer_not_modified_without_queries(self):
+        """
+        Request : GET - /carzones (If-None-Match)
+        """
+        response = self.client.get('/carzones')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/carzones', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(etag, response['ETag'])
+        self.assertEqual(b'', response.content)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                                           'LOCATION': 'django_cache'}})
+    def test_should_answer_not_modified_with_one_cache_table_query_on_default_cache(self):
+        """
+        Request : GET - /carzones (If-None-Match, 기본 설정인 DB 캐시)
+        """
+        call_command('createcachetable', verbosity=0)
+        cache.clear()
+        response = self.client.get('/carzones')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        # 카탈로그 버전을 읽는 캐시 테이블 조회만 있습니다
+        with self.assertNumQueries(1):
+            response = self.client.get('/carzones', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(etag, response['ETag'])
+
+    def test_should_not_answer_not_modified_without_valid_token(self):
+        etag = self.client.get(f'/carzones/{self.zones[0].id}')['ETag']
+
+        self.client.credentials(HTTP_AUTHORIZATION='JWT wrong')
+        response = self.client.get(f'/carzones/{self.zones[0].id}', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_should_serve_cached_CarZones_without_catalog_queries(self):
+        first = self.client.get(f'/carzones/{self.zones[0].id}')
+
+        # 회원 인증 쿼리만 실행합니다
+        with self.assertNumQueries(1):
+            second = self.client.get(f'/carzones/{self.zones[0].id}')
+
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+
+class CarZoneCatalogVersionTestCase(TransactionTestCase):
+    """
+    카탈로그 버전은 commit 후(on_commit)에 바뀌므로 transaction 으로 감싸지 않는 TransactionTestCase 로 확인합니다
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = Member.objects.create(email='test@example.com',
+                                          password='test')
+        self.zones = baker.make('carzones.CarZone', _quantity=2)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        carzone_keyword_index.invalidate()
+
+    def test_should_change_ETag_when_CarZone_saved(self):
+        etag = self.client.get('/carzones')['ETag']
+        self.zones[0].name = '성수역 2번 출구'
+        self.zones[0].save()
+
+        response = self.client.get('/carzones', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(etag, response['ETag'])
+        self.assertIn('성수역 2번 출구', [entry['name'] for entry in response.data['results']])
+
+    def test_should_change_ETag_when_CarZone_deleted(self):
+        etag = self.client.get(f'/carzones/{self.zones[1].id}')['ETag']
+        self.zones[0].delete()
+
+        response = self.client.get(f'/carzones/{self.zones[1].id}', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(etag, response['ETag'])
+
+    def test_should_refresh_keyword_index_when_CarZone_renamed(self):
+        zone = CarZone.objects.create(name='자양동', address='서울 광진구')
+        self.assertEqual([], self.client.get('/carzones?keyword=성수').data['results'])
+
+        zone.name = '성수동'
+        zone.save()
+        response = self.client.get('/carzones?keyword=성수')
+        self.assertEqual([zone.id], [entry['id'] for entry in response.data['results']])
+
+        zone.delete()
+        self.assertEqual([], self.client.get('/carzones?keyword=성수').data['results'])
+
+    def test_should_keep_version_until_commit(self):
+        version = get_catalog_version()
+
+        with transaction.atomic():
+            self.zones[0].name = '성수역 2번 출구'
+            self.zones[0].save()
+            self.assertEqual(version, get_catalog_version())
+
+        self.assertNotEqual(version, get_catalog_version())
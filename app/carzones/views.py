@@ -1,17 +1,29 @@
 # Create your views here.
-from django.db.models import Q
+import math
+from collections import OrderedDict
+
 from rest_framework import mixins, status
 from rest_framework.decorators import action
-from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.response import Response
 
+from .cache import CatalogCacheMixin
+from .indexes import carzone_grid_index, carzone_keyword_index
+from cars.models import Car, CarAvailability
+from cars.serializers import time_table_prefetch
+from core.compiled_serializers import CompiledListMixin
+from core.db_routers import ReplicaReadMixin
+from core.utils import time_format
 from .models import CarZone
-from .serializers import CarZoneSerializer, CarZonePricesSerializer
+from .serializers import CarZoneSerializer, CarZonePricesSerializer, CarZoneDistanceSerializer, \
+    CarZoneAvailabilitySerializer, CarZoneCompiledSerializer
 
 
-class CarZoneViewSet(mixins.RetrieveModelMixin,
+class CarZoneViewSet(CatalogCacheMixin,
+                     CompiledListMixin,
+                     ReplicaReadMixin,
+                     mixins.RetrieveModelMixin,
                      mixins.ListModelMixin,
                      GenericViewSet):
     """
@@ -21,57 +33,139 @@ class CarZoneViewSet(mixins.RetrieveModelMixin,
             [GET] /carzones : 모든 쏘카존 디테일 정보 반환 (리스트)
             [GET] /carzones/123 : 특정 쏘카존 디테일 정보 반환
             [GET] /carzones/?keyword=성수동 : 쏘카존 이름, 주소 검색 기능
+                -> 이름에 포함된 쏘카존, 주소에 포함된 쏘카존 순서로 최대 20개를 목록과 같은 형식으로 반환합니다
+                   (next, previous 는 항상 null)
+            [GET] /carzones/nearest?lat=37.54&lon=127.04&k=10 : 가까운 쏘카존 k개 반환
+        ---
+            목록/상세 응답에는 ETag 가 있습니다. If-None-Match 헤더로 보내면 바뀐 내용이 없을 때 304 를 반환합니다.
     """
     queryset = CarZone.objects.all()
     serializer_class = CarZoneSerializer
+    compiled_serializer_class = CarZoneCompiledSerializer
     permission_classes = [IsAuthenticated, ]
+    replica_actions = ('list', 'retrieve', 'distance', 'nearest', 'info')
+    nearest_default_count = 10
+    nearest_max_count = 50
+    search_max_count = 20
 
     def get_serializer_class(self):
         if self.action == 'info':
             return CarZonePricesSerializer
+        elif self.action == 'nearest':
+            return CarZoneDistanceSerializer
+        elif self.action == 'distance' and self.request.query_params.get('date_time_start'):
+            return CarZoneAvailabilitySerializer
         return super().get_serializer_class()
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        keyword = self.request.query_params.get('keyword')
-        if keyword:
-            queryset = CarZone.objects.filter(Q(address__icontains=keyword) | Q(name__icontains=keyword))
+        if self.action == 'info':
+            # 차량 목록과 기간 내 시간표를 쿼리 한 번씩으로 가져옵니다 (차량 요금은 QuotedCarListSerializer 에서 한 번에 계산)
+            queryset = queryset.prefetch_related('cars', time_table_prefetch(self.request.query_params))
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('keyword'):
+            return self.get_catalog_response(self.search, request, *args, **kwargs)
+        return super().list(request, *args, **kwargs)
+
+    def search(self, request, *args, **kwargs):
+        # 검색어 색인으로 순위를 정한 후 pk 로만 조회합니다
+        zone_ids = carzone_keyword_index.search(request.query_params.get('keyword'), self.search_max_count)
+        zones_by_id = self.get_queryset().in_bulk(zone_ids)
+        zones = [zones_by_id[zone_id] for zone_id in zone_ids if zone_id in zones_by_id]
+
+        serializer = self.get_serializer(zones, many=True)
+        # 순위 순서로 최대 search_max_count 개만 반환하므로 다음 페이지는 없습니다
+        return Response(OrderedDict([('next', None), ('previous', None), ('results', serializer.data)]),
+                        status=status.HTTP_200_OK)
+
     @action(detail=False)
     def distance(self, request, *args, **kwargs):
         """
             기준 위치(위도,경도) 및 거리에 따른 쏘카존 반환
 
                 [GET] /carzones/distance?lat={float}&lon={float}&distance={float}
+                [GET] /carzones/distance?lat={float}&lon={float}&distance={float}
+                                         &date_time_start=202009251400&date_time_end=202009251600
 
                 lat : 위도 (float), 단위: degree
                 lon : 경도 (float), 단위: degree
                 distance : 거리 (float), 단위: km
+                date_time_start / end : (선택) 대여기간, 2020년09월26일14시00분 -> 202009261400 (KST:한국시간기준)
+
+                기준 위치에서 실제 거리(haversine)가 distance 이내인 쏘카존만 가까운 순서로 반환합니다
+                대여기간을 함께 주면 해당 기간에 이용 가능한 차량이 있는 쏘카존만 이용 가능 차량 수(free_car_count)와
+                함께 반환합니다
 
                 값이 없거나 부적절한 값일 경우 모두 400 에러로 반환합니다
         """
-        lat_per_km = 1 / 109.958489129649955
-        lon_per_km = 1 / 88.74
-
         try:
             std_lat = float(request.query_params.get('lat'))
             std_lon = float(request.query_params.get('lon'))
             distance = float(request.query_params.get('distance'))
+            if not all(map(math.isfinite, (std_lat, std_lon, distance))) or distance < 0:
+                raise ValueError
         except Exception as e:
             return Response('lat=float, lon=float, distance=float are required',
                             status=status.HTTP_400_BAD_REQUEST)
 
-        boundary = {
-            'max_lat': std_lat + lat_per_km * distance,
-            'min_lat': std_lat - lat_per_km * distance,
-            'max_lon': std_lon + lon_per_km * distance,
-            'min_lon': std_lon - lon_per_km * distance,
-        }
-        zones = CarZone.objects.filter(latitude__gte=boundary['min_lat'],
-                                       latitude__lte=boundary['max_lat'],
-                                       longitude__gte=boundary['min_lon'],
-                                       longitude__lte=boundary['max_lon'], )
+        date_time_start = request.query_params.get('date_time_start')
+        date_time_end = request.query_params.get('date_time_end')
+        if date_time_start or date_time_end:
+            date_time_start, date_time_end = time_format(date_time_start), time_format(date_time_end)
+            if date_time_start >= date_time_end:
+                return Response('date_time_end must be later than date_time_start',
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        # 공간 인덱스로 반경 내 쏘카존을 가까운 순서로 찾은 뒤 pk 로만 조회합니다
+        zone_ids = [zone_id for zone_id, _ in carzone_grid_index.within(std_lat, std_lon, distance)]
+        if date_time_start:
+            # 차량별 예약 비트맵으로 이용 가능한 차량이 있는 쏘카존만 남깁니다
+            free_car_counts = CarAvailability.free_car_counts(Car.objects.filter(zone_id__in=zone_ids),
+                                                              date_time_start, date_time_end)
+            zone_ids = [zone_id for zone_id in zone_ids if zone_id in free_car_counts]
+        zones_by_id = CarZone.objects.in_bulk(zone_ids)
+        zones = [zones_by_id[zone_id] for zone_id in zone_ids if zone_id in zones_by_id]
+        if date_time_start:
+            for zone in zones:
+                zone.free_car_count = free_car_counts[zone.id]
+
+        serializer = self.get_serializer(zones, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=False)
+    def nearest(self, request, *args, **kwargs):
+        """
+            기준 위치(위도,경도)에서 가장 가까운 쏘카존 k개를 가까운 순서로 반환
+
+                [GET] /carzones/nearest?lat={float}&lon={float}&k={int}
+
+                lat : 위도 (float), 단위: degree
+                lon : 경도 (float), 단위: degree
+                k : 개수 (int), 기본값 10, 최대 50
+
+                각 쏘카존에 기준 위치로부터의 거리(distance, 단위: km)가 함께 반환됩니다
+                값이 없거나 부적절한 값일 경우 모두 400 에러로 반환합니다
+        """
+        try:
+            std_lat = float(request.query_params.get('lat'))
+            std_lon = float(request.query_params.get('lon'))
+            count = int(request.query_params.get('k', self.nearest_default_count))
+            if not all(map(math.isfinite, (std_lat, std_lon))) or not 0 < count <= self.nearest_max_count:
+                raise ValueError
+        except Exception as e:
+            return Response(f'lat=float, lon=float, k=int(1~{self.nearest_max_count}) are required',
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        nearest_zones = carzone_grid_index.nearest(std_lat, std_lon, count)
+        zones_by_id = CarZone.objects.in_bulk([zone_id for zone_id, _ in nearest_zones])
+        zones = []
+        for zone_id, zone_distance in nearest_zones:
+            if zone_id in zones_by_id:
+                zone = zones_by_id[zone_id]
+                zone.distance = round(zone_distance, 3)
+                zones.append(zone)
 
         serializer = self.get_serializer(zones, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -94,7 +188,6 @@ class CarZoneViewSet(mixins.RetrieveModelMixin,
                 사용자가 예약 종료 시점을 언제로 잡을지 모르기 때문에,
                 해당 쏘카존에서 차량별 일단 사용자가 원하는 시작 시점부터 잡혀있는 타임테이블은 모두 반환하게 하였습니다
         """
-        carzone = get_object_or_404(CarZone, id=kwargs.get('pk'))
         try:
             date_time_start = request.query_params.get('date_time_start')
             date_time_end = request.query_params.get('date_time_end')
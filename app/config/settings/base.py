@@ -15,7 +15,7 @@ import datetime
 from pathlib import Path
 
 import sentry_sdk
-from decouple import config
+from decouple import config, Csv
 from sentry_sdk.integrations.django import DjangoIntegration
 
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent.parent
@@ -65,9 +65,9 @@ INSTALLED_APPS = [
     'members.apps.MembersConfig',
     'core.apps.CoreConfig',
     'carzones.apps.CarzonesConfig',
-    'cars',
-    'prices',
-    'events',
+    'cars.apps.CarsConfig',
+    'prices.apps.PricesConfig',
+    'events.apps.EventsConfig',
     'reservations',
     'payments',
 
@@ -89,6 +89,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+
+    'core.db_routers.ReplicaLagMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -120,6 +122,17 @@ DATABASES = {
     }
 }
 
+# 읽기 전용 replica host 목록 (쉼표로 구분), 조회 API 의 읽기 쿼리를 나눠 받습니다 (core/db_routers.py)
+DATABASE_REPLICAS = []
+for index, replica_host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv())):
+    DATABASE_REPLICAS.append(f'replica_{index + 1}')
+    DATABASES[DATABASE_REPLICAS[-1]] = dict(DATABASES['default'], HOST=replica_host, TEST={'MIRROR': 'default'})
+
+DATABASE_ROUTERS = ['core.db_routers.PrimaryReplicaRouter']
+
+# 쓰기 요청 후 이 시간(초) 동안은 그 회원의 조회도 primary 에서 처리 (replica 복제 지연 대비, 0 이면 사용 안 함)
+REPLICA_LAG_FALLBACK_SECONDS = config('REPLICA_LAG_FALLBACK_SECONDS', default=5, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -154,7 +167,7 @@ USE_TZ = True
 AUTH_USER_MODEL = 'members.Member'
 
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': ['rest_framework_jwt.authentication.JSONWebTokenAuthentication'],
+    'DEFAULT_AUTHENTICATION_CLASSES': ['core.authentication.CachedJSONWebTokenAuthentication'],
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
     'DEFAULT_PAGINATION_CLASS': 'core.paginations.Pagination',
     'PAGE_SIZE': 10
@@ -175,3 +188,67 @@ sentry_sdk.init(
     # django.contrib.auth) you may enable sending PII data.
     send_default_pii=True
 )
+
+# 모든 gunicorn worker 가 함께 쓰는 캐시 (쏘카존 카탈로그 버전/응답 등)
+# 기본은 DB 캐시 테이블이고 (python manage.py createcachetable), CACHE_BACKEND / CACHE_LOCATION 으로
+# memcached 등으로 바꿀 수 있습니다. 프로세스별 캐시(LocMemCache)를 쓰면 worker 끼리 변경이 전달되지 않습니다
+# DB 캐시에서는 캐시 조회도 쿼리이므로 쏘카존 304 응답(If-None-Match)에도 캐시 테이블 조회가 1번 있습니다
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('CACHE_LOCATION', default='django_cache'),
+    }
+}
+
+# 쏘카존 공간 인덱스 (carzones/indexes.py)
+# 격자 한 칸 크기(degree, 약 1km)와 다른 프로세스의 변경을 반영하기 위한 전체 재구성 주기(초)
+CARZONE_INDEX_CELL_DEGREE = 0.01
+CARZONE_INDEX_TTL = 60
+
+# 쏘카존 목록/상세 응답 캐시 (carzones/cache.py)
+# 카탈로그 버전이 바뀌지 않아도 응답을 다시 만드는 주기(초)와 카탈로그 버전 자체의 유지 시간(초)
+CARZONE_CATALOG_CACHE_TTL = 300
+CARZONE_CATALOG_VERSION_TTL = 24 * 60 * 60
+
+# 견적 캐시 (prices/cache.py)
+# 프로세스당 최대 견적 수와 다른 프로세스의 요금 변경을 반영하기 위한 만료 시간(초)
+QUOTE_CACHE_MAX_SIZE = 10000
+QUOTE_CACHE_TTL = 300
+
+# Idempotency-Key 저장 기간(초) (core/idempotency.py)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# JWT 인증 회원/Profile 캐시 유지 시간(초), 0 이면 매 요청마다 DB 에서 읽음 (core/authentication.py)
+# CACHE_BACKEND 가 memcached, redis 일 때만 켭니다 (DB 캐시는 회원 조회만큼 쿼리가 들고, 프로세스 캐시는 worker 간 무효화가 안 됨)
+AUTH_MEMBER_CACHE_TTL = config('AUTH_MEMBER_CACHE_TTL', default=0, cast=int)
+
+# SENS SMS 발송 (members/sms.py)
+SENS_SMS_URL = config('SENS_SMS_URL', default='https://sens.apigw.ntruss.com')
+SENS_SMS_SERVICE_ID = config('SENS_SMS_SERVICE_ID', default='ncp:sms:kr:260483911484:sofastcar_sms')
+SENS_SMS_ACCESS_KEY = config('SENS_SMS_ACCESS_KEY')
+SENS_SMS_SECRET_KEY = config('SENS_SMS_SECRET_KEY')
+SENS_SMS_FROM = config('SENS_SMS_FROM', default='01047340350')
+# 게이트웨이 요청 제한 시간(초)
+SENS_SMS_TIMEOUT = 5
+
+# SMS 발송 대기열 (send_sms_outbox 명령)
+# 한 번의 요청으로 보내는 최대 문자 수(SENS 최대 100), 최대 발송 시도 횟수, 재시도 대기 시간(초, 실패할 때마다 두 배)
+SMS_OUTBOX_BATCH_SIZE = 100
+SMS_OUTBOX_MAX_ATTEMPTS = 5
+SMS_OUTBOX_RETRY_SECONDS = 10
+
+# 탑승전 사진을 storage 에 동시에 저장하는 프로세스당 thread 수 (reservations/uploads.py)
+PHOTO_UPLOAD_WORKERS = 4
+
+# 이미지 변형(썸네일, WebP) 크기와 process pool 크기 (core/images.py)
+# {변형 이름: 긴 변의 최대 픽셀}, 원본 옆에 <이름>.<변형>.webp / .jpg 로 저장합니다
+IMAGE_VARIANT_SIZES = {'thumbnail': 200, 'medium': 640}
+IMAGE_VARIANT_WORKERS = 2
+IMAGE_VARIANTS_ASYNC = True
+
+# 목록 API 를 .values() 행으로 바로 직렬화 (core/compiled_serializers.py), False 이면 DRF serializer 를 씁니다
+COMPILED_SERIALIZERS = True
+
+# 결제 전 임시 예약(hold) 유지 시간(분) 기본값과 최대값 (reservations/services.py)
+CAR_HOLD_MINUTES = 10
+CAR_HOLD_MAX_MINUTES = 15
@@ -9,3 +9,13 @@ DEFAULT_FILE_STORAGE = 'inmemorystorage.InMemoryStorage'
 PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.MD5PasswordHasher',
 ]
+
+# replica 라우팅 테스트용 (default 와 같은 DB, 테스트에서 DATABASE_REPLICAS 로 켭니다)
+DATABASES['replica'] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+
+# 테스트는 한 프로세스에서 실행되므로 프로세스 캐시를 씁니다 (쿼리 수 확인에 캐시 쿼리가 섞이지 않도록)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
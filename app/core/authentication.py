@@ -0,0 +1,112 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext as _
+from rest_framework import exceptions
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication, jwt_get_username_from_payload
+
+
+def member_cache_key(email):
+    # email 은 memcached 키 길이 제한(250자)을 넘을 수 있으므로 해시로 바꿉니다
+    return f'auth_member:{hashlib.sha1(email.encode()).hexdigest()}'
+
+
+def invalidate_member(email):
+    """
+    저장한 transaction 안에서 바로 지우고, commit 전에 다른 요청이 이전 값으로 다시 캐시한 경우를 위해 commit 후 한 번 더 지웁니다
+    """
+    key = member_cache_key(email)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+    auth_cache_stats.count('invalidations')
+
+
+def dump_instance(instance):
+    return {field.attname: field.get_prep_value(field.value_from_object(instance))
+            for field in instance._meta.concrete_fields}
+
+
+def load_instance(model, values):
+    return model.from_db(DEFAULT_DB_ALIAS, list(values), list(values.values()))
+
+
+class AuthCacheStats:
+    """
+    프로세스별 인증 캐시 적중 횟수, 적중한 요청마다 회원 조회 쿼리 1개(+ profile 조회)를 줄입니다
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def clear(self):
+        with self._lock:
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'ttl': getattr(settings, 'AUTH_MEMBER_CACHE_TTL', 0),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'saved_queries': self.hits,
+                'invalidations': self.invalidations,
+            }
+
+
+auth_cache_stats = AuthCacheStats()
+
+
+class CachedJSONWebTokenAuthentication(JSONWebTokenAuthentication):
+    """
+    JWT 로 확인한 회원(Member)과 Profile 을 AUTH_MEMBER_CACHE_TTL 초 동안 캐시하는 인증 클래스
+
+        - 토큰 검증은 rest_framework_jwt 와 같고, 캐시가 없을 때만 회원과 Profile 을 한 번의 join 쿼리로 읽습니다
+        - 회원 저장(비밀번호 변경 등), 삭제와 Profile 저장시 signal 로 캐시를 지웁니다 (members/signals.py)
+        - 크레딧 잔액처럼 자주 바뀌는 값은 request.user.profile 이 아니라 DB 에서 읽어야 합니다
+        - 모든 worker 에서 무효화되도록 CACHES 가 공유 캐시(redis, memcached 등)일 때만 켭니다 (기본값 0, 꺼짐)
+    """
+
+    def authenticate_credentials(self, payload):
+        # DEFAULT_AUTHENTICATION_CLASSES 는 model 보다 먼저 import 될 수 있습니다
+        from members.models import Member, Profile
+
+        ttl = getattr(settings, 'AUTH_MEMBER_CACHE_TTL', 0)
+        username = jwt_get_username_from_payload(payload)
+        if not ttl or not username:
+            return super().authenticate_credentials(payload)
+
+        key = member_cache_key(username)
+        snapshot = cache.get(key)
+        # 테스트 등에서 같은 email 로 다시 가입한 회원의 캐시를 쓰지 않도록 토큰의 user_id 와 비교합니다
+        if snapshot is not None and snapshot['member']['id'] == payload.get('user_id'):
+            auth_cache_stats.count('hits')
+            member = load_instance(Member, snapshot['member'])
+            if snapshot['profile'] is not None:
+                member.profile = load_instance(Profile, snapshot['profile'])
+        else:
+            auth_cache_stats.count('misses')
+            try:
+                member = Member.objects.select_related('profile').get(email=username)
+            except Member.DoesNotExist:
+                msg = _('Invalid signature.')
+                raise exceptions.AuthenticationFailed(msg)
+            profile = getattr(member, 'profile', None)
+            cache.set(key, {'member': dump_instance(member),
+                            'profile': dump_instance(profile) if profile is not None else None}, ttl)
+
+        if not member.is_active:
+            msg = _('User account is disabled.')
+            raise exceptions.AuthenticationFailed(msg)
+        return member
@@ -0,0 +1,35 @@
+import contextlib
+import time
+
+from django.db import connection
+
+
+@contextlib.contextmanager
+def benchmark_database(verbosity=0):
+    """
+    벤치마크용 임시 DB (테스트 DB 와 같은 방식으로 만들고 끝나면 삭제합니다)
+
+        운영 데이터에 영향 없이 대량의 데이터를 커밋된 상태로 넣고 통계(ANALYZE)까지 반영하기 위해 사용합니다
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, keepdb=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity, keepdb=False)
+
+
+def analyze(*models):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE ' + ', '.join(model._meta.db_table for model in models))
+
+
+def timed(func, arguments):
+    """
+    arguments 각각으로 func 를 호출하고 (결과 목록, 1회당 평균 ms) 반환
+    """
+    started = time.perf_counter()
+    results = [func(*argument) for argument in arguments]
+    elapsed = time.perf_counter() - started
+    return results, elapsed / max(len(arguments), 1) * 1000
@@ -0,0 +1,219 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from core.images import ImageVariantsField, variant_urls, variants_field_name
+
+
+def get_model_field(field):
+    return field.parent.Meta.model._meta.get_field(field.source_attrs[0])
+
+
+def compile_value(column, convert):
+    def factory(serializer):
+        def getter(row):
+            value = row[column]
+            # ModelSerializer 와 같이 None 은 변환하지 않습니다
+            return None if value is None else convert(value)
+        return getter
+    return factory
+
+
+def compile_datetime(column, field):
+    def factory(serializer):
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        # field 에 timezone 이 없으면 요청 시점의 현재 timezone 을 씁니다 (DRF enforce_timezone 과 같음)
+        field_timezone = getattr(field, 'timezone', field.default_timezone())
+        if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+            return compile_value(column, field.to_representation)(serializer)
+
+        def getter(row):
+            value = row[column]
+            if not value:
+                return None
+            value = value.astimezone(field_timezone).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return getter
+    return factory
+
+
+def compile_file(column, field):
+    storage = get_model_field(field).storage
+
+    def factory(serializer):
+        request = serializer.context.get('request', None)
+
+        def getter(row):
+            name = row[column]
+            if not name:
+                return None
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+        return getter
+
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        return compile_value(column, str)
+    return factory
+
+
+def compile_image_variants(column, variants_column, field):
+    storage = get_model_field(field).storage
+
+    def factory(serializer):
+        request = serializer.context.get('request', None)
+
+        def getter(row):
+            name = row[column]
+            return variant_urls(storage, name, request) if name and row[variants_column] == name else None
+        return getter
+    return factory
+
+
+def compile_choice(column, field):
+    choices = field.choice_strings_to_values
+
+    def convert(value):
+        if value == '':
+            return value
+        return choices.get(str(value), value)
+    return compile_value(column, convert)
+
+
+def compile_field(field):
+    """
+    DRF field 하나를 (.values() 컬럼 목록, getter factory) 로 바꿈
+
+        to_representation 을 그대로 옮길 수 있는 단순 field 만 지원하고, 나머지는 compile_<필드명> 으로 정의해야 합니다
+    """
+    if field.source == '*' or getattr(field, 'many', False) or len(field.source_attrs) != 1:
+        raise ImproperlyConfigured(f'{field.field_name}: compile_{field.field_name} 를 정의해야 합니다')
+    column = field.source_attrs[0]
+
+    if isinstance(field, ImageVariantsField):
+        variants_column = variants_field_name(column)
+        return [column, variants_column], compile_image_variants(column, variants_column, field)
+    elif isinstance(field, serializers.FileField):
+        return [column], compile_file(column, field)
+    elif isinstance(field, serializers.DateTimeField):
+        return [column], compile_datetime(column, field)
+    elif isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        # .values('zone') 는 zone_id 를 반환합니다
+        return [column], compile_value(column, lambda value: value)
+    elif isinstance(field, serializers.ChoiceField):
+        return [column], compile_choice(column, field)
+    elif type(field) in (serializers.CharField, serializers.EmailField):
+        return [column], compile_value(column, str)
+    elif type(field) in (serializers.IntegerField, serializers.BooleanField, serializers.FloatField):
+        return [column], compile_value(column, {serializers.IntegerField: int,
+                                                serializers.BooleanField: bool,
+                                                serializers.FloatField: float}[type(field)])
+    elif type(field) is serializers.ReadOnlyField:
+        return [column], compile_value(column, lambda value: value)
+    raise ImproperlyConfigured(f'{field.field_name}: {type(field).__name__} 는 compile_{field.field_name} 를 '
+                               f'정의해야 합니다')
+
+
+def compile_nested(field, compiled_class):
+    """
+    read-only nested serializer (forward FK, reverse one-to-one) 를 join 한 컬럼으로 직렬화
+
+        연결된 객체가 없으면 DRF 와 같이 None 입니다
+    """
+    model_field = get_model_field(field)
+    prefix = field.source_attrs[0] + '__'
+    pk_column = model_field.related_model._meta.pk.attname
+    columns = list(dict.fromkeys([pk_column] + compiled_class.get_columns()))
+
+    def factory(serializer):
+        nested = compiled_class(serializer.context)
+
+        def getter(row):
+            if row[prefix + pk_column] is None:
+                return None
+            return nested.to_row({column: row[prefix + column] for column in columns})
+        return getter
+    return [prefix + column for column in columns], factory
+
+
+class CompiledSerializer:
+    """
+    모든 필드가 read-only 인 ModelSerializer 와 같은 결과를 .values() 행(dict)으로 바로 만드는 직렬화
+
+        - 필드별 컬럼과 변환 함수는 serializer_class 의 필드로 클래스마다 한 번만 만듭니다
+        - model instance 와 field 객체를 행마다 만들지 않으므로 목록 API 의 행당 비용이 줄어듭니다
+        - 단순 field 가 아닌 필드(SerializerMethodField, nested 등)는 compile_<필드명> classmethod 로 정의하고,
+          여러 행을 한 번에 조회해야 하면 prepare 에서 미리 가져옵니다
+        - 결과 JSON 은 serializer_class 와 같아야 합니다 (core/tests.py, bench_compiled_serializers 에서 비교)
+    """
+    serializer_class = None
+
+    def __init__(self, context=None):
+        self.context = context if context is not None else {}
+        self._getters = None
+
+    @classmethod
+    def get_plan(cls):
+        # [(필드명, 컬럼 목록, getter factory)], 상속한 클래스와 함께 쓰지 않도록 cls.__dict__ 에 둡니다
+        if '_plan' not in cls.__dict__:
+            plan = []
+            for name, field in cls.serializer_class().fields.items():
+                if field.write_only:
+                    continue
+                compile_hook = getattr(cls, f'compile_{name}', None)
+                columns, factory = compile_hook(field) if compile_hook else compile_field(field)
+                plan.append((name, columns, factory))
+            cls._plan = plan
+        return cls._plan
+
+    @classmethod
+    def get_columns(cls):
+        return list(dict.fromkeys(column for _, columns, _ in cls.get_plan() for column in columns))
+
+    @classmethod
+    def values(cls, queryset):
+        # prefetch 는 instance 에만 쓸 수 있으므로 지우고, 필요한 조회는 prepare 에서 합니다
+        return queryset.prefetch_related(None).values(*cls.get_columns())
+
+    @property
+    def getters(self):
+        if self._getters is None:
+            self._getters = [(name, factory(self)) for name, _, factory in self.get_plan()]
+        return self._getters
+
+    def prepare(self, rows):
+        pass
+
+    def to_row(self, row):
+        return {name: getter(row) for name, getter in self.getters}
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        self.prepare(rows)
+        getters = self.getters
+        return [{name: getter(row) for name, getter in getters} for row in rows]
+
+
+class CompiledListMixin:
+    """
+    list 를 compiled_serializer_class 로 직렬화하는 ViewSet mixin
+
+        필터, cursor pagination 은 그대로 쓰고 queryset 만 .values() 로 바꿉니다
+        COMPILED_SERIALIZERS = False 이면 serializer_class 로 직렬화합니다
+    """
+    compiled_serializer_class = None
+    compiled_actions = ('list',)
+
+    def list(self, request, *args, **kwargs):
+        # history 처럼 list 를 다시 쓰는 action 은 serializer_class 로 직렬화합니다
+        if self.compiled_serializer_class is None or self.action not in self.compiled_actions \
+                or not getattr(settings, 'COMPILED_SERIALIZERS', True):
+            return super().list(request, *args, **kwargs)
+
+        compiled = self.compiled_serializer_class(self.get_serializer_context())
+        queryset = compiled.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(compiled.to_representation(page))
+        return Response(compiled.to_representation(queryset))
@@ -0,0 +1,107 @@
+import contextlib
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+_state = threading.local()
+
+
+def replica_lag_cache_key(member_id):
+    return f'replica_lag:{member_id}'
+
+
+@contextlib.contextmanager
+def use_replica():
+    """
+    이 안에서의 읽기 쿼리는 DATABASE_REPLICAS 중 하나로 보냄 (replica 가 없으면 default)
+    """
+    previous = getattr(_state, 'use_replica', False)
+    _state.use_replica = True
+    try:
+        yield
+    finally:
+        _state.use_replica = previous
+
+
+class PrimaryReplicaRouter:
+    """
+    읽기 전용 replica 로 읽기 쿼리를 나누는 database router
+
+        - use_replica() 안의 읽기 쿼리만 replica 로 보내고, 나머지는 모두 primary(default)에서 처리합니다
+        - primary 의 transaction 안(예약, 결제 등)에서는 use_replica() 안이라도 primary 에서 읽습니다
+        - 쓰기와 migration 은 primary 에서만 처리합니다
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'django_cache':
+            # DB 캐시(CACHES)는 worker 끼리 바로 보여야 하므로 항상 primary 에서 읽습니다
+            return DEFAULT_DB_ALIAS
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas or not getattr(_state, 'use_replica', False):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replica 는 primary 와 같은 데이터이므로 어느 DB 에서 읽은 객체끼리도 관계를 맺을 수 있습니다
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    """
+    replica_actions 의 조회(GET, HEAD, OPTIONS) 요청을 replica 에서 읽는 ViewSet mixin
+
+        - 인증과 권한 확인은 primary 에서 하고, 그 이후의 조회 쿼리만 replica 로 보냅니다
+        - 회원이 쓰기 요청을 한 뒤 REPLICA_LAG_FALLBACK_SECONDS 초 동안은 복제 지연으로 방금 저장한 데이터가
+          안 보이지 않도록 그 회원의 조회도 primary 에서 처리합니다 (ReplicaLagMiddleware)
+    """
+    replica_actions = ('list', 'retrieve')
+
+    def dispatch(self, request, *args, **kwargs):
+        previous = getattr(_state, 'use_replica', False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _state.use_replica = previous
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        _state.use_replica = self.should_read_from_replica(request)
+
+    def should_read_from_replica(self, request):
+        if request.method not in SAFE_METHODS or self.action not in self.replica_actions:
+            return False
+        lag = getattr(settings, 'REPLICA_LAG_FALLBACK_SECONDS', 0)
+        return not (lag and request.user.is_authenticated and cache.get(replica_lag_cache_key(request.user.id)))
+
+
+class ReplicaLagMiddleware:
+    """
+    쓰기 요청에 성공한 회원을 REPLICA_LAG_FALLBACK_SECONDS 초 동안 primary 에서 읽도록 기록
+
+        기본 CACHES(DB 캐시, primary 에서 읽음)는 모든 worker 가 함께 보므로 다른 worker 의 조회도 primary 로 갑니다
+        (CACHE_BACKEND 를 바꿀 때도 프로세스 캐시가 아닌 공유 캐시여야 합니다)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        lag = getattr(settings, 'REPLICA_LAG_FALLBACK_SECONDS', 0)
+        user = getattr(request, 'user', None)
+        if lag and request.method not in SAFE_METHODS and response.status_code < 400 \
+                and user is not None and user.is_authenticated:
+            cache.set(replica_lag_cache_key(user.id), True, lag)
+        return response
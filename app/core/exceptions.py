@@ -54,6 +54,12 @@ class ShortCreditException(APIException):
     default_code = 'ShortCredit'
 
 
+class TooManyCouponsException(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = '쿠폰은 하나의 예약에 한개만 사용 가능합니다.'
+    default_code = 'TooManyCoupons'
+
+
 class AlreadyReservedTimeException(APIException):
     status_code = status.HTTP_400_BAD_REQUEST
     default_detail = '해당 이용시간대는 사용 불가능합니다.'
@@ -82,3 +88,26 @@ class NotInTenMinutesException(APIException):
     status_code = status.HTTP_400_BAD_REQUEST
     default_detail = '10분 단위여야 합니다.'
     default_code = 'NotInTenMinutes'
+
+
+class NotValidIdempotencyKeyException(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = 'Idempotency-Key 는 1자 이상 255자 이하여야 합니다.'
+    default_code = 'NotValidIdempotencyKey'
+
+
+class IdempotencyKeyReusedException(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = '이미 다른 요청에 사용된 Idempotency-Key 입니다.'
+    default_code = 'IdempotencyKeyReused'
+
+
+class NotModifiedException(APIException):
+    # If-None-Match 의 ETag 가 현재 응답과 같을 때, 응답 본문 없이 304 를 반환합니다
+    status_code = status.HTTP_304_NOT_MODIFIED
+    default_detail = '변경된 내용이 없습니다.'
+    default_code = 'NotModified'
+
+    def __init__(self, etag):
+        super().__init__()
+        self.etag = etag
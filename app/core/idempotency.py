@@ -0,0 +1,71 @@
+import datetime
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+from rest_framework.response import Response
+
+from core.exceptions import IdempotencyKeyReusedException, NotValidIdempotencyKeyException
+from core.models import IdempotencyKey
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+IDEMPOTENT_REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+class IdempotentCreateMixin:
+    """
+    Idempotency-Key 헤더가 있는 생성(POST) 요청을 한 번만 처리하는 ViewSet mixin
+
+        - 처음 들어온 키는 생성 처리와 같은 transaction 에서 (회원, 키) unique 인덱스에 기록하고 응답을 저장합니다
+        - 같은 키로 다시 들어온 요청은 검증, 요금 계산, 저장을 다시 하지 않고 저장된 응답을 돌려줍니다
+        - 동시에 같은 키로 들어온 요청은 unique 인덱스에서 먼저 들어온 요청이 끝날 때까지 기다린 후 그 응답을 받습니다
+        - 처리 중 오류가 나면 키도 함께 rollback 되므로 같은 키로 다시 시도할 수 있습니다
+        - 같은 키를 다른 경로나 본문에 다시 쓰면 422 를 반환합니다
+    """
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if key is None:
+            return super().create(request, *args, **kwargs)
+        if not key or len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            raise NotValidIdempotencyKeyException
+
+        fingerprint = self.get_request_fingerprint(request)
+        with transaction.atomic():
+            record = self._find_idempotency_key(request.user, key)
+            if record is None:
+                try:
+                    with transaction.atomic():
+                        record = IdempotencyKey.objects.create(
+                            member=request.user, key=key, fingerprint=fingerprint,
+                            expires_at=timezone.now() + datetime.timedelta(
+                                seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)))
+                except IntegrityError:
+                    # 같은 키로 먼저 들어온 요청이 방금 끝났습니다
+                    record = self._find_idempotency_key(request.user, key)
+                else:
+                    response = super().create(request, *args, **kwargs)
+                    record.status_code = response.status_code
+                    record.response = response.data
+                    record.save(update_fields=['status_code', 'response'])
+                    return response
+
+        if record.fingerprint != fingerprint:
+            raise IdempotencyKeyReusedException
+        return Response(record.response, status=record.status_code, headers={IDEMPOTENT_REPLAYED_HEADER: 'true'})
+
+    @staticmethod
+    def _find_idempotency_key(member, key):
+        record = IdempotencyKey.objects.filter(member=member, key=key).first()
+        if record is not None and record.expires_at <= timezone.now():
+            record.delete()
+            return None
+        return record
+
+    @staticmethod
+    def get_request_fingerprint(request):
+        data = request.data.dict() if hasattr(request.data, 'dict') else request.data
+        payload = json.dumps([request.path, data], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
@@ -0,0 +1,200 @@
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# 변형 이미지 확장자별 Pillow 저장 형식
+VARIANT_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_variant_sizes():
+    # {변형 이름: 긴 변의 최대 픽셀}
+    return getattr(settings, 'IMAGE_VARIANT_SIZES', {'thumbnail': 200, 'medium': 640})
+
+
+def get_pool(kind):
+    """
+    이미지 변환용 process pool 과 storage 입출력용 thread pool (프로세스당 하나씩, 처음 쓸 때 만듭니다)
+
+        gunicorn worker 는 여러 thread 가 DB 연결, lock 을 가진 상태이므로 fork 하지 않고
+        forkserver 로 새로 시작한 프로세스에서 변환합니다
+    """
+    with _pools_lock:
+        if kind not in _pools:
+            workers = getattr(settings, 'IMAGE_VARIANT_WORKERS', 2)
+            if kind == 'process':
+                _pools[kind] = ProcessPoolExecutor(max_workers=workers,
+                                                   mp_context=multiprocessing.get_context('forkserver'))
+            else:
+                _pools[kind] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-variant')
+        return _pools[kind]
+
+
+def variants_field_name(field_name):
+    # 변형 이미지를 만든 원본 이름을 저장하는 model field, image -> image_variants_name
+    return f'{field_name}_variants_name'
+
+
+def variant_name(name, variant, extension):
+    """
+    원본 옆에 저장하는 변형 이미지 이름, CarImages/abc.png -> CarImages/abc.thumbnail.webp
+    """
+    root, _ = os.path.splitext(name)
+    return f'{root}.{variant}.{extension}'
+
+
+def variant_names(name):
+    return {variant: {extension: variant_name(name, variant, extension) for extension in VARIANT_FORMATS}
+            for variant in get_variant_sizes()}
+
+
+def variant_urls(storage, name, request=None):
+    # request 가 있으면 절대 URL 로 반환합니다 (DRF ImageField 와 같은 방식)
+    urls = {}
+    for variant, names in variant_names(name).items():
+        urls[variant] = {}
+        for extension, target in names.items():
+            url = storage.url(target)
+            urls[variant][extension] = request.build_absolute_uri(url) if request is not None else url
+    return urls
+
+
+def render_variants(data, sizes):
+    """
+    원본 이미지 bytes 로 크기별 WebP / JPEG 이미지를 만듦 (process pool 에서 실행되므로 Django 를 쓰지 않습니다)
+
+    return : {(변형 이름, 확장자): bytes}
+    """
+    original = Image.open(io.BytesIO(data))
+    original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+    rendered = {}
+    for variant, size in sizes.items():
+        image = original.copy()
+        image.thumbnail((size, size), Image.LANCZOS)
+        for extension, image_format in VARIANT_FORMATS.items():
+            output = io.BytesIO()
+            if image_format == 'JPEG' and image.mode != 'RGB':
+                image.convert('RGB').save(output, image_format, quality=85, optimize=True)
+            else:
+                image.save(output, image_format, quality=80)
+            rendered[(variant, extension)] = output.getvalue()
+    return rendered
+
+
+def generate_variants(storage, name, force=False):
+    """
+    storage 의 원본 이미지로 변형 이미지를 만들어 원본 옆에 저장하고, 저장한 이름 목록을 반환
+
+        - 이미 변형 이미지가 있으면 force 가 아닌 한 다시 만들지 않습니다
+        - Pillow 변환은 process pool 에서 처리하고, 이 함수는 그 결과를 기다립니다
+    """
+    names = variant_names(name)
+    sizes = get_variant_sizes()
+    if not force and all(storage.exists(variant_name(name, variant, 'webp')) for variant in sizes):
+        return []
+
+    with storage.open(name, 'rb') as original:
+        data = original.read()
+    rendered = get_pool('process').submit(render_variants, data, sizes).result()
+
+    saved = []
+    for (variant, extension), content in rendered.items():
+        target = names[variant][extension]
+        if storage.exists(target):
+            storage.delete(target)
+        saved.append(storage.save(target, ContentFile(content)))
+    return saved
+
+
+def generate_variants_safely(storage, name, force=False):
+    # 실패하면 None 을 반환합니다
+    try:
+        return generate_variants(storage, name, force)
+    except Exception:
+        # 원본이 없거나 이미지가 아니면 원본만 보여주므로 기록만 남깁니다
+        logger.exception('image variants failed: %s', name)
+        return None
+
+
+def build_variants(model, pk, field_name, storage, name):
+    """
+    변형 이미지를 만들고, 성공하면 instance 의 <field>_variants_name 에 원본 이름을 저장
+
+        그 사이 다른 이미지로 바뀌었으면 저장하지 않습니다
+        post_save signal(쏘카존 카탈로그 버전 등)이 실행되도록 save(update_fields=...) 로 저장합니다
+    """
+    if generate_variants_safely(storage, name) is None:
+        return
+    instance = model._default_manager.filter(pk=pk, **{field_name: name}).first()
+    if instance is not None:
+        setattr(instance, variants_field_name(field_name), name)
+        instance.save(update_fields=[variants_field_name(field_name)])
+
+
+def build_variants_in_thread(*args):
+    try:
+        build_variants(*args)
+    finally:
+        # thread pool 의 thread 는 요청 처리가 아니므로 Django 가 DB 연결을 닫아주지 않습니다
+        connection.close()
+
+
+def schedule_variants(field_file):
+    """
+    transaction 이 커밋된 후 변형 이미지를 만듦
+
+        IMAGE_VARIANTS_ASYNC 이면 thread pool 에 넘기고 바로 반환하므로 요청 처리 시간에 포함되지 않습니다
+    """
+    if not field_file:
+        return
+    args = (type(field_file.instance), field_file.instance.pk, field_file.field.name,
+            field_file.storage, field_file.name)
+
+    def run():
+        if getattr(settings, 'IMAGE_VARIANTS_ASYNC', True):
+            get_pool('thread').submit(build_variants_in_thread, *args)
+        else:
+            build_variants(*args)
+
+    transaction.on_commit(run)
+
+
+def schedule_variants_on_save(sender, instance, update_fields=None, **kwargs):
+    # post_save receiver, image 를 저장하지 않은 save(update_fields=...) 는 건너뜁니다
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    schedule_variants(instance.image)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    이미지 필드의 크기별 변형 이미지 URL, {'thumbnail': {'webp': url, 'jpg': url}, 'medium': {...}}
+
+        변형 이미지는 저장 후 따로 만들어지므로, 만들어진 것이 확인될 때까지(<field>_variants_name 이 원본 이름과 같을 때까지)
+        None 이고 클라이언트는 원본(image)을 사용합니다
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'image')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value or getattr(value.instance, variants_field_name(value.field.name), None) != value.name:
+            return None
+        return variant_urls(value.storage, value.name, self.context.get('request', None))
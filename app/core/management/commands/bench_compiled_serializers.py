@@ -0,0 +1,111 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from cars.models import Car, CarTimeTable
+from cars.serializers import CarSerializer, CarCompiledSerializer, time_table_prefetch
+from carzones.models import CarZone
+from carzones.serializers import CarZoneSerializer, CarZoneCompiledSerializer
+from core.benchmarks import benchmark_database, analyze, timed
+from members.models import Member
+from prices.models import CarPrice, Coupon, InsuranceFee
+from prices.serializers import CouponSerializer, CouponCompiledSerializer
+from reservations.models import Reservation
+from reservations.serializers import ReservationHistorySerializer, ReservationHistoryCompiledSerializer
+
+
+class Command(BaseCommand):
+    help = '목록 API 의 DRF serializer 와 compiled serializer 행당 직렬화 비용 비교 (임시 DB 에서 실행됩니다)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with benchmark_database(), override_settings(ALLOWED_HOSTS=['testserver']):
+            member, zone = self.seed(options['rows'])
+            self.run(member, zone, options['rows'], options['repeat'])
+
+    def seed(self, rows):
+        zones = CarZone.objects.bulk_create([
+            CarZone(name=f'bench-{index}', address='bench', latitude=37.5, longitude=127.0,
+                    image=f'CarZoneImages/bench-{index}.png' if index % 2 else None,
+                    image_variants_name=f'CarZoneImages/bench-{index}.png' if index % 4 == 1 else '')
+            for index in range(rows)
+        ])
+        zone = zones[0]
+        cars = Car.objects.bulk_create([
+            Car(zone=zone, number=f'bench-{index}', name='bench', manufacturer=Car.ChoiceManufacturer.KIA,
+                riding_capacity=5, is_event_model=False, image=f'CarImages/bench-{index}.png',
+                image_variants_name=f'CarImages/bench-{index}.png' if index % 2 else '')
+            for index in range(rows)
+        ])
+        CarPrice.objects.bulk_create([CarPrice(car=car, standard_price=1000, weekday_price_per_ten_min=10,
+                                               weekend_price_per_ten_min=15) for car in cars])
+        InsuranceFee.objects.bulk_create([InsuranceFee(car=car, light_price=100, light_price_per_ten_min=10)
+                                          for car in cars])
+        # 조회 기간(2020-09-27 ~ 28 KST) 안의 시간표 차량당 2개
+        first = datetime.datetime(2020, 9, 26, 16, 0, tzinfo=datetime.timezone.utc)
+        CarTimeTable.objects.bulk_create([
+            CarTimeTable(car=car, zone=zone, date_time_start=first + datetime.timedelta(hours=hours),
+                         date_time_end=first + datetime.timedelta(hours=hours + 1))
+            for car in cars for hours in (0, 10)
+        ])
+
+        member = Member.objects.create(email='bench@example.com', password='bench')
+        start = timezone.now() + datetime.timedelta(days=1)
+        Reservation.objects.bulk_create([
+            Reservation(member=member, zone=zone, car=cars[index],
+                        date_time_start=start + datetime.timedelta(hours=index),
+                        date_time_end=start + datetime.timedelta(hours=index, minutes=30))
+            for index in range(rows)
+        ])
+        Coupon.objects.bulk_create([
+            Coupon(member=member, date_time_start=start - datetime.timedelta(days=index % 3),
+                   expire_date_time=start + datetime.timedelta(days=index % 5), title='bench')
+            for index in range(rows)
+        ])
+        analyze(CarZone, Car, CarPrice, InsuranceFee, CarTimeTable, Reservation, Coupon)
+        self.stdout.write(f'seeded {rows} rows per endpoint')
+        return member, zone
+
+    def run(self, member, zone, rows, repeat):
+        request = Request(APIRequestFactory().get('/', {'date_time_start': '202009261400',
+                                                        'date_time_end': '202009281600'}))
+        renderer = JSONRenderer()
+
+        def drf(serializer_class, get_queryset):
+            return lambda: serializer_class(get_queryset(), many=True, context={'request': request}).data
+
+        def compiled(compiled_class, get_queryset):
+            def serialize():
+                serializer = compiled_class({'request': request})
+                return serializer.to_representation(serializer.values(get_queryset()))
+            return serialize
+
+        cases = [
+            ('carzones', CarZoneSerializer, CarZoneCompiledSerializer, lambda: CarZone.objects.order_by('id')),
+            ('cars', CarSerializer, CarCompiledSerializer,
+             lambda: Car.objects.filter(zone=zone).order_by('id').select_related('carprice')
+             .prefetch_related(time_table_prefetch(request.query_params))),
+            ('reservations', ReservationHistorySerializer, ReservationHistoryCompiledSerializer,
+             lambda: Reservation.objects.filter(member=member).order_by('id')),
+            ('coupons', CouponSerializer, CouponCompiledSerializer,
+             lambda: Coupon.objects.filter(member=member).order_by('id')),
+        ]
+        # 쿼리와 JSON 렌더링까지 포함한 행당 비용입니다
+        for name, serializer_class, compiled_class, get_queryset in cases:
+            results = {}
+            for label, serialize in (('drf', drf(serializer_class, get_queryset)),
+                                     ('compiled', compiled(compiled_class, get_queryset))):
+                rendered, elapsed = timed(lambda: renderer.render(serialize()), [()] * repeat)
+                results[label] = (rendered[0], elapsed / rows)
+            assert results['drf'][0] == results['compiled'][0], f'{name}: compiled JSON differs from serializer'
+            drf_cost, compiled_cost = results['drf'][1], results['compiled'][1]
+            self.stdout.write(f'{name:<14} drf {drf_cost * 1000:8.2f} us/row  compiled {compiled_cost * 1000:8.2f} '
+                              f'us/row  {drf_cost / compiled_cost:5.1f}x')
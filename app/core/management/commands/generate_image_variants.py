@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from cars.models import Car
+from carzones.cache import bump_catalog_version
+from carzones.models import CarZone
+from core.images import generate_variants
+from events.models import EventPhoto
+from reservations.models import PhotoBeforeUse
+
+
+class Command(BaseCommand):
+    help = '저장되어 있는 차량, 쏘카존, 이벤트, 탑승전 사진의 변형 이미지(썸네일, WebP)를 병렬로 생성 (backfill)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='이미 있는 변형 이미지도 다시 만듭니다')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='storage 입출력을 동시에 처리할 thread 수 (변환은 IMAGE_VARIANT_WORKERS 개의 process 에서 처리)')
+
+    def handle(self, *args, **options):
+        targets = []
+        for model in (Car, CarZone, EventPhoto, PhotoBeforeUse):
+            storage = model._meta.get_field('image').storage
+            names = model.objects.exclude(image__isnull=True).exclude(image='').values_list('image', flat=True)
+            targets += [(model, storage, name) for name in names.distinct()]
+
+        def generate(target):
+            model, storage, name = target
+            try:
+                return target, len(generate_variants(storage, name, options['force'])), None
+            except Exception as e:
+                return target, 0, e
+
+        counts = {'generated': 0, 'skipped': 0, 'failed': 0}
+        marked = set()
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            for (model, storage, name), saved, error in executor.map(generate, targets):
+                if error is not None:
+                    counts['failed'] += 1
+                    self.stderr.write(f'{name}: {error}')
+                    continue
+                counts['generated' if saved else 'skipped'] += 1
+                # 변형 이미지가 있는 것이 확인되었으므로 API 에서 URL 을 보여줍니다
+                if model.objects.filter(image=name).exclude(image_variants_name=name).update(image_variants_name=name):
+                    marked.add(model)
+        # update() 는 post_save 를 보내지 않으므로 쏘카존 목록 캐시를 직접 무효화합니다
+        if CarZone in marked:
+            bump_catalog_version()
+        self.stdout.write(f"{len(targets)} images: generated {counts['generated']}, "
+                          f"skipped {counts['skipped']}, failed {counts['failed']}")
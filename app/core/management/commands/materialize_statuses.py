@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from prices.models import Coupon
+from reservations.models import ReservationStatus
+
+
+class Command(BaseCommand):
+    help = '운행후결제완료 예약의 반납완료 처리와 만료 쿠폰 사용불가 처리 (cron 등으로 주기적으로 실행합니다)'
+
+    def handle(self, *args, **options):
+        finished = ReservationStatus.finish_paid()
+        expired = Coupon.expire_outdated()
+        self.stdout.write(f'finished {finished} reservations, expired {expired} coupons')
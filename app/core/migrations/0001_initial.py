@@ -0,0 +1,35 @@
+# Generated by Django 3.1.1 on 2026-10-18 09:43
+
+from django.conf import settings
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Idempotency-Key 헤더 값', max_length=255)),
+                ('fingerprint', models.CharField(help_text='요청 경로와 본문의 sha256', max_length=64)),
+                ('status_code', models.PositiveSmallIntegerField(help_text='저장된 응답 상태 코드', null=True)),
+                ('response', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='저장된 응답 본문', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='TimeStamp')),
+                ('expires_at', models.DateTimeField(db_index=True, help_text='만료시간')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='idempotencykey',
+            constraint=models.UniqueConstraint(fields=('member', 'key'), name='idempotencykey_member_key_unique'),
+        ),
+    ]
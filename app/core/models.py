@@ -1,3 +1,25 @@
 from django.db import models
 
 # Create your models here.
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class IdempotencyKey(models.Model):
+    """
+    Idempotency-Key 헤더로 들어온 요청의 처리 결과
+
+        같은 회원이 같은 키로 다시 요청하면 저장해둔 응답을 그대로 돌려줍니다 (core/idempotency.py)
+        expires_at 이 지난 키는 다시 사용할 수 있고, purge_idempotency_keys 명령으로 정리합니다
+    """
+    member = models.ForeignKey('members.Member', on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255, help_text='Idempotency-Key 헤더 값')
+    fingerprint = models.CharField(max_length=64, help_text='요청 경로와 본문의 sha256')
+    status_code = models.PositiveSmallIntegerField(null=True, help_text='저장된 응답 상태 코드')
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder, help_text='저장된 응답 본문')
+    created_at = models.DateTimeField(auto_now_add=True, help_text='TimeStamp')
+    expires_at = models.DateTimeField(db_index=True, help_text='만료시간')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['member', 'key'], name='idempotencykey_member_key_unique'),
+        ]
@@ -1,3 +1,530 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import unittest
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from model_bakery import baker
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_jwt.settings import api_settings
 
 # Create your tests here.
+from cars.models import Car, CarAvailability, CarTimeTable, from_slot, to_slot
+from core.authentication import auth_cache_stats, member_cache_key
+from core.benchmarks import analyze
+from core.images import render_variants, variant_name
+from core.db_routers import replica_lag_cache_key, use_replica
+from carzones.models import CarZone
+from events.models import EventPhoto
+from members.models import Member, Profile
+from payments.models import PaymentAfterUse
+from prices.models import Coupon
+from reservations.models import Reservation, ReservationStatus
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_LAG_FALLBACK_SECONDS=5)
+class PrimaryReplicaRouterTestCase(TransactionTestCase):
+    """
+    replica 는 테스트에서 default 의 mirror 이므로 커밋된 데이터를 같이 보고, 어느 connection 으로 쿼리가 갔는지만 확인합니다
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.member = Member.objects.create(email='replica@example.com', password='test')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.member)
+
+    def capture(self, method, url, **kwargs):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = getattr(self.client, method)(url, **kwargs)
+        return response, len(primary), len(replica)
+
+    def test_should_read_list_from_replica(self):
+        response, primary, replica = self.capture('get', f'/members/{self.member.id}/coupons')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(1, len(response.data['results']))
+        self.assertEqual(0, primary)
+        self.assertGreater(replica, 0)
+
+    def test_should_read_from_primary_for_other_actions(self):
+        coupon = Coupon.objects.get(member=self.member)
+
+        response, primary, replica = self.capture('get', f'/members/{self.member.id}/coupons/{coupon.id}/use')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(primary, 0)
+        self.assertEqual(0, replica)
+
+    def test_should_read_from_primary_in_transaction(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            with use_replica():
+                self.assertEqual(1, Coupon.objects.count())
+                with transaction.atomic():
+                    self.assertEqual(1, Coupon.objects.count())
+
+        self.assertEqual(1, len(replica))
+
+    def test_should_read_from_primary_after_write(self):
+        zone = baker.make('carzones.CarZone')
+        car = baker.make('cars.Car', zone=zone)
+        CarAvailability.rebuild(car.id)
+        date_time_start = from_slot(to_slot(timezone.now()) + 144)
+        response = self.client.post(f'/carzones/{zone.id}/cars/{car.id}/holds', data={
+            'date_time_start': date_time_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'date_time_end': (date_time_start + datetime.timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ')})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+        response, primary, replica = self.capture('get', f'/members/{self.member.id}/coupons')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(primary, 0)
+        self.assertEqual(0, replica)
+
+        other = Member.objects.create(email='other@example.com', password='test')
+        self.client.force_authenticate(user=other)
+        response, primary, replica = self.capture('get', f'/members/{other.id}/coupons')
+        self.assertEqual(0, primary)
+        self.assertGreater(replica, 0)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                                           'LOCATION': 'django_cache'}})
+    def test_should_share_replica_lag_flag_with_other_workers(self):
+        call_command('createcachetable', verbosity=0)
+        cache.clear()
+        zone = baker.make('carzones.CarZone')
+        car = baker.make('cars.Car', zone=zone)
+        CarAvailability.rebuild(car.id)
+        date_time_start = from_slot(to_slot(timezone.now()) + 144)
+        response = self.client.post(f'/carzones/{zone.id}/cars/{car.id}/holds', data={
+            'date_time_start': date_time_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'date_time_end': (date_time_start + datetime.timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ')})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+        # 다른 worker 의 캐시 연결에서도 보입니다
+        self.assertTrue(DatabaseCache('django_cache', {}).get(replica_lag_cache_key(self.member.id)))
+        # 캐시 테이블도 primary 에서 읽으므로 flag 가 있는 회원의 조회는 replica 로 가지 않습니다
+        response, primary, replica = self.capture('get', f'/members/{self.member.id}/coupons')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(primary, 0)
+        self.assertEqual(0, replica)
+
+
+@override_settings(AUTH_MEMBER_CACHE_TTL=60)
+class AuthCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        auth_cache_stats.clear()
+        self.member = Member.objects.create(email='auth@example.com', password='test')
+        self.url = f'/members/{self.member.id}/coupons'
+        self.authenticate(self.member)
+
+    def authenticate(self, member):
+        token = api_settings.JWT_ENCODE_HANDLER(api_settings.JWT_PAYLOAD_HANDLER(member))
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {token}')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_should_skip_member_query_when_cached(self):
+        """
+        Request : GET - /members/123/coupons
+        """
+        first = self.count_queries(self.url)
+        second = self.count_queries(self.url)
+
+        self.assertEqual(first - 1, second)
+        stats = auth_cache_stats.stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+        self.assertEqual(1, stats['saved_queries'])
+
+    def test_should_cache_profile_with_member(self):
+        self.client.get(self.url)
+        request = self.client.get(self.url).wsgi_request
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.member.id, request.user.profile.member_id)
+
+    def test_should_invalidate_on_change_password(self):
+        """
+        Request : PUT - /members/123/change_password
+        """
+        self.client.get(self.url)
+        self.assertIsNotNone(cache.get(member_cache_key(self.member.email)))
+
+        response = self.client.put(f'/members/{self.member.id}/change_password',
+                                   data={'password': 'test', 'change_password': 'changed'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(cache.get(member_cache_key(self.member.email)))
+
+    def test_should_invalidate_on_profile_change(self):
+        self.client.get(self.url)
+
+        profile = Profile.objects.get(member=self.member)
+        profile.save()
+
+        self.assertIsNone(cache.get(member_cache_key(self.member.email)))
+
+    def test_should_reject_deleted_member(self):
+        self.client.get(self.url)
+
+        Member.objects.filter(id=self.member.id).delete()
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_should_not_use_cache_of_other_member_with_same_email(self):
+        self.client.get(self.url)
+        snapshot = cache.get(member_cache_key(self.member.email))
+        # 회원 삭제 signal 없이 같은 email 로 다시 가입한 경우 (테스트 rollback 등)
+        snapshot['member']['id'] = self.member.id + 1000
+        cache.set(member_cache_key(self.member.email), snapshot)
+
+        request = self.client.get(self.url).wsgi_request
+
+        self.assertEqual(self.member.id, request.user.id)
+        self.assertEqual(2, auth_cache_stats.stats()['misses'])
+
+    @override_settings(AUTH_MEMBER_CACHE_TTL=0)
+    def test_should_not_cache_member_when_disabled(self):
+        first = self.count_queries(self.url)
+        second = self.count_queries(self.url)
+
+        self.assertEqual(first, second)
+        self.assertIsNone(cache.get(member_cache_key(self.member.email)))
+        self.assertEqual(0, auth_cache_stats.stats()['hits'])
+
+    def test_should_show_stats_to_admin(self):
+        """
+        Request : GET - /auth_cache
+        """
+        admin = Member.objects.create(email='admin@example.com', password='test', is_admin=True)
+        self.authenticate(admin)
+
+        response = self.client.get('/auth_cache')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(1, response.data['misses'])
+
+
+def make_image_file(size=(1000, 500), image_format='PNG'):
+    file = io.BytesIO()
+    Image.new('RGB', size, color=(200, 30, 30)).save(file, image_format)
+    return ContentFile(file.getvalue())
+
+
+@override_settings(IMAGE_VARIANT_SIZES={'thumbnail': 200, 'medium': 640}, IMAGE_VARIANTS_ASYNC=False)
+class ImageVariantsTestCase(TransactionTestCase):
+    """
+    변형 이미지는 transaction 커밋 후에 만들어지므로 TransactionTestCase 로 확인합니다
+    """
+
+    def assertVariants(self, name):
+        for variant, size in (('thumbnail', (200, 100)), ('medium', (640, 320))):
+            for extension, image_format in (('webp', 'WEBP'), ('jpg', 'JPEG')):
+                with default_storage.open(variant_name(name, variant, extension), 'rb') as file:
+                    image = Image.open(io.BytesIO(file.read()))
+                    self.assertEqual((size, image_format), (image.size, image.format))
+
+    def test_should_render_sized_variants(self):
+        rendered = render_variants(make_image_file().read(), {'thumbnail': 200})
+
+        self.assertEqual({('thumbnail', 'webp'), ('thumbnail', 'jpg')}, set(rendered))
+        self.assertEqual((200, 100), Image.open(io.BytesIO(rendered[('thumbnail', 'webp')])).size)
+
+    def test_should_generate_variants_when_image_saved(self):
+        zone = CarZone(name='성수역', address='서울')
+        zone.image.save('zone.png', make_image_file(), save=False)
+        zone.save()
+
+        self.assertVariants(zone.image.name)
+        zone.refresh_from_db()
+        self.assertEqual(zone.image.name, zone.image_variants_name)
+
+    def test_should_hide_variant_urls_until_generated(self):
+        """
+        Request : GET - /event_photos
+        """
+        event = EventPhoto(name='event')
+        event.image.save('event.png', make_image_file(), save=False)
+        member = Member.objects.create(email='pending@example.com', password='test')
+        client = APIClient()
+        client.force_authenticate(user=member)
+
+        # 변형 이미지 생성이 실패하면 원본만 보여줍니다
+        with mock.patch('core.images.generate_variants', side_effect=OSError):
+            event.save()
+        response = client.get('/event_photos')
+        self.assertIsNone(response.data['results'][0]['image_variants'])
+
+        # 다른 이미지로 바뀌면 이전 이미지의 변형 이미지 URL 을 보여주지 않습니다
+        event.image.save('changed.png', make_image_file(), save=False)
+        EventPhoto.objects.filter(pk=event.pk).update(image=event.image.name, image_variants_name='EventImages/old.png')
+        response = client.get('/event_photos')
+        self.assertIsNone(response.data['results'][0]['image_variants'])
+
+    def test_should_expose_variant_urls(self):
+        """
+        Request : GET - /event_photos
+        """
+        event = EventPhoto(name='event')
+        event.image.save('event.png', make_image_file(), save=False)
+        event.save()
+        EventPhoto.objects.create(name='no image')
+        member = Member.objects.create(email='variants@example.com', password='test')
+        client = APIClient()
+        client.force_authenticate(user=member)
+
+        response = client.get('/event_photos')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        entries = {entry['name']: entry for entry in response.data['results']}
+        self.assertIsNone(entries['no image']['image_variants'])
+        thumbnail = entries['event']['image_variants']['thumbnail']
+        self.assertTrue(thumbnail['webp'].endswith(variant_name(event.image.name, 'thumbnail', 'webp')))
+        self.assertTrue(thumbnail['jpg'].startswith('http://testserver/'))
+
+    def test_should_backfill_variants(self):
+        zone = baker.make('carzones.CarZone')
+        name = default_storage.save('CarImages/backfill.png', make_image_file())
+        Car.objects.bulk_create([
+            Car(zone=zone, number='backfill-1', name='backfill', manufacturer=Car.ChoiceManufacturer.KIA,
+                riding_capacity=5, is_event_model=False, image=name),
+            Car(zone=zone, number='backfill-2', name='missing', manufacturer=Car.ChoiceManufacturer.KIA,
+                riding_capacity=5, is_event_model=False, image='CarImages/missing.png'),
+        ])
+
+        out = io.StringIO()
+        call_command('generate_image_variants', stdout=out, stderr=io.StringIO())
+        self.assertIn('generated 1, skipped 0, failed 1', out.getvalue())
+        self.assertVariants(name)
+        self.assertEqual({('backfill', name), ('missing', '')},
+                         set(Car.objects.values_list('name', 'image_variants_name')))
+
+        out = io.StringIO()
+        call_command('generate_image_variants', stdout=out, stderr=io.StringIO())
+        self.assertIn('generated 0, skipped 1, failed 1', out.getvalue())
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', '실행 계획은 PostgreSQL 에서만 확인합니다')
+class CompiledSerializerTestCase(APITestCase):
+    """
+    compiled serializer 목록 응답이 DRF serializer 응답과 byte 단위로 같은지 비교합니다
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.member = Member.objects.create(email='compiled@example.com', password='test')
+        self.client.force_authenticate(user=self.member)
+
+        self.zones = baker.make('carzones.CarZone', latitude=37.5445, longitude=127.0567, _quantity=3)
+        # 변형 이미지가 만들어진 쏘카존 / 차량과 아직 만들어지지 않은 쏘카존
+        self.zones[0].image = self.zones[0].image_variants_name = 'CarZoneImages/2020/10/01/zone.png'
+        self.zones[0].save()
+        self.zones[2].image = 'CarZoneImages/2020/10/01/pending.png'
+        self.zones[2].save()
+        self.cars = baker.make('cars.Car', zone=self.zones[0], _quantity=3)
+        self.cars[0].image = self.cars[0].image_variants_name = 'CarImages/car.png'
+        self.cars[0].save()
+        # 마지막 차량은 요금 / 보험료가 없으므로 car_prices, term_price 가 None 입니다
+        for car in self.cars[:2]:
+            baker.make('prices.CarPrice', car=car, standard_price=1000, weekday_price_per_ten_min=10,
+                       weekend_price_per_ten_min=15, min_price_per_km=10, mid_price_per_km=100,
+                       max_price_per_km=1000)
+            baker.make('prices.InsuranceFee', car=car, light_price=100, light_price_per_ten_min=10)
+        # 조회 기간(2020-09-27 ~ 28 KST)에 시작하는 시간표 2개와 기간 밖의 시간표 1개
+        first = datetime.datetime(2020, 9, 26, 16, 30, 15, 123456, tzinfo=datetime.timezone.utc)
+        for hours in (0, 10, 60):
+            CarTimeTable.objects.create(car=self.cars[0], zone=self.zones[0],
+                                        date_time_start=first + datetime.timedelta(hours=hours),
+                                        date_time_end=first + datetime.timedelta(hours=hours + 1))
+
+        start = datetime.datetime(2020, 10, 19, 15, 0, tzinfo=datetime.timezone.utc)
+        Reservation.objects.bulk_create([
+            Reservation(member=self.member, zone=self.zones[0], car=self.cars[index % 3],
+                        date_time_start=start + datetime.timedelta(hours=index),
+                        date_time_end=start + datetime.timedelta(hours=index, minutes=30))
+            for index in range(12)
+        ])
+        now = timezone.now()
+        baker.make('prices.Coupon', member=self.member, date_time_start=now - datetime.timedelta(days=1),
+                   expire_date_time=now + datetime.timedelta(days=1), description='설명')
+        baker.make('prices.Coupon', member=self.member, date_time_start=now - datetime.timedelta(days=3),
+                   expire_date_time=now - datetime.timedelta(days=2), description=None)
+
+    def assertSameResponse(self, url):
+        with override_settings(COMPILED_SERIALIZERS=False):
+            expected = self.client.get(url)
+        # 쏘카존 목록 응답 캐시를 쓰지 않도록 비웁니다
+        cache.clear()
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(expected.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, expected.content)
+        return json.loads(response.content)
+
+    def test_should_render_carzones_same_as_serializer(self):
+        """
+        Request : GET - /carzones
+        """
+        data = self.assertSameResponse('/carzones')
+
+        self.assertEqual(len(data['results']), 3)
+        results = {zone['id']: zone for zone in data['results']}
+        self.assertTrue(results[self.zones[0].id]['image'].startswith('http://testserver/'))
+        self.assertIsNotNone(results[self.zones[0].id]['image_variants'])
+        self.assertIsNone(results[self.zones[1].id]['image_variants'])
+        self.assertIsNone(results[self.zones[2].id]['image_variants'])
+
+    def test_should_render_cars_same_as_serializer(self):
+        """
+        Request : GET - /carzones/123/cars?date_time_start=202009261400&date_time_end=202009281600
+        """
+        data = self.assertSameResponse(f'/carzones/{self.zones[0].id}/cars'
+                                       f'?date_time_start=202009261400&date_time_end=202009281600')
+
+        results = {car['id']: car for car in data['results']}
+        self.assertEqual(len(results[self.cars[0].id]['time_tables']), 2)
+        self.assertIsNotNone(results[self.cars[0].id]['image_variants'])
+        self.assertIsNone(results[self.cars[2].id]['car_prices'])
+        self.assertIsNone(results[self.cars[2].id]['term_price'])
+
+    def test_should_render_reservations_same_as_serializer_on_every_page(self):
+        """
+        Request : GET - /reservations
+        """
+        data = self.assertSameResponse('/reservations')
+        self.assertEqual(len(data['results']), 10)
+
+        data = self.assertSameResponse(data['next'].replace('http://testserver', ''))
+        self.assertEqual(len(data['results']), 2)
+
+    def test_should_render_coupons_same_as_serializer(self):
+        """
+        Request : GET - /members/123/coupons
+        """
+        data = self.assertSameResponse(f'/members/{self.member.id}/coupons')
+
+        self.assertEqual({coupon['is_enabled'] for coupon in data['results']}, {True, False})
+
+    def test_should_keep_history_on_its_own_serializer(self):
+        """
+        Request : GET - /reservations/history
+        """
+        ReservationStatus.objects.bulk_create([ReservationStatus(reservation=reservation)
+                                               for reservation in Reservation.objects.all()])
+
+        response = self.client.get('/reservations/history')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('reservation_status', response.data['results'][0])
+
+
+class QueryPlanTestCase(TestCase):
+    """
+    자주 쓰는 조회가 데이터가 쌓인 상태에서 인덱스를 타는지 EXPLAIN 으로 확인합니다
+    """
+    members_count = 50
+    rows_per_member = 40
+
+    @classmethod
+    def setUpTestData(cls):
+        zone = baker.make('carzones.CarZone')
+        cars = Car.objects.bulk_create([
+            Car(zone=zone, number=f'plan-{index}', name='plan', manufacturer=Car.ChoiceManufacturer.KIA,
+                riding_capacity=5, is_event_model=False)
+            for index in range(cls.members_count)
+        ])
+        cls.members = [Member.objects.create(email=f'plan{index}@example.com', password='test')
+                       for index in range(cls.members_count)]
+
+        now = timezone.now()
+        first = now - datetime.timedelta(hours=cls.rows_per_member)
+        CarTimeTable.objects.bulk_create([
+            CarTimeTable(zone=zone, car=car,
+                         date_time_start=first + datetime.timedelta(hours=index * 2),
+                         date_time_end=first + datetime.timedelta(hours=index * 2, minutes=30))
+            for car in cars for index in range(cls.rows_per_member)
+        ])
+        reservations = Reservation.objects.bulk_create([
+            Reservation(member=member, zone=zone, car=cars[index % len(cars)],
+                        date_time_start=first + datetime.timedelta(hours=index),
+                        date_time_end=first + datetime.timedelta(hours=index, minutes=30))
+            for member in cls.members for index in range(cls.rows_per_member)
+        ])
+        PaymentAfterUse.objects.bulk_create([
+            PaymentAfterUse(reservation=reservation, member_id=reservation.member_id, driving_distance=10,
+                            first_section_fee=0, second_section_fee=0, third_section_fee=0, total_fee=0)
+            for reservation in reservations
+        ])
+        Coupon.objects.bulk_create([
+            Coupon(member=member, title='plan', date_time_start=now - datetime.timedelta(days=1),
+                   expire_date_time=now + datetime.timedelta(days=30), will_use_check=index == 0)
+            for member in cls.members for index in range(cls.rows_per_member)
+        ])
+        analyze(CarTimeTable, Reservation, PaymentAfterUse, Coupon)
+
+    def assertNoSeqScan(self, queryset, model):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        nodes = [plan[0]['Plan']]
+        scanned = []
+        while nodes:
+            node = nodes.pop()
+            scanned.append((node['Node Type'], node.get('Relation Name'), node.get('Index Name')))
+            nodes.extend(node.get('Plans', []))
+        seq_scans = [scan for scan in scanned if scan[0] == 'Seq Scan' and scan[1] == model._meta.db_table]
+        self.assertEqual([], seq_scans, scanned)
+        return scanned
+
+    def test_should_check_overlap_with_index(self):
+        car = Car.objects.filter(number='plan-7').get()
+        start = timezone.now()
+        scanned = self.assertNoSeqScan(CarTimeTable.objects.filter(car_id=car.id)
+                                       .overlap(start, start + datetime.timedelta(hours=1)), CarTimeTable)
+        self.assertIn('cartimetable_car_period_idx', [index_name for _, _, index_name in scanned])
+
+    def test_should_find_will_use_coupons_with_index(self):
+        now = timezone.now()
+        scanned = self.assertNoSeqScan(Coupon.objects.filter(member_id=self.members[7].id,
+                                                             will_use_check=True,
+                                                             is_enabled=True,
+                                                             date_time_start__lte=now,
+                                                             expire_date_time__gt=now)[:2], Coupon)
+        self.assertIn('coupon_member_will_use_idx', [index_name for _, _, index_name in scanned])
+
+    def test_should_page_member_reservations_with_index(self):
+        reservations = Reservation.objects.filter(member=self.members[7]).order_by('id')
+        cursor = reservations[10].id
+        for queryset in (reservations[:11], reservations.filter(id__gt=cursor)[:11]):
+            scanned = self.assertNoSeqScan(queryset, Reservation)
+            self.assertIn('reservation_member_id_idx', [index_name for _, _, index_name in scanned])
+
+    def test_should_sum_driving_distance_with_index(self):
+        scanned = self.assertNoSeqScan(
+            PaymentAfterUse.objects.filter(member_id=self.members[7].id).values('member_id')
+            .annotate(total=Sum('driving_distance')), PaymentAfterUse)
+        self.assertIn('payment_after_member_dist_idx', [index_name for _, _, index_name in scanned])
@@ -5,12 +5,13 @@ from rest_framework_jwt.views import obtain_jwt_token, refresh_jwt_token, verify
 from rest_framework_nested import routers
 
 from cars.views import CarViewSet
+from core.views import AuthCacheViewSet
 from carzones.views import CarZoneViewSet
 from events.views import EventPhotoViewSet
 from members.views import MembersViewSet, ProfileViewSet, PhoneAuthViewSet
 from payments.views import PaymentBeforeUseViewSet, PaymentAfterUseViewSet
-from prices.views import CouponViewSet
-from reservations.views import ReservationViewSet, ReservationHistoryViewSet, PhotoBeforeUseViewSet
+from prices.views import CouponViewSet, QuoteCacheViewSet
+from reservations.views import ReservationViewSet, CarHoldViewSet, ReservationHistoryViewSet, PhotoBeforeUseViewSet
 
 router = SimpleRouter(trailing_slash=False)
 router.register('members', MembersViewSet)
@@ -19,6 +20,8 @@ router.register('carzones', CarZoneViewSet)
 router.register('phone_auth', PhoneAuthViewSet)
 router.register('event_photos', EventPhotoViewSet)
 router.register('reservations', ReservationHistoryViewSet)
+router.register('quote_cache', QuoteCacheViewSet, basename='quote_cache')
+router.register('auth_cache', AuthCacheViewSet, basename='auth_cache')
 
 """
 members/123/coupons
@@ -36,6 +39,7 @@ carzones/123/cars/456/reservaions
 """
 carzone_car_router = routers.NestedSimpleRouter(carzone_router, 'cars', lookup='car')
 carzone_car_router.register('reservations', ReservationViewSet)
+carzone_car_router.register('holds', CarHoldViewSet)
 
 """
 reservations/123/payment_before
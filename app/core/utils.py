@@ -1,4 +1,5 @@
 import datetime
+import math
 
 import pytz
 
@@ -6,6 +7,9 @@ from core.exceptions import NotValidInsuranceException, NotValidTimeFormatExcept
 
 KST = pytz.timezone('Asia/Seoul')
 
+# 지구 평균 반지름 (단위: km)
+EARTH_RADIUS_KM = 6371.0088
+
 
 # 주행거리에 따른 반납 결제 요금
 def payment_price(distance, min_price, mid_price, max_price):
@@ -30,6 +34,13 @@ def payment_price(distance, min_price, mid_price, max_price):
         return int(round(price, -1))
 
 
+# 두 위치(위도, 경도) 사이의 대권거리 (단위: km)
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
 def time_format(datetime_str):
     if not (type(datetime_str) == str and len(datetime_str) == 12):
         raise NotValidTimeFormatException
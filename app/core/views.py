@@ -1,3 +1,20 @@
-from django.shortcuts import render
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
 
-# Create your views here.
+from core.authentication import auth_cache_stats
+
+
+class AuthCacheViewSet(ViewSet):
+    """
+        인증 캐시 상태를 반환하는 API (관리자 전용)
+        ---
+        # 내용
+            [GET] /auth_cache
+            -> 요청을 처리한 프로세스의 인증 캐시 적중(hits) / 실패(misses) 횟수와 줄어든 회원 조회 쿼리 수(saved_queries)를
+               반환합니다. 캐시 유지 시간(AUTH_MEMBER_CACHE_TTL)을 정할 때 참고합니다.
+    """
+    permission_classes = [IsAdminUser, ]
+
+    def list(self, request, *args, **kwargs):
+        return Response(auth_cache_stats.stats())
@@ -5,3 +5,5 @@ from django.db import models
 class EventPhoto(models.Model):
     name = models.CharField(max_length=20)
     image = models.ImageField(null=True, upload_to='EventImages/%Y/%m/%d')
+    # 변형 이미지(core/images.py)를 만든 원본 이미지 이름, image 와 같을 때만 변형 이미지 URL 을 보여줍니다
+    image_variants_name = models.CharField(max_length=100, blank=True, default='')
@@ -1,10 +1,13 @@
 from rest_framework.serializers import ModelSerializer
 
+from core.images import ImageVariantsField
 from events.models import EventPhoto
 
 
 class EventPhotoListSerializer(ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = EventPhoto
-        fields = ['id', 'name', 'image']
-        read_only_fields = ('id', 'name', 'image')
\ No newline at end of file
+        fields = ['id', 'name', 'image', 'image_variants']
+        read_only_fields = ('id', 'name', 'image', 'image_variants')
@@ -0,0 +1,7 @@
+from django.db.models.signals import post_save
+
+from core.images import schedule_variants_on_save
+from events.models import EventPhoto
+
+# 이벤트 이미지의 크기별 변형 이미지 (core/images.py)
+post_save.connect(schedule_variants_on_save, sender=EventPhoto)
@@ -5,11 +5,13 @@ from rest_framework import mixins
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.viewsets import GenericViewSet
 
+from core.db_routers import ReplicaReadMixin
 from events.models import EventPhoto
 from events.serializers import EventPhotoListSerializer
 
 
-class EventPhotoViewSet(mixins.RetrieveModelMixin,
+class EventPhotoViewSet(ReplicaReadMixin,
+                        mixins.RetrieveModelMixin,
                         mixins.ListModelMixin,
                         GenericViewSet):
     """
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from import_export.admin import ImportExportMixin
 
-from members.models import Member, Profile, PhoneAuth
+from members.models import CreditLedger, Member, Profile, PhoneAuth, SmsOutbox
 
 
 @admin.register(Member)
@@ -20,9 +20,32 @@ class ProfileAdmin(ImportExportMixin, admin.ModelAdmin):
                     'credit_point',)
 
 
+@admin.register(CreditLedger)
+class CreditLedgerAdmin(admin.ModelAdmin):
+    list_display = ('id',
+                    'member',
+                    'reservation',
+                    'amount',
+                    'reason',
+                    'is_compacted',
+                    'created_at',)
+
+
 @admin.register(PhoneAuth)
 class PhoneAuthAdmin(ImportExportMixin, admin.ModelAdmin):
     list_display = ('id',
                     'auth_number',
                     'phone_number',
                     'registration_id',)
+
+
+@admin.register(SmsOutbox)
+class SmsOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id',
+                    'phone_number',
+                    'status',
+                    'attempts',
+                    'next_attempt_at',
+                    'latency_ms',
+                    'created_at',
+                    'sent_at',)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class MembersConfig(AppConfig):
     name = 'members'
+
+    def ready(self):
+        import members.signals  # noqa: F401
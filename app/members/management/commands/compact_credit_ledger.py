@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from members.models import CreditLedger
+
+
+class Command(BaseCommand):
+    help = '크레딧 원장(CreditLedger)의 압축하지 않은 내역을 회원별 Profile.credit_point 로 접어 넣음 (주기 실행)'
+
+    def handle(self, *args, **options):
+        compacted = CreditLedger.compact()
+        self.stdout.write(f'compacted {compacted} credit ledger entries')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from members.models import Profile
+from payments.models import PaymentAfterUse
+
+
+class Command(BaseCommand):
+    help = '회원별 누적 운행거리(Profile.total_driving_distance)를 운행후결제 내역으로 다시 계산 (backfill / 정합성 확인)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='값이 다른 회원 수만 확인하고 저장하지 않습니다')
+
+    def handle(self, *args, **options):
+        # 회원별 합계를 상관 서브쿼리로 계산해 값이 다른 Profile 만 한 번의 UPDATE 로 고칩니다
+        total = Coalesce(Subquery(PaymentAfterUse.objects.filter(member_id=OuterRef('member_id'))
+                                  .values('member_id')
+                                  .annotate(total=Sum('driving_distance'))
+                                  .values('total')), Value(0))
+        drifted = Profile.objects.annotate(actual=total).exclude(total_driving_distance=F('actual'))
+
+        if options['dry_run']:
+            self.stdout.write(f'{drifted.count()} profiles out of sync')
+            return
+        updated = drifted.update(total_driving_distance=total)
+        self.stdout.write(f'reconciled {updated} profiles')
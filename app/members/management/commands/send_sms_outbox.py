@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from members.models import SmsOutbox
+from members.sms import SensClient, drain_outbox
+
+
+class Command(BaseCommand):
+    help = 'SMS 발송 대기열(SmsOutbox)을 batch 로 발송하는 worker (작업별 응답 시간과 대기 시간을 출력합니다)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='지금 보낼 문자를 모두 보낸 뒤 종료합니다')
+        parser.add_argument('--interval', type=float, default=1.0, help='대기열이 비었을 때 다시 확인하는 간격(초)')
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        client = SensClient()
+        try:
+            while True:
+                jobs = drain_outbox(client, options['batch_size'])
+                if jobs:
+                    self.report(jobs)
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            client.close()
+
+    def report(self, jobs):
+        counts = {status: 0 for status in SmsOutbox.ChoiceStatus.values}
+        for job in jobs:
+            counts[job.status] += 1
+        sent = [job for job in jobs if job.status == SmsOutbox.ChoiceStatus.SENT]
+        delays = sorted(int((job.sent_at - job.created_at).total_seconds() * 1000) for job in sent)
+        delay = f'queue delay max {delays[-1]} ms' if delays else 'queue delay -'
+        self.stdout.write(f'batch {len(jobs)}: sent {counts[SmsOutbox.ChoiceStatus.SENT]}, '
+                          f'retry {counts[SmsOutbox.ChoiceStatus.PENDING]}, '
+                          f'failed {counts[SmsOutbox.ChoiceStatus.FAILED]}, '
+                          f'gateway {jobs[0].latency_ms} ms, {delay}')
+        for job in jobs:
+            if job.last_error:
+                self.stderr.write(f'sms {job.id} attempt {job.attempts}: {job.last_error}')
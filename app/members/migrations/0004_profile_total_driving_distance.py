@@ -0,0 +1,23 @@
+# Generated by Django 3.1.1 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0003_remove_profile_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='total_driving_distance',
+            field=models.PositiveIntegerField(default=0, help_text='총운행거리'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='credit_point',
+            field=models.PositiveIntegerField(default=5000000),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.1.1 on 2026-10-18 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0004_reservation_member_id_idx'),
+        ('members', '0004_profile_total_driving_distance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditLedger',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(help_text='크레딧 변동 (차감은 음수)')),
+                ('reason', models.CharField(choices=[('booking', '운행전결제'), ('extension', '연장결제'), ('after_use', '운행후결제'), ('adjustment', '조정')], max_length=20)),
+                ('is_compacted', models.BooleanField(default=False, help_text='Profile.credit_point 에 반영 여부')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='TimeStamp')),
+                ('member', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='credit_ledger', to=settings.AUTH_USER_MODEL)),
+                ('reservation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='credit_ledger', to='reservations.reservation')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='creditledger',
+            index=models.Index(fields=['member', 'created_at', 'amount'], name='creditledger_member_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='creditledger',
+            index=models.Index(condition=models.Q(is_compacted=False), fields=['member', 'amount'], name='creditledger_pending_idx'),
+        ),
+    ]
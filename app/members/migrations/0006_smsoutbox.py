@@ -0,0 +1,33 @@
+# Generated by Django 3.1.1 on 2026-10-18 10:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0005_creditledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SmsOutbox',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone_number', models.CharField(max_length=11)),
+                ('content', models.CharField(max_length=90)),
+                ('status', models.CharField(choices=[('pending', '발송대기'), ('sent', '발송완료'), ('failed', '발송실패')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0, help_text='발송 시도 횟수')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, help_text='다음 발송 시도 시간')),
+                ('last_error', models.CharField(blank=True, default='', max_length=255)),
+                ('latency_ms', models.PositiveIntegerField(help_text='마지막 발송 요청의 게이트웨이 응답 시간(ms)', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='TimeStamp')),
+                ('sent_at', models.DateTimeField(help_text='발송완료시간', null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='smsoutbox',
+            index=models.Index(condition=models.Q(status='pending'), fields=['next_attempt_at', 'id'], name='smsoutbox_pending_idx'),
+        ),
+    ]
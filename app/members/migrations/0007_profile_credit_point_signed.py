@@ -0,0 +1,18 @@
+# Generated by Django 3.1.1 on 2026-10-18 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0006_smsoutbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='credit_point',
+            field=models.IntegerField(default=5000000),
+        ),
+    ]
@@ -1,18 +1,16 @@
-import base64
 import datetime
-import hashlib
-import hmac
-import json
 import secrets
-import time
 
-import requests
 from django.contrib.auth.models import (
     BaseUserManager, AbstractBaseUser
 )
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.utils.translation import gettext as _
 
+from core.exceptions import ShortCreditException
 from prices.models import Coupon
 
 
@@ -83,14 +81,140 @@ class Member(AbstractBaseUser):
             super().save(*args, **kwargs)
 
 
+class ProfileQuerySet(models.QuerySet):
+    def with_credit_balance(self):
+        # 압축된 크레딧(credit_point)에 아직 압축하지 않은 원장 내역을 더한 현재 잔액
+        return self.annotate(credit_balance=F('credit_point') + pending_credit('member_id'))
+
+
 class Profile(models.Model):
     member = models.OneToOneField('members.Member',
                                   related_name='profile',
                                   on_delete=models.CASCADE,
                                   )
     image = models.ImageField(null=True)
-    credit_point = models.PositiveIntegerField(default=5_000_000)
+    # CreditLedger 를 compact_credit_ledger 명령으로 접어 넣은 잔액 (현재 잔액은 with_credit_balance / CreditLedger.balance)
+    # 조정(ADJUSTMENT) 등으로 잔액이 음수인 회원이 있어도 압축이 멈추지 않도록 음수를 허용합니다
+    credit_point = models.IntegerField(default=5_000_000)
+    # 운행후결제(PaymentAfterUse) 저장시 같은 transaction 에서 더하는 누적 운행거리 (reconcile_driving_distance 명령으로 재계산)
+    total_driving_distance = models.PositiveIntegerField(default=0, help_text='총운행거리')
+
+    objects = ProfileQuerySet.as_manager()
+
+
+# 회원별 크레딧 차감 advisory lock 의 첫 번째 키 (두 번째 키는 member_id)
+CREDIT_LOCK_NAMESPACE = 4031
+
+
+def pending_credit(member_ref):
+    """
+    아직 Profile.credit_point 로 압축하지 않은 회원별 원장 합계 (annotate 용 상관 서브쿼리)
+    """
+    return Coalesce(Subquery(CreditLedger.objects.filter(member_id=OuterRef(member_ref), is_compacted=False)
+                             .values('member_id')
+                             .annotate(total=Sum('amount'))
+                             .values('total')), Value(0))
+
 
+class CreditLedger(models.Model):
+    """
+    회원 크레딧 변동 원장
+
+        - 예약, 연장, 운행후결제의 크레딧 차감은 Profile 을 UPDATE 하지 않고 이 테이블에 INSERT 만 합니다
+        - 차감은 charge 로 잔액을 확인한 뒤 저장하므로, 잔액이 모자라면 ShortCreditException 이 발생합니다
+        - 현재 잔액은 Profile.credit_point + 압축하지 않은(is_compacted=False) 내역의 합계입니다
+        - compact_credit_ledger 명령이 주기적으로 내역의 합계를 Profile.credit_point 로 접어 넣습니다
+    """
+    class ChoiceReason(models.TextChoices):
+        BOOKING = 'booking', _('운행전결제')
+        EXTENSION = 'extension', _('연장결제')
+        AFTER_USE = 'after_use', _('운행후결제')
+        ADJUSTMENT = 'adjustment', _('조정')
+
+    # creditledger_member_time_idx 가 member 로 시작하므로 FK 인덱스는 따로 만들지 않습니다
+    member = models.ForeignKey('members.Member', on_delete=models.CASCADE, related_name='credit_ledger',
+                               db_index=False)
+    reservation = models.ForeignKey('reservations.Reservation', on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='credit_ledger')
+    amount = models.IntegerField(help_text='크레딧 변동 (차감은 음수)')
+    reason = models.CharField(choices=ChoiceReason.choices, max_length=20)
+    is_compacted = models.BooleanField(default=False, help_text='Profile.credit_point 에 반영 여부')
+    created_at = models.DateTimeField(auto_now_add=True, help_text='TimeStamp')
+
+    class Meta:
+        indexes = [
+            # 시점별 잔액(balance as_of), index only scan 으로 처리되도록 금액까지 색인합니다
+            models.Index(fields=['member', 'created_at', 'amount'], name='creditledger_member_time_idx'),
+            # 현재 잔액, 압축 전 내역만 색인하므로 작게 유지됩니다
+            models.Index(fields=['member', 'amount'], condition=Q(is_compacted=False),
+                         name='creditledger_pending_idx'),
+        ]
+
+    @classmethod
+    def record(cls, member_id, amount, reason, reservation_id=None):
+        return cls.objects.create(member_id=member_id, amount=amount, reason=reason, reservation_id=reservation_id)
+
+    @classmethod
+    def charge(cls, member_id, amount, reason, reservation_id=None):
+        """
+        잔액을 확인하고 amount 만큼 차감하는 내역을 저장, 잔액이 모자라면 ShortCreditException
+
+            - 같은 회원의 차감끼리 잔액 확인 순서를 맞추도록 회원별 advisory lock 을 잡고 잔액을 한 번만 읽습니다
+            - Profile 행은 잠그지 않으므로 압축, Profile 저장과 서로 기다리지 않습니다
+            - lock 은 호출한 transaction 이 끝날 때 풀리므로, transaction 의 마지막에 호출해야 잠금 시간이 짧습니다
+        """
+        with transaction.atomic(savepoint=False):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [CREDIT_LOCK_NAMESPACE, member_id])
+            balance = Profile.objects.with_credit_balance() \
+                .values_list('credit_balance', flat=True).get(member_id=member_id)
+            if balance < amount:
+                raise ShortCreditException
+            return cls.record(member_id, -amount, reason, reservation_id)
+
+    @classmethod
+    def balance(cls, member_id, as_of=None):
+        """
+        회원의 현재 잔액, as_of 를 넘기면 그 시점의 잔액
+
+            압축 여부와 상관없이 as_of 이후의 내역을 현재 잔액에서 빼므로, 한 번의 쿼리로 계산합니다
+        """
+        queryset = Profile.objects.filter(member_id=member_id).with_credit_balance()
+        if as_of is not None:
+            later = Coalesce(Subquery(cls.objects.filter(member_id=OuterRef('member_id'), created_at__gt=as_of)
+                                      .values('member_id')
+                                      .annotate(total=Sum('amount'))
+                                      .values('total')), Value(0))
+            queryset = queryset.annotate(credit_balance_as_of=F('credit_balance') - later)
+            return queryset.values_list('credit_balance_as_of', flat=True).get()
+        return queryset.values_list('credit_balance', flat=True).get()
+
+    @classmethod
+    def compact(cls):
+        """
+        압축하지 않은 내역을 회원별로 합쳐 Profile.credit_point 로 접어 넣음
+
+            내역 표시와 Profile 갱신을 한 문장(CTE)으로 처리하므로, 실행 중에 커밋되지 않은 내역은
+            표시되지 않고 다음 실행에서 반영됩니다. 반영한 내역 수를 반환합니다.
+        """
+        ledger = cls._meta.db_table
+        profile = Profile._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'''
+                WITH compacted AS (
+                    UPDATE {ledger} SET is_compacted = true
+                    WHERE is_compacted = false
+                    RETURNING member_id, amount
+                ), totals AS (
+                    SELECT member_id, SUM(amount) AS total, COUNT(*) AS entries
+                    FROM compacted GROUP BY member_id
+                ), updated AS (
+                    UPDATE {profile} SET credit_point = {profile}.credit_point + totals.total
+                    FROM totals WHERE {profile}.member_id = totals.member_id
+                )
+                SELECT COALESCE(SUM(entries), 0) FROM totals
+            ''')
+            return cursor.fetchone()[0]
 
 
 class PhoneAuth(models.Model):
@@ -105,47 +229,37 @@ class PhoneAuth(models.Model):
     def save(self, *args, **kwargs):
         self.auth_number = secrets.choice(range(100000, 999999))
         self.ttl = timezone.now() + datetime.timedelta(minutes=5)
-        super().save(*args, **kwargs)
-
-        self.send_sms()
-
-    def send_sms(self):
-        timestamp = int(time.time() * 1000)
-        timestamp = str(timestamp)
-
-        url = "https://sens.apigw.ntruss.com"
-        requestUrl1 = "/sms/v2/services/"
-        requestUrl2 = "/messages"
-        serviceId = "ncp:sms:kr:260483911484:sofastcar_sms"
-        access_key = "RcSVHr6YgMHKg38rmR4X"
-
-        uri = requestUrl1 + serviceId + requestUrl2
-        apiUrl = url + uri
-
-        secret_key = "7PWFNRn7Md46Dgegpf8MAncOaSPH4ReDICyJf4xZ"
-        secret_key = bytes(secret_key, 'UTF-8')
-        method = "POST"
-        message = method + " " + uri + "\n" + timestamp + "\n" + access_key
-        message = bytes(message, 'UTF-8')
-
-        signingKey = base64.b64encode(hmac.new(secret_key, message, digestmod=hashlib.sha256).digest())
-
-        messages = {"to": f"{self.phone_number}"}
-        body = {
-            "type": "SMS",
-            "contentType": "COMM",
-            "from": "01047340350",
-            "subject": "subject",
-            "content": f"[인증번호]: {self.auth_number}",
-            "messages": [messages]
-        }
-        body2 = json.dumps(body)
-
-        headers = {
-            'Content-Type': 'application/json; charset=utf-8',
-            'x-ncp-apigw-timestamp': timestamp,
-            'x-ncp-iam-access-key': access_key,
-            'x-ncp-apigw-signature-v2': signingKey
-        }
-
-        requests.post(apiUrl, headers=headers, data=body2)
+        # 인증번호 문자는 같은 transaction 에서 발송 대기열(SmsOutbox)에 넣고, send_sms_outbox 명령이 발송합니다
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            SmsOutbox.objects.create(phone_number=self.phone_number, content=f'[인증번호]: {self.auth_number}')
+
+
+class SmsOutbox(models.Model):
+    """
+    SMS 발송 대기열
+
+        - API 요청에서는 저장만 하고, send_sms_outbox 명령(members/sms.py)이 batch 로 발송합니다
+        - 발송에 실패하면 SMS_OUTBOX_RETRY_SECONDS 부터 두 배씩 늘려가며 SMS_OUTBOX_MAX_ATTEMPTS 번까지 다시 보냅니다
+    """
+    class ChoiceStatus(models.TextChoices):
+        PENDING = 'pending', _('발송대기')
+        SENT = 'sent', _('발송완료')
+        FAILED = 'failed', _('발송실패')
+
+    phone_number = models.CharField(max_length=11)
+    content = models.CharField(max_length=90)
+    status = models.CharField(choices=ChoiceStatus.choices, default=ChoiceStatus.PENDING, max_length=10)
+    attempts = models.PositiveSmallIntegerField(default=0, help_text='발송 시도 횟수')
+    next_attempt_at = models.DateTimeField(default=timezone.now, help_text='다음 발송 시도 시간')
+    last_error = models.CharField(max_length=255, blank=True, default='')
+    latency_ms = models.PositiveIntegerField(null=True, help_text='마지막 발송 요청의 게이트웨이 응답 시간(ms)')
+    created_at = models.DateTimeField(auto_now_add=True, help_text='TimeStamp')
+    sent_at = models.DateTimeField(null=True, help_text='발송완료시간')
+
+    class Meta:
+        indexes = [
+            # 발송할 작업만 색인하므로 발송이 끝난 작업이 쌓여도 작게 유지됩니다
+            models.Index(fields=['next_attempt_at', 'id'], condition=Q(status='pending'),
+                         name='smsoutbox_pending_idx'),
+        ]
@@ -1,13 +1,9 @@
 from datetime import date
 
-from django.db.models import Sum
-
-from members.models import Member, Profile, PhoneAuth
+from members.models import CreditLedger, Member, Profile, PhoneAuth
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 
-from payments.models import PaymentAfterUse
-
 
 class MembersSerializer(ModelSerializer):
     """
@@ -51,14 +47,15 @@ class MemberInfoSerializer(ModelSerializer):
                             ]
 
     def get_total_driving_distance(self, obj):
-        if PaymentAfterUse.objects.filter(member_id=obj.id).exists():
-            total_distance = PaymentAfterUse.objects.filter(member_id=obj.id).aggregate(Sum('driving_distance'))
-            return total_distance['driving_distance__sum']
-        else:
-            return 0
+        # 운행후결제 저장시 누적되는 Profile.total_driving_distance
+        return obj.profile.total_driving_distance
 
     def get_credit_point(self, obj):
-        return obj.profile.credit_point
+        # CreditLedger 를 반영한 잔액 (MembersViewSet 에서는 회원 조회 쿼리에서 같이 계산합니다)
+        credit_balance = getattr(obj, 'credit_balance', None)
+        if credit_balance is None:
+            return CreditLedger.balance(obj.id)
+        return credit_balance
 
 
 class ChangePasswordSerializer(ModelSerializer):
@@ -88,6 +85,7 @@ class ProfileSerializer(ModelSerializer):
     프로필 Serializer
     """
     name = serializers.CharField(source='member.name', read_only=True)
+    credit_point = serializers.SerializerMethodField()
 
     class Meta:
         model = Profile
@@ -98,6 +96,12 @@ class ProfileSerializer(ModelSerializer):
             'credit_point',
         )
 
+    def get_credit_point(self, obj):
+        credit_balance = getattr(obj, 'credit_balance', None)
+        if credit_balance is None:
+            return CreditLedger.balance(obj.member_id)
+        return credit_balance
+
 
 class PhoneAuthSerializer(ModelSerializer):
     class Meta:
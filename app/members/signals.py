@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core.authentication import invalidate_member
+from members.models import Member, Profile
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def invalidate_member_cache(sender, instance, **kwargs):
+    # 비밀번호 변경(MembersViewSet.change_password), 회원 탈퇴시 인증 캐시를 지웁니다
+    invalidate_member(instance.email)
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_profile_cache(sender, instance, created, **kwargs):
+    if created:
+        return
+    invalidate_member(Member.objects.values_list('email', flat=True).get(id=instance.member_id))
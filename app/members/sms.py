@@ -0,0 +1,130 @@
+import base64
+import datetime
+import hashlib
+import hmac
+import json
+import time
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from members.models import SmsOutbox
+
+
+class SensClient:
+    """
+    NAVER Cloud SENS SMS API(v2) client
+
+        하나의 requests.Session 으로 게이트웨이 연결을 재사용하고, 요청마다 SENS_SMS_TIMEOUT 초 제한을 둡니다
+    """
+
+    def __init__(self, url=None, timeout=None, pool_size=4):
+        self.url = url or settings.SENS_SMS_URL
+        self.timeout = timeout or getattr(settings, 'SENS_SMS_TIMEOUT', 5)
+        self.uri = f'/sms/v2/services/{settings.SENS_SMS_SERVICE_ID}/messages'
+        self.session = requests.Session()
+        self.session.mount(self.url, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    def signature(self, method, timestamp):
+        message = f'{method} {self.uri}\n{timestamp}\n{settings.SENS_SMS_ACCESS_KEY}'
+        digest = hmac.new(settings.SENS_SMS_SECRET_KEY.encode(), message.encode(), digestmod=hashlib.sha256).digest()
+        return base64.b64encode(digest).decode()
+
+    def send(self, messages):
+        """
+        messages : [(수신번호, 내용)], 한 번의 요청으로 보냅니다 (SENS 는 요청당 최대 100건)
+        """
+        timestamp = str(int(time.time() * 1000))
+        body = {
+            'type': 'SMS',
+            'contentType': 'COMM',
+            'from': settings.SENS_SMS_FROM,
+            # 기본 내용은 첫 번째 문자이고, 수신자별 내용으로 덮어씁니다
+            'content': messages[0][1],
+            'messages': [{'to': to, 'content': content} for to, content in messages],
+        }
+        headers = {
+            'Content-Type': 'application/json; charset=utf-8',
+            'x-ncp-apigw-timestamp': timestamp,
+            'x-ncp-iam-access-key': settings.SENS_SMS_ACCESS_KEY,
+            'x-ncp-apigw-signature-v2': self.signature('POST', timestamp),
+        }
+        response = self.session.post(self.url + self.uri, headers=headers, data=json.dumps(body),
+                                     timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def close(self):
+        self.session.close()
+
+
+def is_rejected(error):
+    # 429 를 제외한 4xx 는 요청 자체가 잘못된 것이므로 다시 보내도 실패합니다
+    response = getattr(error, 'response', None)
+    return response is not None and 400 <= response.status_code < 500 and response.status_code != 429
+
+
+def send_jobs(client, jobs):
+    """
+    jobs 를 한 번의 요청으로 보내고 {job.id: (에러, 거절 여부, 응답 시간 ms)} 를 반환
+
+        batch 가 4xx 로 거절되면 잘못된 문자 하나 때문일 수 있으므로 한 건씩 다시 보내 그 문자만 실패로 처리하고,
+        연결 오류나 5xx 는 게이트웨이 문제이므로 batch 전체를 다시 시도합니다
+    """
+    started = time.monotonic()
+    try:
+        client.send([(job.phone_number, job.content) for job in jobs])
+        error = None
+    except requests.RequestException as e:
+        error = e
+    latency_ms = int((time.monotonic() - started) * 1000)
+
+    if error is not None and is_rejected(error) and len(jobs) > 1:
+        results = {}
+        for job in jobs:
+            results.update(send_jobs(client, [job]))
+        return results
+    result = ('' if error is None else str(error)[:255], error is not None and is_rejected(error), latency_ms)
+    return {job.id: result for job in jobs}
+
+
+def drain_outbox(client, batch_size=None):
+    """
+    발송 시간이 된 SMS 를 batch_size 건까지 한 번의 요청으로 발송하고, 처리한 작업 목록을 반환
+
+        - SELECT FOR UPDATE SKIP LOCKED 로 가져오므로 여러 worker 가 같은 문자를 중복 발송하지 않습니다
+        - 실패하면 SMS_OUTBOX_RETRY_SECONDS 부터 두 배씩 기다린 후 다시 보내고,
+          SMS_OUTBOX_MAX_ATTEMPTS 번 실패하면 발송실패로 처리합니다
+        - 게이트웨이가 4xx 로 거절한 문자는 다시 보내지 않고 바로 발송실패로 처리합니다 (send_jobs)
+    """
+    batch_size = batch_size or getattr(settings, 'SMS_OUTBOX_BATCH_SIZE', 100)
+    max_attempts = getattr(settings, 'SMS_OUTBOX_MAX_ATTEMPTS', 5)
+    retry_seconds = getattr(settings, 'SMS_OUTBOX_RETRY_SECONDS', 10)
+
+    with transaction.atomic():
+        jobs = list(SmsOutbox.objects.select_for_update(skip_locked=True)
+                    .filter(status=SmsOutbox.ChoiceStatus.PENDING, next_attempt_at__lte=timezone.now())
+                    .order_by('next_attempt_at', 'id')[:batch_size])
+        if not jobs:
+            return jobs
+
+        results = send_jobs(client, jobs)
+
+        now = timezone.now()
+        for job in jobs:
+            error, rejected, job.latency_ms = results[job.id]
+            job.attempts += 1
+            job.last_error = error
+            if not error:
+                job.status = SmsOutbox.ChoiceStatus.SENT
+                job.sent_at = now
+            elif rejected or job.attempts >= max_attempts:
+                job.status = SmsOutbox.ChoiceStatus.FAILED
+            else:
+                job.next_attempt_at = now + datetime.timedelta(seconds=retry_seconds * 2 ** (job.attempts - 1))
+        SmsOutbox.objects.bulk_update(jobs, ['attempts', 'latency_ms', 'last_error', 'status', 'sent_at',
+                                             'next_attempt_at'])
+    return jobs
@@ -1,7 +1,21 @@
+import datetime
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from model_bakery import baker
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from members.models import Member
+from core.exceptions import ShortCreditException
+from members.models import CreditLedger, Member, PhoneAuth, Profile, SmsOutbox
+from members.sms import SensClient, drain_outbox
+from payments.models import PaymentAfterUse
+from reservations.models import Reservation, ReservationStatus
 
 
 class MemberTestCase(APITestCase):
@@ -43,3 +57,321 @@ class MemberTestCase(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+
+class TotalDrivingDistanceTestCase(APITestCase):
+    def setUp(self):
+        self.member = Member.objects.create(email='distance@example.com', password='test')
+        self.zone = baker.make('carzones.CarZone')
+        self.car = baker.make('cars.Car', zone=self.zone)
+        self.client.force_authenticate(user=self.member)
+
+    def pay_after_use(self, driving_distance):
+        # 예약 서비스(book_reservation)의 결제 처리 없이 지난 예약을 만든 후 운행후결제만 저장합니다
+        date_time_start = timezone.now() - datetime.timedelta(days=1)
+        reservation, = Reservation.objects.bulk_create([
+            Reservation(member=self.member, zone=self.zone, car=self.car, date_time_start=date_time_start,
+                        date_time_end=date_time_start + datetime.timedelta(hours=1))])
+        ReservationStatus.objects.create(reservation=reservation, status=ReservationStatus.ChoiceStatus.PAID_1)
+        return PaymentAfterUse.objects.create(reservation=reservation, member=self.member,
+                                              driving_distance=driving_distance, first_section_fee=0,
+                                              second_section_fee=0, third_section_fee=0, total_fee=0)
+
+    def test_should_add_driving_distance_when_paid_after_use(self):
+        payment = self.pay_after_use(100)
+        self.pay_after_use(30)
+        payment.save()
+
+        self.assertEqual(130, Profile.objects.get(member=self.member).total_driving_distance)
+
+    def test_should_read_total_driving_distance_in_one_query(self):
+        """
+        Request : GET - /members
+        """
+        self.pay_after_use(100)
+        self.pay_after_use(30)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/members')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(130, response.data['results'][0]['total_driving_distance'])
+
+    def test_should_reconcile_total_driving_distance(self):
+        self.pay_after_use(100)
+        self.pay_after_use(30)
+        Profile.objects.filter(member=self.member).update(total_driving_distance=0)
+        other = Member.objects.create(email='other@example.com', password='test')
+
+        out = io.StringIO()
+        call_command('reconcile_driving_distance', '--dry-run', stdout=out)
+        self.assertIn('1 profiles out of sync', out.getvalue())
+        self.assertEqual(0, Profile.objects.get(member=self.member).total_driving_distance)
+
+        call_command('reconcile_driving_distance', stdout=io.StringIO())
+
+        self.assertEqual(130, Profile.objects.get(member=self.member).total_driving_distance)
+        self.assertEqual(0, Profile.objects.get(member=other).total_driving_distance)
+
+
+class CreditLedgerTestCase(APITestCase):
+    def setUp(self):
+        self.member = Member.objects.create(email='ledger@example.com', password='test')
+        self.default_credit = Profile.objects.get(member=self.member).credit_point
+        self.zone = baker.make('carzones.CarZone')
+        self.car = baker.make('cars.Car', zone=self.zone)
+        self.client.force_authenticate(user=self.member)
+
+    def pay_after_use(self, total_fee):
+        date_time_start = timezone.now() - datetime.timedelta(days=1)
+        reservation, = Reservation.objects.bulk_create([
+            Reservation(member=self.member, zone=self.zone, car=self.car, date_time_start=date_time_start,
+                        date_time_end=date_time_start + datetime.timedelta(hours=1))])
+        ReservationStatus.objects.create(reservation=reservation, status=ReservationStatus.ChoiceStatus.PAID_1)
+        return PaymentAfterUse.objects.create(reservation=reservation, member=self.member,
+                                              driving_distance=10, first_section_fee=0,
+                                              second_section_fee=0, third_section_fee=total_fee, total_fee=total_fee)
+
+    def test_should_record_ledger_without_updating_profile(self):
+        payment = self.pay_after_use(1000)
+        payment.save()
+
+        entry = CreditLedger.objects.get(member=self.member)
+        self.assertEqual(-1000, entry.amount)
+        self.assertEqual(CreditLedger.ChoiceReason.AFTER_USE, entry.reason)
+        self.assertEqual(payment.reservation_id, entry.reservation_id)
+        self.assertEqual(self.default_credit, Profile.objects.get(member=self.member).credit_point)
+        self.assertEqual(self.default_credit - 1000, CreditLedger.balance(self.member.id))
+
+    def test_should_compact_ledger(self):
+        self.pay_after_use(1000)
+        self.pay_after_use(300)
+        other = Member.objects.create(email='other@example.com', password='test')
+
+        out = io.StringIO()
+        call_command('compact_credit_ledger', stdout=out)
+
+        self.assertIn('compacted 2 credit ledger entries', out.getvalue())
+        self.assertEqual(self.default_credit - 1300, Profile.objects.get(member=self.member).credit_point)
+        self.assertEqual(self.default_credit - 1300, CreditLedger.balance(self.member.id))
+        self.assertEqual(self.default_credit, Profile.objects.get(member=other).credit_point)
+        self.assertFalse(CreditLedger.objects.filter(is_compacted=False).exists())
+        self.assertEqual(0, CreditLedger.compact())
+
+    def test_should_reject_after_use_charge_over_balance(self):
+        with self.assertRaises(ShortCreditException):
+            self.pay_after_use(self.default_credit + 1)
+
+        self.assertFalse(CreditLedger.objects.exists())
+        self.assertEqual(self.default_credit, CreditLedger.balance(self.member.id))
+
+    def test_should_compact_negative_balance(self):
+        # 관리자 조정으로 잔액이 음수가 된 회원이 있어도 다른 회원의 압축은 계속됩니다
+        CreditLedger.record(self.member.id, -self.default_credit - 500, CreditLedger.ChoiceReason.ADJUSTMENT)
+        other = Member.objects.create(email='other@example.com', password='test')
+        CreditLedger.record(other.id, -100, CreditLedger.ChoiceReason.ADJUSTMENT)
+
+        self.assertEqual(2, CreditLedger.compact())
+
+        self.assertEqual(-500, Profile.objects.get(member=self.member).credit_point)
+        self.assertEqual(-500, CreditLedger.balance(self.member.id))
+        self.assertEqual(self.default_credit - 100, CreditLedger.balance(other.id))
+        with self.assertRaises(ShortCreditException):
+            self.pay_after_use(1)
+
+    def test_should_read_balance_as_of(self):
+        first = self.pay_after_use(1000)
+        second = self.pay_after_use(300)
+        now = timezone.now()
+        CreditLedger.objects.filter(reservation=first.reservation).update(created_at=now - datetime.timedelta(days=2))
+        CreditLedger.objects.filter(reservation=second.reservation).update(created_at=now - datetime.timedelta(days=1))
+        CreditLedger.compact()
+        self.pay_after_use(50)
+
+        self.assertEqual(self.default_credit, CreditLedger.balance(self.member.id, now - datetime.timedelta(days=3)))
+        self.assertEqual(self.default_credit - 1000,
+                         CreditLedger.balance(self.member.id, now - datetime.timedelta(hours=36)))
+        self.assertEqual(self.default_credit - 1300,
+                         CreditLedger.balance(self.member.id, now - datetime.timedelta(hours=1)))
+        self.assertEqual(self.default_credit - 1350, CreditLedger.balance(self.member.id))
+
+    def test_should_read_credit_balance_in_one_query(self):
+        """
+        Request : GET - /members
+        """
+        self.pay_after_use(1000)
+        CreditLedger.compact()
+        self.pay_after_use(300)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/members')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.default_credit - 1300, response.data['results'][0]['credit_point'])
+
+
+class SensGatewayHandler(BaseHTTPRequestHandler):
+    """
+    테스트용 SENS 게이트웨이, 받은 요청을 기록하고 server.statuses 의 응답 코드를 차례로 돌려줍니다
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.received.append({'path': self.path, 'headers': dict(self.headers), 'body': body,
+                                     'client_port': self.client_address[1]})
+        status_code = self.server.statuses.pop(0) if self.server.statuses else 202
+        content = json.dumps({'statusCode': str(status_code)}).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class SmsOutboxTestCase(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.gateway = ThreadingHTTPServer(('127.0.0.1', 0), SensGatewayHandler)
+        cls.gateway.received = []
+        cls.gateway.statuses = []
+        threading.Thread(target=cls.gateway.serve_forever, daemon=True).start()
+        cls.settings = override_settings(SENS_SMS_URL=f'http://127.0.0.1:{cls.gateway.server_port}',
+                                         SMS_OUTBOX_MAX_ATTEMPTS=3, SMS_OUTBOX_RETRY_SECONDS=10)
+        cls.settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        cls.gateway.shutdown()
+        cls.gateway.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.gateway.received.clear()
+        self.gateway.statuses.clear()
+        self.client_sens = SensClient()
+
+    def tearDown(self):
+        self.client_sens.close()
+
+    def make_phone_auths(self, quantity):
+        return [PhoneAuth.objects.create(phone_number=f'0101234{index:04d}', registration_id='9001011')
+                for index in range(quantity)]
+
+    def make_due(self):
+        SmsOutbox.objects.update(next_attempt_at=timezone.now() - datetime.timedelta(seconds=1))
+
+    def test_should_queue_sms_without_calling_gateway(self):
+        """
+        Request : POST - /phone_auth
+        """
+        response = self.client.post('/phone_auth', data={'phone_number': '01012345678', 'registration_id': '9001011'})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        job = SmsOutbox.objects.get()
+        self.assertEqual('01012345678', job.phone_number)
+        self.assertEqual(f'[인증번호]: {response.data["auth_number"]}', job.content)
+        self.assertEqual(SmsOutbox.ChoiceStatus.PENDING, job.status)
+        self.assertEqual([], self.gateway.received)
+
+    def test_should_send_outbox_in_one_batch(self):
+        phone_auths = self.make_phone_auths(3)
+
+        out = io.StringIO()
+        call_command('send_sms_outbox', '--once', stdout=out)
+
+        self.assertEqual(1, len(self.gateway.received))
+        request = self.gateway.received[0]
+        self.assertTrue(request['path'].endswith('/messages'))
+        self.assertIn('x-ncp-apigw-signature-v2', {key.lower() for key in request['headers']})
+        self.assertEqual([{'to': phone_auth.phone_number, 'content': f'[인증번호]: {phone_auth.auth_number}'}
+                          for phone_auth in phone_auths], request['body']['messages'])
+        self.assertEqual(3, SmsOutbox.objects.filter(status=SmsOutbox.ChoiceStatus.SENT, attempts=1,
+                                                     latency_ms__isnull=False, sent_at__isnull=False).count())
+        self.assertIn('batch 3: sent 3, retry 0, failed 0', out.getvalue())
+
+    def test_should_reuse_gateway_connection(self):
+        self.make_phone_auths(2)
+
+        self.assertEqual(1, len(drain_outbox(self.client_sens, batch_size=1)))
+        self.assertEqual(1, len(drain_outbox(self.client_sens, batch_size=1)))
+
+        self.assertEqual(2, len(self.gateway.received))
+        self.assertEqual(1, len({request['client_port'] for request in self.gateway.received}))
+
+    def test_should_retry_with_backoff(self):
+        self.make_phone_auths(1)
+        self.gateway.statuses.extend([500, 503])
+
+        drain_outbox(self.client_sens)
+        job = SmsOutbox.objects.get()
+        self.assertEqual(SmsOutbox.ChoiceStatus.PENDING, job.status)
+        self.assertEqual(1, job.attempts)
+        self.assertIn('500', job.last_error)
+        self.assertAlmostEqual(10, (job.next_attempt_at - timezone.now()).total_seconds(), delta=2)
+        # 다음 시도 시간 전에는 보내지 않습니다
+        self.assertEqual([], drain_outbox(self.client_sens))
+
+        self.make_due()
+        drain_outbox(self.client_sens)
+        job.refresh_from_db()
+        self.assertEqual(2, job.attempts)
+        self.assertAlmostEqual(20, (job.next_attempt_at - timezone.now()).total_seconds(), delta=2)
+
+        self.make_due()
+        drain_outbox(self.client_sens)
+        job.refresh_from_db()
+        self.assertEqual(SmsOutbox.ChoiceStatus.SENT, job.status)
+        self.assertEqual('', job.last_error)
+        self.assertEqual(3, len(self.gateway.received))
+
+    def test_should_give_up_after_max_attempts(self):
+        self.make_phone_auths(1)
+        self.gateway.statuses.extend([500, 500, 500])
+
+        for _ in range(3):
+            drain_outbox(self.client_sens)
+            self.make_due()
+
+        job = SmsOutbox.objects.get()
+        self.assertEqual(SmsOutbox.ChoiceStatus.FAILED, job.status)
+        self.assertEqual(3, job.attempts)
+        self.assertEqual([], drain_outbox(self.client_sens))
+
+    def test_should_not_retry_rejected_sms(self):
+        self.make_phone_auths(1)
+        self.gateway.statuses.append(400)
+
+        drain_outbox(self.client_sens)
+
+        job = SmsOutbox.objects.get()
+        self.assertEqual(SmsOutbox.ChoiceStatus.FAILED, job.status)
+        self.assertEqual(1, job.attempts)
+        self.assertIn('400', job.last_error)
+
+    def test_should_fail_only_rejected_sms_in_batch(self):
+        phone_auths = self.make_phone_auths(3)
+        # batch 거절 후 한 건씩: 성공, 거절, 성공
+        self.gateway.statuses.extend([400, 202, 400, 202])
+
+        drain_outbox(self.client_sens)
+
+        self.assertEqual(4, len(self.gateway.received))
+        self.assertEqual([1, 1, 1], [len(request['body']['messages']) for request in self.gateway.received[1:]])
+        self.assertEqual({phone_auths[1].phone_number},
+                         set(SmsOutbox.objects.filter(status=SmsOutbox.ChoiceStatus.FAILED)
+                             .values_list('phone_number', flat=True)))
+        self.assertEqual(2, SmsOutbox.objects.filter(status=SmsOutbox.ChoiceStatus.SENT, attempts=1).count())
+
+    def test_should_retry_whole_batch_when_gateway_fails(self):
+        self.make_phone_auths(3)
+        self.gateway.statuses.append(503)
+
+        drain_outbox(self.client_sens)
+
+        self.assertEqual(1, len(self.gateway.received))
+        self.assertEqual(3, SmsOutbox.objects.filter(status=SmsOutbox.ChoiceStatus.PENDING, attempts=1).count())
@@ -1,8 +1,9 @@
+from django.db.models import F
 from rest_framework import status, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from members.models import Member, Profile, PhoneAuth
+from members.models import Member, Profile, PhoneAuth, pending_credit
 from core.permissions import IsAnonymous, IsUserSelf
 from members.serializers import MembersSerializer, ChangePasswordSerializer, ProfileSerializer, PhoneAuthSerializer, \
     CheckAuthNumberSerializer, MemberInfoSerializer
@@ -27,6 +28,14 @@ class MembersViewSet(mixins.CreateModelMixin,
         else:
             return super().get_serializer_class()
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            # 크레딧 잔액과 누적 운행거리를 회원과 같이 한 번에 가져옵니다
+            queryset = queryset.select_related('profile') \
+                .annotate(credit_balance=F('profile__credit_point') + pending_credit('id'))
+        return queryset
+
     def filter_queryset(self, queryset):
         if self.action == 'list':
             queryset = queryset.filter(id=self.request.user.id)
@@ -54,7 +63,7 @@ class MembersViewSet(mixins.CreateModelMixin,
 
 class ProfileViewSet(mixins.ListModelMixin,
                      GenericViewSet):
-    queryset = Profile.objects.all()
+    queryset = Profile.objects.select_related('member').with_credit_balance()
     serializer_class = ProfileSerializer
 
     def filter_queryset(self, queryset):
@@ -0,0 +1,25 @@
+# Generated by Django 3.1.1 on 2026-10-18 09:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymentafteruse',
+            index=models.Index(fields=['member', 'driving_distance'], name='payment_after_member_dist_idx'),
+        ),
+        migrations.AlterField(
+            model_name='paymentafteruse',
+            name='member',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='payments_after', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -3,7 +3,7 @@ from django.db import models, transaction
 # Create your models here.
 from django.db.models import F
 
-from members.models import Profile
+from members.models import CreditLedger, Profile
 
 
 class PaymentBeforeUse(models.Model):
@@ -23,7 +23,9 @@ class PaymentBeforeUse(models.Model):
 class PaymentAfterUse(models.Model):
     reservation = models.OneToOneField('reservations.Reservation', on_delete=models.CASCADE,
                                        related_name='payment_after')
-    member = models.ForeignKey('members.Member', on_delete=models.CASCADE, related_name='payments_after')
+    # payment_after_member_dist_idx 가 member 로 시작하므로 FK 인덱스는 따로 만들지 않습니다
+    member = models.ForeignKey('members.Member', on_delete=models.CASCADE, related_name='payments_after',
+                               db_index=False)
     driving_distance = models.PositiveIntegerField(help_text='운행거리')
     first_section_fee = models.PositiveIntegerField(help_text='0~30km 구간 주행요금')
     second_section_fee = models.PositiveIntegerField(help_text='31~100km 구간 주행요금')
@@ -33,10 +35,19 @@ class PaymentAfterUse(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, help_text='TimeStamp')
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # 회원별 총 운행거리 합계 (MemberInfoSerializer), index only scan 으로 처리되도록 운행거리까지 색인합니다
+            models.Index(fields=['member', 'driving_distance'], name='payment_after_member_dist_idx'),
+        ]
+
     def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
         with transaction.atomic():
-            # blance
-            Profile.objects.filter(member_id=self.member.id).update(credit_point=F('credit_point') - self.total_fee)
+            adding = self._state.adding
+            if adding:
+                # 누적 운행거리
+                Profile.objects.filter(member_id=self.member_id).update(
+                    total_driving_distance=F('total_driving_distance') + self.driving_distance)
 
             # PaymentAfterUse save
             super().save(force_insert, force_update, using, update_fields)
@@ -45,6 +56,11 @@ class PaymentAfterUse(models.Model):
             self.reservation.status.status = self.reservation.status.ChoiceStatus.PAID_2
             self.reservation.status.save()
 
+            if adding:
+                # blance, 회원별 잔액 lock 은 commit 할 때까지 유지되므로 마지막에 차감합니다
+                CreditLedger.charge(self.member_id, self.total_fee, CreditLedger.ChoiceReason.AFTER_USE,
+                                    self.reservation_id)
+
 
 class TollFee(models.Model):
     reservation = models.ForeignKey('reservations.Reservation', on_delete=models.CASCADE,
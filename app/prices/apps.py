@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class PricesConfig(AppConfig):
     name = 'prices'
+
+    def ready(self):
+        import prices.signals  # noqa: F401
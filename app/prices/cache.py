@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class QuoteCache:
+    """
+    (차량 요금 버전, 대여기간) 별 견적을 담아두는 프로세스 로컬 LRU 캐시
+
+        - 같은 견적이 쏘카존 조회 -> 차량 목록 -> 요금 조회에서 반복 계산되지 않도록 합니다
+          (결제 금액은 캐시하지 않고 계산합니다, quote_car(..., use_cache=False))
+        - 항목 수는 QUOTE_CACHE_MAX_SIZE 로 제한하고, 오래 사용되지 않은 견적부터 밀어냅니다
+        - CarPrice / InsuranceFee 가 admin, import_export 등으로 저장/삭제되면 signal 로 해당 차량의 요금 버전을 올립니다
+          (prices/signals.py, 저장할 때와 commit 후 두 번), 이전 버전 키의 견적은 더 이상 조회되지 않고 LRU 로 밀려납니다
+        - 다른 프로세스(gunicorn worker)에서 변경된 요금은 QUOTE_CACHE_TTL 초가 지나면 다시 계산됩니다
+    """
+
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size or getattr(settings, 'QUOTE_CACHE_MAX_SIZE', 10000)
+        self.ttl = ttl if ttl is not None else getattr(settings, 'QUOTE_CACHE_TTL', 300)
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._versions = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_many(self, car_ids, date_time_start, date_time_end):
+        """
+        return : ({car_id: 견적}, {캐시에 없는 car_id: 조회 시점의 요금 버전})
+
+            계산 도중 요금이 바뀌어도 이전 요금으로 계산한 견적이 새 버전으로 저장되지 않도록
+            set_many 에는 조회 시점의 버전을 그대로 넘겨줍니다
+        """
+        found = {}
+        missing = {}
+        now = time.monotonic()
+        with self._lock:
+            for car_id in car_ids:
+                version = self._versions.get(car_id, 0)
+                key = (car_id, version, date_time_start, date_time_end)
+                entry = self._entries.get(key)
+                if entry is None or now - entry[0] > self.ttl:
+                    if entry is not None:
+                        del self._entries[key]
+                    missing[car_id] = version
+                    continue
+                self._entries.move_to_end(key)
+                found[car_id] = entry[1]
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def set_many(self, quotes, versions, date_time_start, date_time_end):
+        now = time.monotonic()
+        with self._lock:
+            for car_id, quote in quotes.items():
+                key = (car_id, versions[car_id], date_time_start, date_time_end)
+                self._entries[key] = (now, quote)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_car(self, car_id):
+        with self._lock:
+            self._versions[car_id] = self._versions.get(car_id, 0) + 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+quote_cache = QuoteCache()
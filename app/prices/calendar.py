@@ -0,0 +1,52 @@
+import datetime
+from itertools import accumulate
+
+# KST 는 서머타임이 없어 UTC+9 고정 오프셋으로 계산합니다
+KST_OFFSET = datetime.timedelta(hours=9)
+# 기준 시점 : 2020-01-06(월) 00:00 KST
+CALENDAR_EPOCH = datetime.datetime(2020, 1, 6, tzinfo=datetime.timezone.utc) - KST_OFFSET
+
+DAY_SECONDS = 24 * 60 * 60
+WEEK_SECONDS = 7 * DAY_SECONDS
+TEN_MINUTES_SECONDS = 10 * 60
+# 기본요금에 포함된 시간 (30분)
+BASE_DURATION = datetime.timedelta(minutes=30)
+
+# 주중 : 월 ~ 목, 주말 : 금 ~ 일 (KST, 월요일 = 0)
+WEEKEND_DAYS = (False, False, False, False, True, True, True)
+# 한 주의 시작(월 00:00)부터 각 요일 시작까지 누적된 주말 시간 (초)
+WEEKEND_PREFIX_SECONDS = [0] + list(accumulate(DAY_SECONDS if is_weekend else 0 for is_weekend in WEEKEND_DAYS))
+WEEKEND_SECONDS_PER_WEEK = WEEKEND_PREFIX_SECONDS[-1]
+
+
+def weekend_seconds_until(date_time):
+    """
+    기준 시점부터 date_time 까지 누적된 주말 시간 (초)
+
+        주 단위 누적값 + 요일별 누적값 + 당일 경과시간으로 대여기간 길이와 상관없이 상수 시간에 계산합니다
+    """
+    weeks, seconds = divmod((date_time - CALENDAR_EPOCH).total_seconds(), WEEK_SECONDS)
+    day, seconds = divmod(seconds, DAY_SECONDS)
+    day = int(day)
+    return (weeks * WEEKEND_SECONDS_PER_WEEK + WEEKEND_PREFIX_SECONDS[day]
+            + (seconds if WEEKEND_DAYS[day] else 0))
+
+
+def split_weekday_weekend_seconds(date_time_start, date_time_end):
+    """
+    [date_time_start, date_time_end) 구간을 주중 / 주말 시간(초)으로 나눔
+
+        return : (주중 시간, 주말 시간)
+    """
+    total = (date_time_end - date_time_start).total_seconds()
+    weekend = weekend_seconds_until(date_time_end) - weekend_seconds_until(date_time_start)
+    return total - weekend, weekend
+
+
+def term_price(base_price, weekday_price_per_ten_min, weekend_price_per_ten_min, date_time_start, date_time_end):
+    """
+    기본요금(30분) 이후 시간을 주중 / 주말 10분당 요금으로 나눠 계산한 대여요금
+    """
+    weekday, weekend = split_weekday_weekend_seconds(date_time_start + BASE_DURATION, date_time_end)
+    return int(base_price + (weekday * weekday_price_per_ten_min + weekend * weekend_price_per_ten_min)
+               / TEN_MINUTES_SECONDS)
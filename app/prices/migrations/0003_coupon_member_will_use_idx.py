@@ -0,0 +1,17 @@
+# Generated by Django 3.1.1 on 2026-10-18 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prices', '0002_coupon_date_time_start'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coupon',
+            index=models.Index(condition=models.Q(('is_enabled', True), ('will_use_check', True)), fields=['member'], name='coupon_member_will_use_idx'),
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.db import models
+from django.utils import timezone
 import datetime
 
 # Create your models here.
 from core.utils import time_format
+from prices.calendar import term_price
 
 
 class CarPrice(models.Model):
@@ -26,16 +28,12 @@ class CarPrice(models.Model):
     def get_price(self, date_time_start, date_time_end):
         date_time_start = self.str_to_date_time_UTC(date_time_start)
         date_time_end = self.str_to_date_time_UTC(date_time_end)
-        total_minutes = (date_time_end - date_time_start).total_seconds() / 60
-        count_ten_minutes = (total_minutes - 30) / 10
-        rental_price = int(self.standard_price + count_ten_minutes * self.weekday_price_per_ten_min)
-        return rental_price
+        return self.get_price_from_iso_format(date_time_start, date_time_end)
 
     def get_price_from_iso_format(self, date_time_start, date_time_end):
-        total_minutes = (date_time_end - date_time_start).total_seconds() / 60
-        count_ten_minutes = (total_minutes - 30) / 10
-        rental_price = int(self.standard_price + count_ten_minutes * self.weekday_price_per_ten_min)
-        return rental_price
+        # 기본요금(30분) 이후 시간은 KST 기준 주중 / 주말 요금을 나눠서 적용
+        return term_price(self.standard_price, self.weekday_price_per_ten_min, self.weekend_price_per_ten_min,
+                          date_time_start, date_time_end)
 
 
 # 차량손해면책 상품
@@ -110,4 +108,23 @@ class Coupon(models.Model):
     is_free = models.BooleanField(default=False, help_text='무료쿠폰여부')
     description = models.CharField(max_length=160, null=True, help_text='부가설명')
     created_at = models.DateTimeField(auto_now_add=True, help_text='TimeStamp')
-    updated_at = models.DateTimeField(auto_now=True)
\ No newline at end of file
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # 예약시 사용 체크한 쿠폰 조회 (reservations/services.py), 사용 체크한 사용가능 쿠폰만 색인합니다
+            models.Index(fields=['member'], name='coupon_member_will_use_idx',
+                         condition=models.Q(will_use_check=True, is_enabled=True)),
+        ]
+
+    @classmethod
+    def expire_outdated(cls):
+        """
+        만료시간이 지난 사용가능 쿠폰을 한 번의 UPDATE 로 사용불가 처리 (materialize_statuses 명령)
+
+            사용시작 전 쿠폰은 시작 후 사용할 수 있어야 하므로 바꾸지 않습니다
+            return : 만료 처리한 쿠폰 수
+        """
+        now = timezone.now()
+        return cls.objects.filter(is_enabled=True, expire_date_time__lte=now) \
+            .update(is_enabled=False, updated_at=now)
@@ -0,0 +1,83 @@
+from collections import namedtuple
+
+from cars.models import Car
+from core.utils import time_format
+from prices.cache import quote_cache
+from prices.calendar import BASE_DURATION, TEN_MINUTES_SECONDS, split_weekday_weekend_seconds
+
+# 한 번의 쿼리로 가져오는 차량별 대여요금 컬럼
+CAR_PRICE_COLUMNS = ('carprice__standard_price', 'carprice__weekday_price_per_ten_min',
+                     'carprice__weekend_price_per_ten_min')
+# 보험료 컬럼 (순서대로 base, per_ten_min 쌍)
+INSURANCE_COLUMNS = ('insurances__special_price', 'insurances__special_price_per_ten_min',
+                     'insurances__standard_price', 'insurances__standard_price_per_ten_min',
+                     'insurances__light_price', 'insurances__light_price_per_ten_min')
+INSURANCE_TYPES = ('special', 'standard', 'light')
+
+Quote = namedtuple('Quote', ['term_price', 'insurance_prices'])
+
+
+def parse_quote_window(query_params):
+    """
+    쿼리 파라미터(KST, 202009261400 형식)의 대여기간을 UTC datetime 으로 한 번만 변환
+    """
+    return time_format(query_params.get('date_time_start')), time_format(query_params.get('date_time_end'))
+
+
+def count_ten_minutes(date_time_start, date_time_end):
+    # 기본요금(30분)을 제외한 10분 단위 개수, InsuranceFee 의 get_*_price 와 같은 계산식
+    total_minutes = (date_time_end - date_time_start).total_seconds() / 60
+    return (total_minutes - 30) / 10
+
+
+def quote_cars(cars, date_time_start, date_time_end, use_cache=True):
+    """
+    여러 차량의 대여요금과 보험료 3종을 한 번에 계산
+
+        cars : Car 인스턴스 또는 car id 목록
+        return : {car_id: Quote(term_price, {'special': .., 'standard': .., 'light': ..})}
+
+        캐시(prices/cache.py)에 없는 차량의 요금 정보만 쿼리 한 번으로 가져오고, 대여기간은 한 번만 계산합니다.
+        요금 / 보험료 정보가 없는 차량은 해당 값이 None 입니다.
+        결제할 금액은 다른 worker 에서 바뀐 요금이 캐시에 남아 있을 수 있으므로 use_cache=False 로 DB 에서 계산합니다.
+    """
+    car_ids = [_car_id(car) for car in cars]
+    if not car_ids:
+        return {}
+    if not use_cache:
+        return _calculate_quotes(car_ids, date_time_start, date_time_end)
+
+    quotes, missing = quote_cache.get_many(car_ids, date_time_start, date_time_end)
+    if missing:
+        calculated = _calculate_quotes(list(missing), date_time_start, date_time_end)
+        quote_cache.set_many(calculated, missing, date_time_start, date_time_end)
+        quotes.update(calculated)
+    return quotes
+
+
+def quote_car(car, date_time_start, date_time_end, use_cache=True):
+    car_id = _car_id(car)
+    return quote_cars([car_id], date_time_start, date_time_end, use_cache)[car_id]
+
+
+def _car_id(car):
+    # view kwargs 로 넘어온 car_pk 문자열도 캐시 키가 같도록 정수로 맞춥니다
+    return int(getattr(car, 'id', car))
+
+
+def _calculate_quotes(car_ids, date_time_start, date_time_end):
+    ten_minutes = count_ten_minutes(date_time_start, date_time_end)
+    # 주중 / 주말 시간은 대여기간으로만 정해지므로 한 번만 나눕니다 (CarPrice.get_price 와 같은 계산식)
+    weekday, weekend = split_weekday_weekend_seconds(date_time_start + BASE_DURATION, date_time_end)
+    rows = Car.objects.filter(id__in=car_ids).values_list('id', *CAR_PRICE_COLUMNS, *INSURANCE_COLUMNS)
+
+    quotes = {}
+    for car_id, standard_price, weekday_price, weekend_price, *insurances in rows:
+        term_price = None if standard_price is None else int(
+            standard_price + (weekday * weekday_price + weekend * weekend_price) / TEN_MINUTES_SECONDS)
+        insurance_prices = [
+            None if base is None else int(base + ten_minutes * per_ten_min)
+            for base, per_ten_min in zip(insurances[::2], insurances[1::2])
+        ]
+        quotes[car_id] = Quote(term_price, dict(zip(INSURANCE_TYPES, insurance_prices)))
+    return quotes
@@ -3,8 +3,10 @@ from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 
 from cars.models import Car
+from core.compiled_serializers import CompiledSerializer
 from core.utils import time_format, KST
 from prices.models import CarPrice, InsuranceFee, Coupon
+from prices.quotes import parse_quote_window, quote_cars
 
 
 class CarPriceDetailSerializer(ModelSerializer):
@@ -26,29 +28,52 @@ class CarPriceDetailSerializer(ModelSerializer):
                             ]
 
 
-class SummaryCarAndCarPriceSerializer(ModelSerializer):
+class CarPriceDetailCompiledSerializer(CompiledSerializer):
+    serializer_class = CarPriceDetailSerializer
+
+
+class CarQuoteMixin:
+    @staticmethod
+    def get_quote_window(context):
+        if 'quote_window' not in context:
+            context['quote_window'] = parse_quote_window(context.get('request').query_params)
+        return context['quote_window']
+
+    def get_quote(self, car):
+        quotes = self.context.setdefault('quotes', {})
+        if car.id not in quotes:
+            quotes.update(quote_cars([car], *self.get_quote_window(self.context)))
+        return quotes[car.id]
+
+    def get_term_price(self, car):
+        return self.get_quote(car).term_price
+
+    def get_insurance_prices(self, car):
+        return self.get_quote(car).insurance_prices
+
+
+class QuotedCarListSerializer(serializers.ListSerializer):
+    """
+    차량 목록의 요금 / 보험료를 한 번에 계산해서 context 에 담아두고, 각 차량 serializer 는 꺼내 쓰기만 합니다
+    """
+
+    def to_representation(self, data):
+        cars = list(data.all() if hasattr(data, 'all') else data)
+        self.context.setdefault('quotes', {}).update(
+            quote_cars(cars, *CarQuoteMixin.get_quote_window(self.context)))
+        return super().to_representation(cars)
+
+
+class SummaryCarAndCarPriceSerializer(CarQuoteMixin, ModelSerializer):
     term_price = serializers.SerializerMethodField()
     insurance_prices = serializers.SerializerMethodField()
 
     class Meta:
+        list_serializer_class = QuotedCarListSerializer
         model = Car
         fields = ['id', 'name', 'image', 'is_event_model', 'term_price', 'insurance_prices']
         read_only_fields = ['id', 'name', 'image', 'is_event_model', 'term_price', 'insurance_prices']
 
-    def get_term_price(self, car):
-        date_time_start = self.context.get('request').query_params.get('date_time_start')
-        date_time_end = self.context.get('request').query_params.get('date_time_end')
-        return car.carprice.get_price(date_time_start, date_time_end)
-
-    def get_insurance_prices(self, car):
-        date_time_start = self.context.get('request').query_params.get('date_time_start')
-        date_time_end = self.context.get('request').query_params.get('date_time_end')
-        return {
-            'special': car.insurances.get_special_price(date_time_start, date_time_end),
-            'standard': car.insurances.get_standard_price(date_time_start, date_time_end),
-            'light': car.insurances.get_light_price(date_time_start, date_time_end)
-        }
-
 
 class InsuranceFeeSerializer(ModelSerializer):
     insurance_prices = serializers.SerializerMethodField()
@@ -107,10 +132,17 @@ class CouponSerializer(ModelSerializer):
                             ]
 
     def get_is_enabled(self, obj):
-        # 현재 시간 기준 만료인지 확인
-        if obj.expire_date_time <= timezone.now() or timezone.now() <= obj.date_time_start:
-            obj.is_enabled = False
-            obj.save()
-            return False
-        else:
-            return True
+        # 현재 시간 기준 만료인지 확인 (만료된 쿠폰의 저장은 materialize_statuses 명령에서 한 번에 처리합니다)
+        return obj.date_time_start < timezone.now() < obj.expire_date_time
+
+
+class CouponCompiledSerializer(CompiledSerializer):
+    serializer_class = CouponSerializer
+
+    @classmethod
+    def compile_is_enabled(cls, field):
+        def factory(serializer):
+            # get_is_enabled 와 같은 계산이고, 현재 시간은 목록마다 한 번만 읽습니다
+            now = timezone.now()
+            return lambda row: row['date_time_start'] < now < row['expire_date_time']
+        return ['date_time_start', 'expire_date_time'], factory
@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from prices.cache import quote_cache
+from prices.models import CarPrice, InsuranceFee
+
+
+@receiver(post_save, sender=CarPrice)
+@receiver(post_delete, sender=CarPrice)
+@receiver(post_save, sender=InsuranceFee)
+@receiver(post_delete, sender=InsuranceFee)
+def invalidate_quote_cache(sender, instance, **kwargs):
+    """
+    저장한 transaction 안의 조회가 새 요금을 보도록 바로 버전을 올리고,
+    commit 전에 다른 thread 가 이전 요금으로 계산해 캐시한 견적은 commit 후에 버전을 한 번 더 올려 버립니다
+    """
+    car_id = instance.car_id
+    quote_cache.invalidate_car(car_id)
+    transaction.on_commit(lambda: quote_cache.invalidate_car(car_id))
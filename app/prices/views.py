@@ -4,18 +4,25 @@ from django.shortcuts import render
 from rest_framework import mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.viewsets import GenericViewSet
+from rest_framework.permissions import IsAdminUser
+from rest_framework.viewsets import GenericViewSet, ViewSet
 
+from core.compiled_serializers import CompiledListMixin
+from core.db_routers import ReplicaReadMixin
 from core.permissions import IsOwner
+from prices.cache import quote_cache
 from prices.models import Coupon
-from prices.serializers import CouponSerializer
+from prices.serializers import CouponSerializer, CouponCompiledSerializer
 
 
-class CouponViewSet(mixins.ListModelMixin,
+class CouponViewSet(CompiledListMixin,
+                    ReplicaReadMixin,
+                    mixins.ListModelMixin,
                     mixins.RetrieveModelMixin,
                     GenericViewSet):
     queryset = Coupon.objects.all()
     serializer_class = CouponSerializer
+    compiled_serializer_class = CouponCompiledSerializer
     permission_classes = [IsOwner, ]
 
     def filter_queryset(self, queryset):
@@ -36,3 +43,18 @@ class CouponViewSet(mixins.ListModelMixin,
         instance.save()
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
+
+
+class QuoteCacheViewSet(ViewSet):
+    """
+        견적 캐시 상태를 반환하는 API (관리자 전용)
+        ---
+        # 내용
+            [GET] /quote_cache
+            -> 요청을 처리한 프로세스의 견적 캐시 크기, 적중(hits) / 실패(misses) 횟수, 밀려난 항목 수 등을 반환합니다.
+               캐시 크기(QUOTE_CACHE_MAX_SIZE)와 만료 시간(QUOTE_CACHE_TTL)을 정할 때 참고합니다.
+    """
+    permission_classes = [IsAdminUser, ]
+
+    def list(self, request, *args, **kwargs):
+        return Response(quote_cache.stats())
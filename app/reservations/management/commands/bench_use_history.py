@@ -0,0 +1,84 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from cars.models import Car
+from carzones.models import CarZone
+from core.benchmarks import benchmark_database, analyze, timed
+from members.models import Member
+from payments.models import PaymentAfterUse
+from reservations.models import Reservation, ReservationStatus
+from reservations.serializers import UseHistoryListSerializer
+
+
+class Command(BaseCommand):
+    help = '이용 내역(/reservations/history) 페이지 직렬화 성능 비교 (임시 DB 에서 실행됩니다)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=3)
+        parser.add_argument('--reservations-per-member', type=int, default=10000)
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--pages', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            members = self.seed(options['members'], options['reservations_per_member'])
+            self.run(members, options['page_size'], options['pages'])
+
+    def seed(self, member_count, reservations_per_member):
+        zone = CarZone.objects.create(name='bench', address='bench')
+        cars = Car.objects.bulk_create([
+            Car(zone=zone, number=f'bench-{index}', name='bench', manufacturer=Car.ChoiceManufacturer.KIA,
+                riding_capacity=5, is_event_model=False)
+            for index in range(10)
+        ])
+        members = [Member.objects.create(email=f'bench{index}@example.com', password='bench')
+                   for index in range(member_count)]
+
+        # 지난 이용 내역 (반납완료, 절반은 운행후결제까지 완료)
+        first = timezone.now() - datetime.timedelta(hours=reservations_per_member + 1)
+        reservations = Reservation.objects.bulk_create([
+            Reservation(member=member, zone=zone, car=cars[index % len(cars)],
+                        date_time_start=first + datetime.timedelta(hours=index),
+                        date_time_end=first + datetime.timedelta(hours=index, minutes=30))
+            for member in members for index in range(reservations_per_member)
+        ], batch_size=2000)
+        ReservationStatus.objects.bulk_create([
+            ReservationStatus(reservation=reservation, status=ReservationStatus.ChoiceStatus.FINISHED)
+            for reservation in reservations
+        ], batch_size=2000)
+        PaymentAfterUse.objects.bulk_create([
+            PaymentAfterUse(reservation=reservation, member_id=reservation.member_id, driving_distance=index % 300,
+                            first_section_fee=0, second_section_fee=0, third_section_fee=0, total_fee=0)
+            for index, reservation in enumerate(reservations) if index % 2
+        ], batch_size=2000)
+        analyze(Reservation, ReservationStatus, PaymentAfterUse)
+        self.stdout.write(f'seeded {len(members)} members, {len(reservations)} reservations')
+        return members
+
+    def run(self, members, page_size, page_count):
+        # CursorPagination(ordering='id') 와 같은 방식으로 회원별 페이지를 나눕니다
+        pages = []
+        for member in members:
+            ids = list(Reservation.objects.filter(member=member).order_by('id').values_list('id', flat=True))
+            step = max(len(ids) // max(page_count // len(members), 1), page_size)
+            pages += [(member, cursor) for cursor in ids[::step]]
+
+        def serialize(queryset):
+            def page(member, cursor):
+                reservations = queryset.filter(member=member, id__gte=cursor).order_by('id')[:page_size]
+                return UseHistoryListSerializer(reservations, many=True).data
+            return page
+
+        def bench(name, func):
+            with CaptureQueriesContext(connection) as queries:
+                results, elapsed = timed(func, pages)
+            self.stdout.write(f'{name:<40} {elapsed:8.3f} ms/page {len(queries) / len(pages):6.1f} queries/page')
+            return results
+
+        per_row = bench('history page (per-row queries)', serialize(Reservation.objects.all()))
+        joined = bench('history page (for_use_history join)', serialize(Reservation.objects.for_use_history()))
+        assert per_row == joined, 'for_use_history and per-row serialization disagree'
@@ -0,0 +1,25 @@
+# Generated by Django 3.1.1 on 2026-10-18 09:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reservations', '0003_photobeforeuse'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['member', 'id'], name='reservation_member_id_idx'),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='member',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reservation_members', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.1 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0004_reservation_member_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photobeforeuse',
+            name='image_variants_name',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
@@ -1,12 +1,17 @@
-from django.db import models, transaction
-from django.db.models import F
+from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.translation import gettext as _
 
 # Create your models here.
-from cars.models import CarTimeTable
-from members.models import Profile
-from payments.models import PaymentBeforeUse
-from prices.models import Coupon
+
+
+class ReservationQuerySet(models.QuerySet):
+    def for_use_history(self):
+        # 이용 내역(UseHistoryListSerializer)에 필요한 상태, 쏘카존, 차량, 운행거리를 한 번의 join 쿼리로 가져옵니다
+        return self.select_related('status', 'zone', 'car') \
+            .annotate(driving_distance=Coalesce('payment_after__driving_distance', Value(0)))
 
 
 class Reservation(models.Model):
@@ -15,7 +20,9 @@ class Reservation(models.Model):
         STANDARD = 'standard', _('스탠다드')
         LIGHT = 'light', _('라이트')
 
-    member = models.ForeignKey('members.Member', on_delete=models.CASCADE, related_name='reservation_members')
+    # reservation_member_id_idx 가 member 로 시작하므로 FK 인덱스는 따로 만들지 않습니다
+    member = models.ForeignKey('members.Member', on_delete=models.CASCADE, related_name='reservation_members',
+                               db_index=False)
     zone = models.ForeignKey('carzones.CarZone', on_delete=models.CASCADE, related_name='reservation_zones')
     car = models.ForeignKey('cars.Car', on_delete=models.CASCADE, related_name='reservation_cars')
     insurance = models.CharField(choices=ChoiceInsuranceType.choices, default=ChoiceInsuranceType.LIGHT,
@@ -26,101 +33,13 @@ class Reservation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, help_text='TimeStamp')
     updated_at = models.DateTimeField(auto_now=True)
 
-    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
-        is_extension = False
-        # 대여 가격
-        if self.id is None:
-            car_rental_price = self.car.carprice.get_price_from_iso_format(self.date_time_start, self.date_time_end)
-            if self.insurance == 'light':
-                insurance_price = self.car.insurances.get_light_price_from_iso_format(self.date_time_start,
-                                                                                      self.date_time_end)
-            elif self.insurance == 'standard':
-                insurance_price = self.car.insurances.get_standard_price_from_iso_format(self.date_time_start,
-                                                                                         self.date_time_end)
-            elif self.insurance == 'special':
-                insurance_price = self.car.insurances.get_special_price_from_iso_format(self.date_time_start,
-                                                                                        self.date_time_end)
-        elif self.date_time_extension is not None:
-            is_extension = True
-            # 연장요금 계산
-            extra_car_rental_price = self.car.carprice.get_price_from_iso_format(self.date_time_end,
-                                                                                 self.date_time_extension)
-            if self.insurance == 'light':
-                extra_insurance_price = self.car.insurances.get_light_price_from_iso_format(self.date_time_end,
-                                                                                            self.date_time_extension)
-            elif self.insurance == 'standard':
-                extra_insurance_price = self.car.insurances.get_standard_price_from_iso_format(self.date_time_end,
-                                                                                               self.date_time_extension)
-            elif self.insurance == 'special':
-                extra_insurance_price = self.car.insurances.get_special_price_from_iso_format(self.date_time_end,
-                                                                                              self.date_time_extension)
-        # 쿠폰 체크
-        coupon_discount = 0
-        coupon_id = 0
-        if Coupon.objects.filter(member_id=self.member.id, will_use_check=True, is_enabled=True).exists():
-            coupon = Coupon.objects.get(member_id=self.member.id, will_use_check=True, is_enabled=True)
-            coupon_discount = coupon.discount_fee
-            coupon_id = coupon.id
-
-        if is_extension:
-            # 연장 요금
-            total_fee = extra_car_rental_price + extra_insurance_price
-        else:
-            # 기본 대여 요금
-            if coupon_discount > car_rental_price + insurance_price:
-                # 쿠폰이 대여 가격보다 높아서 음수가 나올 경우
-                total_fee = car_rental_price + insurance_price
-            else:
-                total_fee = car_rental_price + insurance_price - coupon_discount
-
-        with transaction.atomic():
-            # blance
-            Profile.objects.filter(member_id=self.member.id).update(credit_point=F('credit_point') - total_fee)
-
-            # Reservation save()
-            super().save(force_insert, force_update, using, update_fields)
-
-            if is_extension:
-                # Extension Status save
-                extension_status = ReservationStatus.objects.get(reservation_id=self.id)
-                extension_status.status = ReservationStatus.ChoiceStatus.EXTENDED
-                extension_status.save()
+    objects = ReservationQuerySet.as_manager()
 
-                # 기존 결제 정보에 연장료 추가 저장
-                PaymentBeforeUse.objects.filter(reservation_id=self.id).update(
-                    extension_fee=F('extension_fee') + total_fee)
-                PaymentBeforeUse.objects.filter(reservation_id=self.id).update(
-                    total_fee=F('total_fee') + F('extension_fee'))
-
-                # Extension TimeTable save
-                timetable = CarTimeTable.objects.get(zone_id=self.zone_id,
-                                                     car_id=self.car_id,
-                                                     date_time_start=self.date_time_start)
-                timetable.date_time_end = self.date_time_extension
-                timetable.save()
-            else:
-                # paid_1 Status save
-                ReservationStatus.objects.create(reservation_id=self.id,
-                                                 status=ReservationStatus.ChoiceStatus.PAID_1)
-
-                # Payment report save
-                PaymentBeforeUse.objects.create(reservation_id=self.id,
-                                                member=self.member,
-                                                rental_fee=car_rental_price,
-                                                insurance_fee=insurance_price,
-                                                coupon_discount=coupon_discount,
-                                                total_fee=total_fee)
-                # CarTimeTable save
-                CarTimeTable.objects.create(zone_id=self.zone_id,
-                                            car_id=self.car_id,
-                                            date_time_start=self.date_time_start,
-                                            date_time_end=self.date_time_end)
-
-                # Coupon save
-                if coupon_id:
-                    coupon.is_enabled = False
-                    coupon.is_used = True
-                    coupon.save()
+    class Meta:
+        indexes = [
+            # 회원별 예약 목록 / 이용 내역 cursor pagination (ordering = 'id')
+            models.Index(fields=['member', 'id'], name='reservation_member_id_idx'),
+        ]
 
 
 class ReservationStatus(models.Model):
@@ -139,9 +58,21 @@ class ReservationStatus(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, help_text='TimeStamp')
     updated_at = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def finish_paid(cls):
+        """
+        운행후결제완료(PAID_2) 상태를 반납완료(FINISHED)로 한 번의 UPDATE 로 변경 (materialize_statuses 명령)
+
+            return : 변경한 상태 수
+        """
+        return cls.objects.filter(status=cls.ChoiceStatus.PAID_2) \
+            .update(status=cls.ChoiceStatus.FINISHED, updated_at=timezone.now())
+
 
 class PhotoBeforeUse(models.Model):
     reservation = models.ForeignKey('reservations.Reservation', related_name='ready_photos', on_delete=models.CASCADE)
     member = models.ForeignKey('members.Member', related_name='image_owners', on_delete=models.CASCADE)
     image = models.ImageField(null=True, upload_to=f'ImagesBeforeUse/%Y/%m/%d/{reservation}/')
+    # 변형 이미지(core/images.py)를 만든 원본 이미지 이름, image 와 같을 때만 변형 이미지 URL 을 보여줍니다
+    image_variants_name = models.CharField(max_length=100, blank=True, default='')
     time_stamp = models.DateTimeField(auto_now_add=True)
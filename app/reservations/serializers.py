@@ -1,17 +1,36 @@
 import datetime
 
 import pytz
-from django.db.models import Q
 from django.utils import timezone
+from django.conf import settings
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 
-from cars.models import Car
+from cars.models import CarTimeTable
+from core.compiled_serializers import CompiledSerializer
+from core.images import ImageVariantsField, schedule_variants
 from core.utils import KST
-from members.models import Member, Profile
 from payments.models import PaymentAfterUse
-from prices.models import Coupon
 from reservations.models import Reservation, PhotoBeforeUse
+from reservations.services import book_reservation, hold_car
+from reservations.uploads import bulk_create_with_files
+
+
+def validate_rental_window(date_time_start, date_time_end):
+    # UTC 체크
+    if date_time_start.tzinfo != pytz.utc or date_time_end.tzinfo != pytz.utc:
+        raise serializers.ValidationError('UTC 시간대로 입력해야 합니다.')
+
+    # 현재 예약 시작시간 이전인지 확인
+    if timezone.now() >= date_time_start:
+        raise serializers.ValidationError('현재 시간 이후부터 예약 가능합니다.')
+
+    # 이용시간대 30분 이상 30일 이하 확인
+    MIN_DURATION = 30 * 60
+    MAX_DURATION = 30 * 60 * 24 * 60
+
+    if not MIN_DURATION <= (date_time_end - date_time_start).total_seconds() <= MAX_DURATION:
+        raise serializers.ValidationError('최소 30분부터 최대 30일까지 설정 가능합니다.')
 
 
 class ReservationSerializer(ModelSerializer):
@@ -39,63 +58,50 @@ class ReservationSerializer(ModelSerializer):
         return value
 
     def validate(self, attrs):
-        date_time_start = attrs.get('date_time_start')
-        date_time_end = attrs.get('date_time_end')
-        insurance_type = attrs.get('insurance')
-
-        # UTC 체크
-        if date_time_start.tzinfo != pytz.utc or date_time_end.tzinfo != pytz.utc:
-            raise serializers.ValidationError('UTC 시간대로 입력해야 합니다.')
-
-        # 현재 예약 시작시간 이전인지 확인
-        if timezone.now() >= date_time_start:
-            raise serializers.ValidationError('현재 시간 이후부터 예약 가능합니다.')
-
-        # 이용시간대 30분 이상 30일 이하 확인
-        MIN_DURATION = 30 * 60
-        MAX_DURATION = 30 * 60 * 24 * 60
-
-        if not MIN_DURATION <= (date_time_end - date_time_start).total_seconds() <= MAX_DURATION:
-            raise serializers.ValidationError('최소 30분부터 최대 30일까지 설정 가능합니다.')
-
-        # 쿠폰 체크
-        coupon_discount = 0
-        member = Member.objects.get(email=self.context['view'].request.user)
-        if Coupon.objects.filter(member_id=member.id, will_use_check=True, is_enabled=True).exists():
-            if 2 < Coupon.objects.filter(member_id=member.id, will_use_check=True, is_enabled=True).count():
-                raise serializers.ValidationError('쿠폰은 하나의 예약에 한개만 사용 가능합니다')
-            coupon = Coupon.objects.get(member_id=member.id, will_use_check=True, is_enabled=True)
-            coupon_discount = coupon.discount_fee
-
-        # 차량 존재, 이용시간대 중복 체크
-        if Car.objects.filter(id=self.context['view'].kwargs.get('car_pk')).exists():
-            car = Car.objects.get(id=self.context['view'].kwargs.get('car_pk'))
-            if car.time_tables.filter(Q(date_time_start__lte=date_time_start) & Q(date_time_end__gte=date_time_end) |
-                                      Q(date_time_end__range=(date_time_start, date_time_end)) |
-                                      Q(date_time_start__range=(date_time_start, date_time_end))).exists():
-                raise serializers.ValidationError('해당 이용시간대는 사용 불가능합니다.')
-        else:
-            raise serializers.ValidationError('해당 차량이 존재하지 않습니다.')
-
-        # 대여 가격
-        car_rental_price = car.carprice.get_price_from_iso_format(date_time_start, date_time_end)
-        if insurance_type == 'light':
-            insurance_price = car.insurances.get_light_price_from_iso_format(date_time_start, date_time_end)
-        elif insurance_type == 'standard':
-            insurance_price = car.insurances.get_standard_price_from_iso_format(date_time_start, date_time_end)
-        elif insurance_type == 'special':
-            insurance_price = car.insurances.get_special_price_from_iso_format(date_time_start, date_time_end)
-        total_rental_price = car_rental_price + insurance_price - coupon_discount
-
-        # 크레딧 잔고 체크
-        if Profile.objects.get(member_id=member.id).credit_point < total_rental_price:
-            raise serializers.ValidationError('크레딧 잔액이 부족합니다.')
+        validate_rental_window(attrs.get('date_time_start'), attrs.get('date_time_end'))
+        # 차량 이용시간대 중복, 쿠폰, 크레딧 잔고 확인과 결제는 저장시 예약 서비스(reservations/services.py)에서
+        # 한 번에 처리합니다
         return attrs
 
+    def create(self, validated_data):
+        return book_reservation(Reservation(**validated_data))
+
     def update(self, instance, validated_data):
         return super().update(instance, validated_data)
 
 
+class CarHoldSerializer(ModelSerializer):
+    # 유지 시간(분), 없으면 CAR_HOLD_MINUTES
+    minutes = serializers.IntegerField(write_only=True, required=False, min_value=1,
+                                       max_value=settings.CAR_HOLD_MAX_MINUTES)
+
+    class Meta:
+        model = CarTimeTable
+        fields = ['id',
+                  'zone',
+                  'car',
+                  'date_time_start',
+                  'date_time_end',
+                  'hold_expires_at',
+                  'minutes']
+        read_only_fields = ['id',
+                            'zone',
+                            'car',
+                            'hold_expires_at']
+
+    def validate(self, attrs):
+        validate_rental_window(attrs.get('date_time_start'), attrs.get('date_time_end'))
+        return attrs
+
+    def create(self, validated_data):
+        return hold_car(validated_data['member'],
+                        validated_data['zone_id'],
+                        validated_data['car_id'],
+                        validated_data['date_time_start'],
+                        validated_data['date_time_end'],
+                        validated_data.get('minutes'))
+
+
 class ReservationHistorySerializer(ModelSerializer):
     date_time_start = serializers.DateTimeField(read_only=True, default_timezone=KST)
     date_time_end = serializers.DateTimeField(read_only=True, default_timezone=KST)
@@ -122,6 +128,10 @@ class ReservationHistorySerializer(ModelSerializer):
                             'updated_at']
 
 
+class ReservationHistoryCompiledSerializer(CompiledSerializer):
+    serializer_class = ReservationHistorySerializer
+
+
 class UseHistoryListSerializer(ModelSerializer):
     reservation_status = serializers.SerializerMethodField()
     zone_name = serializers.CharField(read_only=True, source='zone.name')
@@ -168,9 +178,8 @@ class UseHistoryListSerializer(ModelSerializer):
                             ]
 
     def get_reservation_status(self, obj):
+        # 운행후결제완료(PAID_2)는 반납완료로 보여주고, FINISHED 로의 저장은 materialize_statuses 명령에서 한 번에 처리합니다
         if obj.status.status == obj.status.ChoiceStatus.PAID_2:
-            obj.status.status = obj.status.ChoiceStatus.FINISHED
-            obj.status.save()
             return '반납완료'
         elif obj.status.status == obj.status.ChoiceStatus.PAID_1:
             if obj.date_time_start <= timezone.now() < obj.date_time_end:
@@ -192,7 +201,9 @@ class UseHistoryListSerializer(ModelSerializer):
                 return '2차결제미납'
 
     def get_distance(self, obj):
-
+        if hasattr(obj, 'driving_distance'):
+            # Reservation.objects.for_use_history() 로 가져온 운행거리
+            return obj.driving_distance
         if PaymentAfterUse.objects.filter(reservation_id=obj.id).exists():
             return obj.payment_after.driving_distance
         else:
@@ -201,10 +212,11 @@ class UseHistoryListSerializer(ModelSerializer):
 
 class PhotoBeforeUseSerializer(serializers.ModelSerializer):
     photos = serializers.ListField(child=serializers.ImageField(), write_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = PhotoBeforeUse
-        fields = ['id', 'member', 'reservation', 'image', 'photos']
+        fields = ['id', 'member', 'reservation', 'image', 'image_variants', 'photos']
         read_only_fields = ['id', 'member', 'reservation', 'image']
 
     def validate(self, attrs):
@@ -214,15 +226,14 @@ class PhotoBeforeUseSerializer(serializers.ModelSerializer):
         return attrs
 
     def create(self, validated_data):
-        images_data = self.context['request'].FILES
-        photo_bulk_list = []
-
-        for image in images_data.getlist('photos'):
-            photo = PhotoBeforeUse(
-                reservation=validated_data.get('reservation'),
-                image=image,
-                member=self.context['request'].user)
-            photo_bulk_list.append(photo)
-        instance = PhotoBeforeUse.objects.bulk_create(photo_bulk_list)
+        images_data = self.context['request'].FILES.getlist('photos')
+        photo_bulk_list = [PhotoBeforeUse(reservation=validated_data.get('reservation'),
+                                          member=self.context['request'].user)
+                           for _ in images_data]
+        # 사진은 thread pool 에서 동시에 storage 에 저장하고, 모두 성공하면 한 번에 저장합니다
+        instance = bulk_create_with_files(PhotoBeforeUse, photo_bulk_list, 'image', images_data)
+        # bulk_create 는 post_save 가 없으므로 변형 이미지를 직접 요청합니다
+        for photo in instance:
+            schedule_variants(photo.image)
 
         return instance
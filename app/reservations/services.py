@@ -0,0 +1,164 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import F, Q
+from django.utils import timezone
+
+from cars.models import CarAvailability, CarTimeTable
+from core.exceptions import AlreadyReservedTimeException, TooManyCouponsException
+from members.models import CreditLedger
+from payments.models import PaymentBeforeUse
+from prices.models import Coupon
+from prices.quotes import quote_car
+from reservations.models import ReservationStatus
+
+
+def book_reservation(reservation):
+    """
+    저장 전 예약(Reservation) 한 건을 결제까지 마쳐서 저장
+
+        - 이용시간대 확인과 요금 계산은 한 번씩만 하고, 잠금을 잡기 전에 끝냅니다
+        - 회원이 먼저 잡아둔 임시 예약(hold)과 만료된 hold 는 예약 시간표로 바꾸면서 지웁니다
+        - 잔액 확인과 크레딧 차감 내역 저장은 transaction 의 마지막에 CreditLedger.charge 로 합니다
+          (회원별 advisory lock 을 commit 직전에만 잡고, Profile 은 잠그거나 UPDATE 하지 않습니다)
+        - 사용 체크한 쿠폰도 SELECT FOR UPDATE 로 잠근 뒤 한 번만 읽습니다
+        - 예약, 상태, 결제, 시간표 저장과 크레딧 차감 내역, 쿠폰 사용 처리는 하나의 transaction 에서 처리합니다
+    """
+    overlapped_holds = check_available(reservation.member_id, reservation.car_id,
+                                       reservation.date_time_start, reservation.date_time_end)
+
+    # 결제 금액이므로 캐시하지 않은 현재 요금으로 계산합니다
+    quote = quote_car(reservation.car_id, reservation.date_time_start, reservation.date_time_end, use_cache=False)
+    rental_fee = quote.term_price
+    insurance_fee = quote.insurance_prices[reservation.insurance]
+
+    with transaction.atomic():
+        # 만료 처리(materialize_statuses) 전의 쿠폰도 사용기간 밖이면 쓰지 않습니다
+        now = timezone.now()
+        coupons = list(Coupon.objects.select_for_update().filter(member_id=reservation.member_id,
+                                                                 will_use_check=True,
+                                                                 is_enabled=True,
+                                                                 date_time_start__lte=now,
+                                                                 expire_date_time__gt=now)[:2])
+        if len(coupons) > 1:
+            raise TooManyCouponsException
+        coupon = coupons[0] if coupons else None
+        coupon_discount = coupon.discount_fee if coupon else 0
+
+        if coupon_discount > rental_fee + insurance_fee:
+            # 쿠폰이 대여 가격보다 높아서 음수가 나올 경우
+            total_fee = rental_fee + insurance_fee
+        else:
+            total_fee = rental_fee + insurance_fee - coupon_discount
+
+        reservation.save()
+        ReservationStatus.objects.create(reservation_id=reservation.id,
+                                         status=ReservationStatus.ChoiceStatus.PAID_1)
+        PaymentBeforeUse.objects.create(reservation_id=reservation.id,
+                                        member_id=reservation.member_id,
+                                        rental_fee=rental_fee,
+                                        insurance_fee=insurance_fee,
+                                        coupon_discount=coupon_discount,
+                                        total_fee=total_fee)
+        if coupon:
+            coupon.is_enabled = False
+            coupon.is_used = True
+            coupon.save(update_fields=['is_enabled', 'is_used', 'updated_at'])
+
+        if overlapped_holds is not None:
+            overlapped_holds.delete()
+        save_time_table(CarTimeTable(zone_id=reservation.zone_id,
+                                     car_id=reservation.car_id,
+                                     date_time_start=reservation.date_time_start,
+                                     date_time_end=reservation.date_time_end))
+        # 회원별 잔액 lock 은 commit 할 때까지 유지되므로 마지막에 차감합니다
+        CreditLedger.charge(reservation.member_id, total_fee, CreditLedger.ChoiceReason.BOOKING, reservation.id)
+    return reservation
+
+
+def extend_reservation(reservation, date_time_extension):
+    """
+    이용중인 예약을 date_time_extension 까지 연장하고 연장요금을 결제
+
+        - 연장요금은 기존 종료시각부터 연장 종료시각까지의 요금과 보험료이고, 쿠폰은 쓰지 않습니다
+        - 시간표를 늘려 저장하므로 다른 예약과 겹치면 AlreadyReservedTimeException 이 발생합니다
+          (연장하는 시간과 겹치는 만료된 hold 는 check_available 과 같이 지웁니다)
+        - 상태, 결제 정보, 시간표 저장과 크레딧 차감 내역은 하나의 transaction 에서 처리합니다
+    """
+    # 결제 금액이므로 캐시하지 않은 현재 요금으로 계산합니다
+    quote = quote_car(reservation.car_id, reservation.date_time_end, date_time_extension, use_cache=False)
+    total_fee = quote.term_price + quote.insurance_prices[reservation.insurance]
+
+    with transaction.atomic():
+        reservation.date_time_extension = date_time_extension
+        reservation.save(update_fields=['date_time_extension', 'updated_at'])
+        ReservationStatus.objects.filter(reservation_id=reservation.id) \
+            .update(status=ReservationStatus.ChoiceStatus.EXTENDED, updated_at=timezone.now())
+
+        # 기존 결제 정보에 연장료 추가 저장
+        PaymentBeforeUse.objects.filter(reservation_id=reservation.id).update(
+            extension_fee=F('extension_fee') + total_fee, total_fee=F('total_fee') + total_fee)
+
+        CarTimeTable.objects.filter(car_id=reservation.car_id).expired_holds() \
+            .overlap(reservation.date_time_end, date_time_extension).delete()
+        time_table = CarTimeTable.objects.get(zone_id=reservation.zone_id,
+                                              car_id=reservation.car_id,
+                                              date_time_start=reservation.date_time_start)
+        time_table.date_time_end = date_time_extension
+        save_time_table(time_table)
+
+        # 회원별 잔액 lock 은 commit 할 때까지 유지되므로 마지막에 차감합니다
+        CreditLedger.charge(reservation.member_id, total_fee, CreditLedger.ChoiceReason.EXTENSION, reservation.id)
+    return reservation
+
+
+def hold_car(member, zone_id, car_id, date_time_start, date_time_end, minutes=None):
+    """
+    결제 전 차량 이용시간대를 minutes 분 동안 잡아두는 임시 예약(hold) 저장
+
+        - hold 는 만료 시간이 있는 CarTimeTable 이므로 다른 회원의 예약, hold 와 겹칠 수 없습니다
+        - 회원당 hold 는 하나만 유지하도록 새 hold 를 잡으면 이전 hold 는 지웁니다
+    """
+    minutes = minutes or getattr(settings, 'CAR_HOLD_MINUTES', 10)
+    overlapped_holds = check_available(member.id, car_id, date_time_start, date_time_end)
+
+    with transaction.atomic():
+        CarTimeTable.objects.filter(hold_member=member).delete()
+        if overlapped_holds is not None:
+            overlapped_holds.delete()
+        return save_time_table(CarTimeTable(zone_id=zone_id,
+                                            car_id=car_id,
+                                            date_time_start=date_time_start,
+                                            date_time_end=date_time_end,
+                                            hold_member=member,
+                                            hold_expires_at=timezone.now() + datetime.timedelta(minutes=minutes)))
+
+
+def check_available(member_id, car_id, date_time_start, date_time_end):
+    """
+    차량 이용시간대가 비어있는지 확인
+
+        대부분은 비트맵 확인으로 끝나고, 비트맵에 겹치는 시간이 있을 때만 그 시간표가 회원 본인의 hold 나
+        만료된 hold 인지 확인합니다. 이 경우 저장 전에 지워야 할 hold 의 queryset 을 반환합니다.
+    """
+    if not CarAvailability.for_car(car_id).is_reserved(date_time_start, date_time_end):
+        return None
+
+    overlapped = CarTimeTable.objects.filter(car_id=car_id).overlap(date_time_start, date_time_end)
+    releasable = Q(hold_member_id=member_id) | Q(hold_expires_at__lte=timezone.now())
+    if overlapped.exclude(releasable).exists():
+        raise AlreadyReservedTimeException
+    return overlapped.filter(releasable, hold_expires_at__isnull=False)
+
+
+def save_time_table(time_table):
+    # 동시에 같은 시간대를 예약하면 DB 의 겹침 방지 제약조건에서 하나만 성공합니다
+    try:
+        with transaction.atomic():
+            time_table.save()
+    except IntegrityError as e:
+        if CarTimeTable.is_overlap_violation(e):
+            raise AlreadyReservedTimeException
+        raise
+    return time_table
@@ -1,3 +1,666 @@
-from django.test import TestCase
+import datetime
+import io
+import threading
+import time
+import unittest
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from inmemorystorage import InMemoryStorage
+from model_bakery import baker
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
 
 # Create your tests here.
+from cars.models import Car, CarAvailability, CarTimeTable, from_slot, to_slot
+from core.exceptions import ShortCreditException
+from core.models import IdempotencyKey
+from members.models import CreditLedger, Member, Profile
+from payments.models import PaymentAfterUse, PaymentBeforeUse
+from prices.models import Coupon, InsuranceFee
+from reservations.models import PhotoBeforeUse, Reservation, ReservationStatus
+from reservations.services import extend_reservation
+
+
+class BookReservationTestCase(APITestCase):
+    default_credit = 100000
+
+    def setUp(self):
+        self.zone = baker.make('carzones.CarZone')
+        self.car = baker.make('cars.Car', zone=self.zone)
+        baker.make('prices.CarPrice', car=self.car, standard_price=5000,
+                   weekday_price_per_ten_min=100, weekend_price_per_ten_min=100)
+        InsuranceFee.objects.create(car=self.car, light_price=1000, light_price_per_ten_min=10)
+        CarAvailability.rebuild(self.car.id)
+        self.member = Member.objects.create(email='book@example.com', password='test')
+        self.member.profile.credit_point = self.default_credit
+        self.member.profile.save()
+        self.client.force_authenticate(user=self.member)
+
+        # 내일 같은 시간대 1시간 (10분 단위) : 대여료 5000 + 3 * 100, 보험료 1000 + 3 * 10
+        date_time_start = from_slot(to_slot(timezone.now()) + 144)
+        self.data = {'date_time_start': date_time_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                     'date_time_end': (date_time_start + datetime.timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                     'insurance': 'light'}
+        self.url = f'/carzones/{self.zone.id}/cars/{self.car.id}/reservations'
+
+    def make_coupon(self, **kwargs):
+        return baker.make('prices.Coupon', member=self.member, will_use_check=True, is_enabled=True,
+                          date_time_start=timezone.now() - datetime.timedelta(days=1),
+                          expire_date_time=timezone.now() + datetime.timedelta(days=30), **kwargs)
+
+    def test_should_not_discount_expired_coupon(self):
+        coupon = self.make_coupon(discount_fee=300)
+        Coupon.objects.filter(id=coupon.id).update(expire_date_time=timezone.now() - datetime.timedelta(minutes=1))
+
+        response = self.client.post(self.url, data=self.data)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(0, PaymentBeforeUse.objects.get(reservation_id=response.data['id']).coupon_discount)
+
+    def test_should_create_Reservation_in_bounded_queries(self):
+        """
+        Request : POST - /carzones/123/cars/456/reservations
+        """
+        coupon = self.make_coupon(discount_fee=300)
+
+        # 쏘카존/차량 확인 2, 이용시간대 1, 요금 1, 쿠폰 잠금 1, 예약/상태/결제/쿠폰 저장 4,
+        # 시간표 저장과 비트맵 갱신 4, 잔액 lock/잔액/차감 3, savepoint 4
+        with self.assertNumQueries(20):
+            response = self.client.post(self.url, data=self.data)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+        payment = PaymentBeforeUse.objects.get(reservation_id=response.data['id'])
+        self.assertEqual(5300, payment.rental_fee)
+        self.assertEqual(1030, payment.insurance_fee)
+        self.assertEqual(300, payment.coupon_discount)
+        self.assertEqual(5300 + 1030 - 300, payment.total_fee)
+        self.assertEqual(self.default_credit - payment.total_fee, CreditLedger.balance(self.member.id))
+        self.assertEqual(ReservationStatus.ChoiceStatus.PAID_1,
+                         ReservationStatus.objects.get(reservation_id=response.data['id']).status)
+        self.assertTrue(CarTimeTable.objects.filter(car=self.car).exists())
+        coupon.refresh_from_db()
+        self.assertTrue(coupon.is_used)
+        self.assertFalse(coupon.is_enabled)
+
+    def test_should_not_create_Reservation_when_credit_is_short(self):
+        self.member.profile.credit_point = 100
+        self.member.profile.save()
+
+        response = self.client.post(self.url, data=self.data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual('ShortCredit', response.data['detail'].code)
+        self.assertFalse(Reservation.objects.exists())
+        self.assertFalse(CarTimeTable.objects.exists())
+        self.assertEqual(100, CreditLedger.balance(self.member.id))
+
+    def test_should_save_Reservation_without_booking(self):
+        date_time_start = timezone.now() + datetime.timedelta(days=1)
+        reservation = Reservation.objects.create(member=self.member, zone=self.zone, car=self.car,
+                                                 date_time_start=date_time_start,
+                                                 date_time_end=date_time_start + datetime.timedelta(hours=1))
+
+        self.assertFalse(PaymentBeforeUse.objects.filter(reservation=reservation).exists())
+        self.assertFalse(CarTimeTable.objects.exists())
+        self.assertEqual(self.default_credit, CreditLedger.balance(self.member.id))
+
+    def test_should_extend_Reservation(self):
+        response = self.client.post(self.url, data=self.data)
+        reservation = Reservation.objects.get(id=response.data['id'])
+        date_time_extension = reservation.date_time_end + datetime.timedelta(hours=1)
+
+        extend_reservation(reservation, date_time_extension)
+
+        reservation.refresh_from_db()
+        self.assertEqual(date_time_extension, reservation.date_time_extension)
+        self.assertEqual(ReservationStatus.ChoiceStatus.EXTENDED, reservation.status.status)
+        payment = PaymentBeforeUse.objects.get(reservation=reservation)
+        self.assertEqual(5300 + 1030, payment.extension_fee)
+        self.assertEqual((5300 + 1030) * 2, payment.total_fee)
+        self.assertEqual(self.default_credit - payment.total_fee, CreditLedger.balance(self.member.id))
+        self.assertEqual(date_time_extension, CarTimeTable.objects.get(car=self.car).date_time_end)
+
+    def test_should_not_extend_Reservation_when_credit_is_short(self):
+        response = self.client.post(self.url, data=self.data)
+        reservation = Reservation.objects.get(id=response.data['id'])
+        # 남은 잔액 1 로 맞춥니다
+        CreditLedger.record(self.member.id, 1 - CreditLedger.balance(self.member.id),
+                            CreditLedger.ChoiceReason.ADJUSTMENT)
+
+        with self.assertRaises(ShortCreditException):
+            extend_reservation(reservation, reservation.date_time_end + datetime.timedelta(hours=1))
+
+        self.assertEqual(1, CreditLedger.balance(self.member.id))
+        self.assertFalse(CreditLedger.objects.filter(reason=CreditLedger.ChoiceReason.EXTENSION).exists())
+        self.assertEqual(reservation.date_time_end, CarTimeTable.objects.get(car=self.car).date_time_end)
+
+    def test_should_not_create_Reservation_with_two_coupons(self):
+        self.make_coupon(discount_fee=300)
+        self.make_coupon(discount_fee=500)
+
+        response = self.client.post(self.url, data=self.data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual('TooManyCoupons', response.data['detail'].code)
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_should_not_create_Reservation_at_reserved_time(self):
+        self.client.post(self.url, data=self.data)
+
+        response = self.client.post(self.url, data=self.data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual('AlreadyReservedTime', response.data['detail'].code)
+        self.assertEqual(1, Reservation.objects.count())
+
+    def test_should_replay_Reservation_with_same_idempotency_key(self):
+        first = self.client.post(self.url, data=self.data, HTTP_IDEMPOTENCY_KEY='retry-1')
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.post(self.url, data=self.data, HTTP_IDEMPOTENCY_KEY='retry-1')
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual('true', second['Idempotent-Replayed'])
+        # 저장된 응답만 읽고 검증, 요금 계산, 저장은 다시 하지 않습니다
+        self.assertLessEqual(len(queries), 3)
+        self.assertEqual(1, Reservation.objects.count())
+        self.assertEqual(self.default_credit - PaymentBeforeUse.objects.get().total_fee,
+                         CreditLedger.balance(self.member.id))
+
+    def test_should_not_reuse_idempotency_key_for_other_request(self):
+        self.client.post(self.url, data=self.data, HTTP_IDEMPOTENCY_KEY='retry-1')
+
+        response = self.client.post(self.url, data=dict(self.data, insurance='special'),
+                                    HTTP_IDEMPOTENCY_KEY='retry-1')
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_should_retry_failed_Reservation_with_same_idempotency_key(self):
+        self.member.profile.credit_point = 100
+        self.member.profile.save()
+        response = self.client.post(self.url, data=self.data, HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        Profile.objects.filter(member=self.member).update(credit_point=self.default_credit)
+        response = self.client.post(self.url, data=self.data, HTTP_IDEMPOTENCY_KEY='retry-1')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(1, Reservation.objects.count())
+
+    def test_should_purge_expired_idempotency_keys(self):
+        self.client.post(self.url, data=self.data, HTTP_IDEMPOTENCY_KEY='retry-1')
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+
+        call_command('purge_idempotency_keys', stdout=io.StringIO())
+
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class CarHoldTestCase(APITestCase):
+    default_credit = 100000
+
+    def setUp(self):
+        self.zone = baker.make('carzones.CarZone')
+        self.car = baker.make('cars.Car', zone=self.zone)
+        baker.make('prices.CarPrice', car=self.car, standard_price=5000,
+                   weekday_price_per_ten_min=100, weekend_price_per_ten_min=100)
+        InsuranceFee.objects.create(car=self.car, light_price=1000, light_price_per_ten_min=10)
+        CarAvailability.rebuild(self.car.id)
+        self.member = Member.objects.create(email='hold@example.com', password='test')
+        self.other = Member.objects.create(email='other@example.com', password='test')
+        for member in (self.member, self.other):
+            member.profile.credit_point = self.default_credit
+            member.profile.save()
+        self.client.force_authenticate(user=self.member)
+
+        date_time_start = from_slot(to_slot(timezone.now()) + 144)
+        self.data = {'date_time_start': date_time_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                     'date_time_end': (date_time_start + datetime.timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                     'insurance': 'light'}
+        self.hold_url = f'/carzones/{self.zone.id}/cars/{self.car.id}/holds'
+        self.reservation_url = f'/carzones/{self.zone.id}/cars/{self.car.id}/reservations'
+
+    def expire_holds(self):
+        # 시간이 지난 것과 같도록 비트맵의 hold 만료 시각도 같이 바꿉니다
+        expired_at = timezone.now() - datetime.timedelta(minutes=1)
+        CarTimeTable.objects.filter(hold_expires_at__isnull=False).update(hold_expires_at=expired_at)
+        CarAvailability.objects.filter(hold_expires_at__isnull=False).update(hold_expires_at=expired_at)
+
+    def test_should_create_CarHold(self):
+        """
+        Request : POST - /carzones/123/cars/456/holds
+        """
+        response = self.client.post(self.hold_url, data=dict(self.data, minutes=5))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        hold = CarTimeTable.objects.get(id=response.data['id'])
+        self.assertEqual(self.member, hold.hold_member)
+        self.assertAlmostEqual(timezone.now() + datetime.timedelta(minutes=5), hold.hold_expires_at,
+                               delta=datetime.timedelta(seconds=30))
+
+    def test_should_not_create_CarHold_longer_than_max_minutes(self):
+        response = self.client.post(self.hold_url, data=dict(self.data, minutes=60))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(CarTimeTable.objects.exists())
+
+    def test_should_not_create_Reservation_over_other_members_CarHold(self):
+        self.client.post(self.hold_url, data=self.data)
+        self.client.force_authenticate(user=self.other)
+
+        response = self.client.post(self.reservation_url, data=self.data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual('AlreadyReservedTime', response.data['detail'].code)
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_should_create_Reservation_over_own_CarHold(self):
+        self.client.post(self.hold_url, data=self.data)
+
+        response = self.client.post(self.reservation_url, data=self.data)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        time_table = CarTimeTable.objects.get(car=self.car)
+        self.assertIsNone(time_table.hold_expires_at)
+
+    def test_should_create_Reservation_over_expired_CarHold(self):
+        self.client.post(self.hold_url, data=self.data)
+        self.expire_holds()
+        self.client.force_authenticate(user=self.other)
+
+        response = self.client.post(self.reservation_url, data=self.data)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertFalse(CarTimeTable.objects.filter(hold_member__isnull=False).exists())
+
+    def test_should_replace_previous_CarHold(self):
+        first = self.client.post(self.hold_url, data=self.data)
+        date_time_start = from_slot(to_slot(timezone.now()) + 288)
+        second = self.client.post(self.hold_url, data={
+            'date_time_start': date_time_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'date_time_end': (date_time_start + datetime.timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ')})
+
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED, second.data)
+        self.assertEqual([second.data['id']], list(CarTimeTable.objects.values_list('id', flat=True)))
+        self.assertFalse(CarTimeTable.objects.filter(id=first.data['id']).exists())
+
+    def test_should_delete_CarHold(self):
+        """
+        Request : DELETE - /carzones/123/cars/456/holds/789
+        """
+        hold_id = self.client.post(self.hold_url, data=self.data).data['id']
+        self.client.force_authenticate(user=self.other)
+        response = self.client.delete(f'{self.hold_url}/{hold_id}')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=self.member)
+        response = self.client.delete(f'{self.hold_url}/{hold_id}')
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(CarTimeTable.objects.exists())
+        self.assertFalse(CarAvailability.for_car(self.car.id).is_reserved(
+            from_slot(to_slot(timezone.now()) + 144), from_slot(to_slot(timezone.now()) + 150)))
+
+    def test_should_sweep_expired_CarHolds(self):
+        self.client.post(self.hold_url, data=self.data)
+        self.client.force_authenticate(user=self.other)
+        date_time_start = from_slot(to_slot(timezone.now()) + 288)
+        self.client.post(self.hold_url, data={
+            'date_time_start': date_time_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'date_time_end': (date_time_start + datetime.timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ')})
+        self.expire_holds()
+        self.assertTrue(CarAvailability.for_car(self.car.id).is_reserved(
+            from_slot(to_slot(timezone.now()) + 144), from_slot(to_slot(timezone.now()) + 150)))
+
+        out = io.StringIO()
+        with mock.patch.object(CarAvailability, 'rebuild', wraps=CarAvailability.rebuild) as rebuild:
+            call_command('sweep_car_holds', stdout=out)
+
+        self.assertIn('deleted 2 expired holds', out.getvalue())
+        # 차량별로 한 번만 다시 만듭니다
+        self.assertEqual(1, rebuild.call_count)
+        self.assertFalse(CarTimeTable.objects.exists())
+        self.assertFalse(CarAvailability.for_car(self.car.id).is_reserved(
+            from_slot(to_slot(timezone.now()) + 144), from_slot(to_slot(timezone.now()) + 150)))
+
+    def test_should_extend_Reservation_over_expired_CarHold(self):
+        reservation = Reservation.objects.get(id=self.client.post(self.reservation_url, data=self.data).data['id'])
+        date_time_extension = reservation.date_time_end + datetime.timedelta(hours=1)
+        hold_start = (reservation.date_time_end + datetime.timedelta(minutes=10)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        self.client.force_authenticate(user=self.other)
+        self.client.post(self.hold_url, data={
+            'date_time_start': hold_start,
+            'date_time_end': date_time_extension.strftime('%Y-%m-%dT%H:%M:%SZ')})
+        self.expire_holds()
+
+        extend_reservation(reservation, date_time_extension)
+
+        self.assertFalse(CarTimeTable.objects.filter(hold_member__isnull=False).exists())
+        self.assertEqual(date_time_extension, CarTimeTable.objects.get(car=self.car).date_time_end)
+
+    def test_should_count_car_with_expired_CarHold_as_free(self):
+        self.client.post(self.hold_url, data=self.data)
+        date_time_start = from_slot(to_slot(timezone.now()) + 144)
+        window = (date_time_start, date_time_start + datetime.timedelta(hours=1))
+        cars = Car.objects.filter(id=self.car.id)
+
+        with self.assertNumQueries(1):
+            self.assertEqual({}, CarAvailability.free_car_counts(cars, *window))
+
+        self.expire_holds()
+        # 비트맵에는 만료된 hold 가 남아 있으므로 시간표에서 다시 확인합니다
+        with self.assertNumQueries(2):
+            self.assertEqual({self.zone.id: 1}, CarAvailability.free_car_counts(cars, *window))
+
+
+class UseHistoryTestCase(APITestCase):
+
+    def setUp(self):
+        self.zone = baker.make('carzones.CarZone')
+        self.car = baker.make('cars.Car', zone=self.zone)
+        self.member = Member.objects.create(email='history@example.com', password='test')
+        self.client.force_authenticate(user=self.member)
+
+    def make_history(self, quantity, status=ReservationStatus.ChoiceStatus.FINISHED):
+        # 예약 서비스(book_reservation)의 결제 처리 없이 지난 이용 내역만 만듭니다
+        date_time_start = timezone.now() - datetime.timedelta(days=quantity + 1)
+        reservations = Reservation.objects.bulk_create([
+            Reservation(member=self.member, zone=self.zone, car=self.car,
+                        date_time_start=date_time_start + datetime.timedelta(days=index),
+                        date_time_end=date_time_start + datetime.timedelta(days=index, hours=1))
+            for index in range(quantity)
+        ])
+        ReservationStatus.objects.bulk_create([ReservationStatus(reservation=reservation, status=status)
+                                               for reservation in reservations])
+        PaymentAfterUse.objects.bulk_create([
+            PaymentAfterUse(reservation=reservation, member=self.member, driving_distance=index * 10,
+                            first_section_fee=0, second_section_fee=0, third_section_fee=0, total_fee=0)
+            for index, reservation in enumerate(reservations) if index % 2
+        ])
+        return reservations
+
+    def test_should_list_UseHistory_in_fixed_number_of_queries(self):
+        """
+        Request : GET - /reservations/history
+        """
+        self.make_history(3)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/reservations/history')
+        self.make_history(7)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/reservations/history')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(10, len(response.data['results']))
+        self.assertEqual(1, len(queries))
+        self.assertEqual(len(few), len(queries))
+        self.assertEqual([0, 10, 0, 0, 10, 0, 30, 0, 50, 0], [entry['distance'] for entry in response.data['results']])
+        self.assertEqual({'반납완료'}, {entry['reservation_status'] for entry in response.data['results']})
+
+    def test_should_not_write_on_UseHistory_list(self):
+        self.make_history(5, status=ReservationStatus.ChoiceStatus.PAID_2)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/reservations/history')
+
+        self.assertEqual(1, len(queries))
+        self.assertEqual({'반납완료'}, {entry['reservation_status'] for entry in response.data['results']})
+        self.assertEqual(5, ReservationStatus.objects.filter(status=ReservationStatus.ChoiceStatus.PAID_2).count())
+
+    def test_should_materialize_statuses(self):
+        self.make_history(3, status=ReservationStatus.ChoiceStatus.PAID_2)
+        self.make_history(2, status=ReservationStatus.ChoiceStatus.PAID_1)
+        now = timezone.now()
+        expired = baker.make('prices.Coupon', member=self.member, is_enabled=True,
+                             date_time_start=now - datetime.timedelta(days=10),
+                             expire_date_time=now - datetime.timedelta(days=1))
+        upcoming = baker.make('prices.Coupon', member=self.member, is_enabled=True,
+                              date_time_start=now + datetime.timedelta(days=1),
+                              expire_date_time=now + datetime.timedelta(days=10))
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command('materialize_statuses', stdout=io.StringIO())
+
+        self.assertEqual(2, len(queries))
+        self.assertEqual(3, ReservationStatus.objects.filter(status=ReservationStatus.ChoiceStatus.FINISHED).count())
+        self.assertEqual(2, ReservationStatus.objects.filter(status=ReservationStatus.ChoiceStatus.PAID_1).count())
+        expired.refresh_from_db()
+        upcoming.refresh_from_db()
+        self.assertFalse(expired.is_enabled)
+        self.assertTrue(upcoming.is_enabled)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', '겹침 방지 제약조건은 PostgreSQL 에서만 확인 가능합니다')
+class ConcurrentReservationTestCase(TransactionTestCase):
+    """
+    같은 차량, 같은 시간대로 동시에 예약 요청이 들어와도 하나만 성공해야 합니다
+    """
+    concurrency = 4
+    default_credit = 100000
+
+    def setUp(self):
+        self.zone = baker.make('carzones.CarZone')
+        self.car = baker.make('cars.Car', zone=self.zone)
+        baker.make('prices.CarPrice', car=self.car, standard_price=5000, weekday_price_per_ten_min=100)
+        InsuranceFee.objects.create(car=self.car,
+                                    light_price=100, light_price_per_ten_min=10,
+                                    standard_price=200, standard_price_per_ten_min=20,
+                                    special_price=300, special_price_per_ten_min=30)
+        self.members = []
+        for i in range(self.concurrency):
+            member = Member.objects.create(email=f'race{i}@example.com', password='test')
+            member.profile.credit_point = self.default_credit
+            member.profile.save()
+            self.members.append(member)
+
+        # 내일 같은 시간대 (10분 단위)
+        date_time_start = from_slot(to_slot(timezone.now()) + 144)
+        self.data = {'date_time_start': date_time_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                     'date_time_end': (date_time_start + datetime.timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                     'insurance': 'light'}
+
+    def post_concurrently(self, members, **extra):
+        barrier = threading.Barrier(len(members))
+        responses = []
+
+        def reserve(member):
+            client = APIClient()
+            client.force_authenticate(user=member)
+            try:
+                barrier.wait()
+                responses.append(client.post(f'/carzones/{self.zone.id}/cars/{self.car.id}/reservations',
+                                             data=self.data, **extra))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reserve, args=(member,)) for member in members]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def run_concurrently(self, *targets):
+        barrier = threading.Barrier(len(targets))
+        errors = []
+
+        def run(target):
+            try:
+                barrier.wait()
+                with transaction.atomic():
+                    target()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(target,)) for target in targets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_should_not_overdraw_when_same_member_charges_race(self):
+        member = self.members[0]
+
+        def charge():
+            CreditLedger.charge(member.id, self.default_credit * 3 // 5, CreditLedger.ChoiceReason.BOOKING)
+
+        errors = self.run_concurrently(charge, charge)
+
+        self.assertEqual(1, len(errors))
+        self.assertIsInstance(errors[0], ShortCreditException)
+        self.assertEqual(self.default_credit * 2 // 5, CreditLedger.balance(member.id))
+
+    def test_should_charge_without_waiting_for_profile_row_lock(self):
+        member = self.members[0]
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_profile():
+            # 압축이나 Profile 저장처럼 Profile 행을 잠근 transaction
+            Profile.objects.select_for_update().get(member=member)
+            locked.set()
+            release.wait(5)
+
+        def charge():
+            locked.wait(5)
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL lock_timeout = '1s'")
+                CreditLedger.charge(member.id, 1000, CreditLedger.ChoiceReason.BOOKING)
+            finally:
+                release.set()
+
+        self.assertEqual([], self.run_concurrently(hold_profile, charge))
+        self.assertEqual(self.default_credit - 1000, CreditLedger.balance(member.id))
+
+    def test_should_create_only_one_Reservation_when_requests_race(self):
+        """
+        Request : POST - /carzones/123/cars/456/reservations (동시에 여러 건)
+        """
+        status_codes = [response.status_code for response in self.post_concurrently(self.members)]
+
+        self.assertEqual(1, status_codes.count(status.HTTP_201_CREATED))
+        self.assertEqual(self.concurrency - 1, status_codes.count(status.HTTP_400_BAD_REQUEST))
+        self.assertEqual(1, CarTimeTable.objects.filter(car=self.car).count())
+        self.assertEqual(1, Reservation.objects.filter(car=self.car).count())
+        # 예약에 성공한 회원만 크레딧이 차감됩니다
+        credits = sorted(CreditLedger.balance(member.id) for member in self.members)
+        self.assertLess(credits[0], self.default_credit)
+        self.assertEqual([self.default_credit] * (self.concurrency - 1), credits[1:])
+
+    def test_should_replay_one_Reservation_when_retries_race(self):
+        """
+        Request : POST - /carzones/123/cars/456/reservations (같은 Idempotency-Key 로 동시에 여러 건)
+        """
+        member = self.members[0]
+        responses = self.post_concurrently([member] * self.concurrency, HTTP_IDEMPOTENCY_KEY='retry-1')
+
+        self.assertEqual([status.HTTP_201_CREATED] * self.concurrency, [response.status_code for response in responses])
+        self.assertEqual(1, len({response.data['id'] for response in responses}))
+        self.assertEqual(1, Reservation.objects.filter(car=self.car).count())
+        self.assertEqual(1, CreditLedger.objects.filter(member=member,
+                                                        reason=CreditLedger.ChoiceReason.BOOKING).count())
+
+
+class RecordingStorage(InMemoryStorage):
+    """
+    저장에 latency 초가 걸리고, fail_name 으로 시작하는 파일은 저장에 실패하는 테스트용 storage
+    """
+    latency = 0
+    fail_name = None
+    saved = []
+    deleted = []
+    threads = set()
+    content_types = set()
+
+    def _save(self, name, content):
+        time.sleep(self.latency)
+        RecordingStorage.threads.add(threading.current_thread().name)
+        RecordingStorage.content_types.add(type(content))
+        if self.fail_name and name.rsplit('/', 1)[-1].startswith(self.fail_name):
+            raise IOError('upload failed')
+        name = super()._save(name, content)
+        RecordingStorage.saved.append(name)
+        return name
+
+    def delete(self, name):
+        RecordingStorage.deleted.append(name)
+        super().delete(name)
+
+
+@override_settings(DEFAULT_FILE_STORAGE='reservations.tests.RecordingStorage')
+class PhotoUploadTestCase(APITestCase):
+    def setUp(self):
+        RecordingStorage.latency = 0
+        RecordingStorage.fail_name = None
+        RecordingStorage.saved = []
+        RecordingStorage.deleted = []
+        RecordingStorage.threads = set()
+        RecordingStorage.content_types = set()
+        self.member = Member.objects.create(email='photo@example.com', password='test')
+        zone = baker.make('carzones.CarZone')
+        start = timezone.now() + datetime.timedelta(days=1)
+        self.reservation, = Reservation.objects.bulk_create([
+            Reservation(member=self.member, zone=zone, car=baker.make('cars.Car', zone=zone),
+                        date_time_start=start, date_time_end=start + datetime.timedelta(hours=1))])
+        self.url = f'/reservations/{self.reservation.id}/photos'
+        self.client.force_authenticate(user=self.member)
+
+    def make_photos(self, quantity):
+        photos = []
+        for index in range(quantity):
+            file = io.BytesIO()
+            Image.new('RGB', (1, 1)).save(file, 'jpeg')
+            file.name = f'photo{index}.jpg'
+            file.seek(0)
+            photos.append(file)
+        return photos
+
+    def test_should_upload_photos_concurrently(self):
+        """
+        Request : POST - /reservations/123/photos
+        """
+        RecordingStorage.latency = 0.2
+
+        started = time.monotonic()
+        response = self.client.post(self.url, data={'photos': self.make_photos(4)}, format='multipart')
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(4, PhotoBeforeUse.objects.filter(reservation=self.reservation).count())
+        self.assertEqual(set(RecordingStorage.saved),
+                         set(PhotoBeforeUse.objects.values_list('image', flat=True)))
+        self.assertGreater(len(RecordingStorage.threads), 1)
+        # 순서대로 저장하면 0.8초 이상 걸립니다
+        self.assertLess(elapsed, 0.6)
+
+    def test_should_stream_photos_from_temporary_files(self):
+        response = self.client.post(self.url, data={'photos': self.make_photos(2)}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual({TemporaryUploadedFile}, RecordingStorage.content_types)
+
+    def test_should_clean_up_uploaded_photos_when_one_fails(self):
+        RecordingStorage.fail_name = 'photo2'
+
+        with self.assertRaises(IOError):
+            self.client.post(self.url, data={'photos': self.make_photos(4)}, format='multipart')
+
+        self.assertFalse(PhotoBeforeUse.objects.exists())
+        self.assertEqual(3, len(RecordingStorage.saved))
+        self.assertEqual(sorted(RecordingStorage.saved), sorted(RecordingStorage.deleted))
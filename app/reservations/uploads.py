@@ -0,0 +1,83 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_upload_executor():
+    """
+    프로세스 안의 모든 요청이 함께 쓰는 업로드 thread pool (PHOTO_UPLOAD_WORKERS 개)
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'PHOTO_UPLOAD_WORKERS', 4),
+                                           thread_name_prefix='photo-upload')
+        return _executor
+
+
+class TemporaryFileUploadMixin:
+    """
+    multipart 로 받은 파일을 메모리에 올리지 않고 임시 파일로 받는 ViewSet mixin
+
+        storage 에 저장할 때도 임시 파일에서 chunk 단위로 읽어 보냅니다
+    """
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [TemporaryFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+
+def upload_files(instances, field_name, files):
+    """
+    files 를 instances 의 field_name 파일 필드 storage 에 동시에 저장하고, 저장된 이름을 각 instance 에 넣음
+
+        하나라도 실패하면 이미 저장된 파일을 지우고 첫 번째 예외를 다시 발생시킵니다
+    """
+    field = instances[0]._meta.get_field(field_name)
+
+    def upload(instance, file):
+        name = field.generate_filename(instance, file.name)
+        file.seek(0)
+        return field.storage.save(name, file, max_length=field.max_length)
+
+    executor = get_upload_executor()
+    futures = [executor.submit(upload, instance, file) for instance, file in zip(instances, files)]
+    names = []
+    errors = []
+    for future in futures:
+        try:
+            names.append(future.result())
+        except Exception as e:
+            errors.append(e)
+    if errors:
+        delete_files(field.storage, names)
+        raise errors[0]
+
+    for instance, name in zip(instances, names):
+        # 이미 저장된 이름이므로 bulk_create 의 pre_save 에서 다시 저장하지 않습니다
+        setattr(instance, field.attname, name)
+    return names
+
+
+def bulk_create_with_files(model, instances, field_name, files):
+    """
+    파일을 모두 저장한 뒤 한 번의 bulk_create 로 저장, bulk_create 가 실패하면 저장한 파일을 지움
+    """
+    if not instances:
+        return []
+    names = upload_files(instances, field_name, files)
+    try:
+        return model.objects.bulk_create(instances)
+    except Exception:
+        delete_files(model._meta.get_field(field_name).storage, names)
+        raise
+
+
+def delete_files(storage, names):
+    for name in names:
+        storage.delete(name)
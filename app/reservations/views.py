@@ -4,17 +4,23 @@ from django.shortcuts import render
 from rest_framework import mixins
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.viewsets import GenericViewSet
 
-from cars.models import Car
+from cars.models import Car, CarTimeTable
 from carzones.models import CarZone
+from core.compiled_serializers import CompiledListMixin
+from core.db_routers import ReplicaReadMixin
+from core.idempotency import IdempotentCreateMixin
 from core.permissions import IsOwner
 from reservations.models import Reservation, PhotoBeforeUse
 from reservations.serializers import ReservationSerializer, ReservationHistorySerializer, UseHistoryListSerializer, \
-    PhotoBeforeUseSerializer
+    PhotoBeforeUseSerializer, CarHoldSerializer, ReservationHistoryCompiledSerializer
+from reservations.uploads import TemporaryFileUploadMixin
 
 
-class ReservationViewSet(mixins.CreateModelMixin,
+class ReservationViewSet(IdempotentCreateMixin,
+                         mixins.CreateModelMixin,
                          mixins.UpdateModelMixin,
                          GenericViewSet):
     """
@@ -28,6 +34,9 @@ class ReservationViewSet(mixins.CreateModelMixin,
             예시) "2020-10-12T04:00:00Z" 혹은 "2020-10-12T04:00:00+00:00"
             -> response시 받는 형태는 "2020-10-12T04:00:00Z" 형태입니다 ('00Z':UTC기준)
             -> "%Y-%m-%dT%H%M%z" (%z : +0000 형태인데 response시 현재 00Z 형태로만 나옵니다..)
+        ---
+            Idempotency-Key 헤더 (선택) : 네트워크 오류로 재시도할 때 같은 값을 보내면 예약/결제를 다시 하지 않고
+            처음 응답을 그대로 돌려줍니다 (응답 헤더 Idempotent-Replayed: true)
     """
     queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
@@ -41,7 +50,41 @@ class ReservationViewSet(mixins.CreateModelMixin,
                         car_id=self.kwargs.get('car_pk'))
 
 
-class ReservationHistoryViewSet(mixins.RetrieveModelMixin,
+class CarHoldViewSet(mixins.CreateModelMixin,
+                     mixins.DestroyModelMixin,
+                     GenericViewSet):
+    """
+        결제 전 차량 이용시간대를 잠시 잡아두는 임시 예약(hold) API
+        ---
+        # 내용
+            [POST] /carzones/260/cars/1/holds : 이용시간대를 minutes 분(기본 10분, 최대 15분) 동안 잡아둡니다
+            [DELETE] /carzones/260/cars/1/holds/123 : 잡아둔 hold 를 취소합니다
+        ---
+            date_time_start / end : 예약 생성과 같이 UTC 기준으로 주셔야 합니다
+            hold 를 잡은 회원은 만료 전까지 같은 시간대로 예약할 수 있고, 다른 회원은 예약할 수 없습니다
+            새 hold 를 잡으면 이전 hold 는 취소됩니다
+            만료된 hold 는 예약시 바로 풀리고, sweep_car_holds 명령으로 주기적으로 지웁니다
+    """
+    queryset = CarTimeTable.objects.all()
+    serializer_class = CarHoldSerializer
+    # hold 는 get_queryset 에서 본인 것만 조회됩니다
+    permission_classes = [IsAuthenticated, ]
+
+    def get_queryset(self):
+        return super().get_queryset().filter(hold_member=self.request.user,
+                                             car_id=self.kwargs.get('car_pk'))
+
+    def perform_create(self, serializer):
+        get_object_or_404(CarZone, id=self.kwargs.get('carzone_pk'))
+        get_object_or_404(Car, id=self.kwargs.get('car_pk'))
+        serializer.save(member=self.request.user,
+                        zone_id=self.kwargs.get('carzone_pk'),
+                        car_id=self.kwargs.get('car_pk'))
+
+
+class ReservationHistoryViewSet(CompiledListMixin,
+                                ReplicaReadMixin,
+                                mixins.RetrieveModelMixin,
                                 mixins.ListModelMixin,
                                 GenericViewSet):
     """
@@ -58,13 +101,21 @@ class ReservationHistoryViewSet(mixins.RetrieveModelMixin,
     """
     queryset = Reservation.objects.all()
     serializer_class = ReservationHistorySerializer
+    compiled_serializer_class = ReservationHistoryCompiledSerializer
     permission_classes = [IsOwner, ]
+    replica_actions = ('list', 'retrieve', 'history')
 
     def get_serializer_class(self):
         if self.action == 'history':
             return UseHistoryListSerializer
         return super().get_serializer_class()
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'history':
+            queryset = queryset.for_use_history()
+        return queryset
+
     def filter_queryset(self, queryset):
         queryset = queryset.filter(member=self.request.user)
         return super().filter_queryset(queryset)
@@ -74,7 +125,8 @@ class ReservationHistoryViewSet(mixins.RetrieveModelMixin,
         return super().list(request, *args, **kwargs)
 
 
-class PhotoBeforeUseViewSet(mixins.CreateModelMixin,
+class PhotoBeforeUseViewSet(TemporaryFileUploadMixin,
+                            mixins.CreateModelMixin,
                             mixins.ListModelMixin,
                             GenericViewSet):
     """
@@ -85,6 +137,8 @@ class PhotoBeforeUseViewSet(mixins.CreateModelMixin,
             -> 해당 예약건에 대한 탑승전 사진 업로드(이미지 다중 업로드 가능)
         [GET] /reservations/123/photos
             -> 해당 예약건에 대한 탑승전 사진 리스트 보기
+        ---
+            업로드한 사진은 임시 파일로 받아 PHOTO_UPLOAD_WORKERS 개의 thread 에서 동시에 storage 에 저장합니다
     """
     queryset = PhotoBeforeUse.objects.all()
     serializer_class = PhotoBeforeUseSerializer
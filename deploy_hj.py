@@ -66,6 +66,8 @@ def copy_secrets():
 
 def server_exec():
     ssh_run(f'sudo docker exec {PROJECT_NAME} python manage.py collectstatic --noinput')
+    # 공유 캐시(CACHES) 기본값인 DB 캐시 테이블, 이미 있으면 그대로 둡니다
+    ssh_run(f'sudo docker exec {PROJECT_NAME} python manage.py createcachetable')
     ssh_run(f'sudo docker exec -d {PROJECT_NAME} supervisord -c /srv/{PROJECT_NAME}/.config/supervisord.conf')
 
 